@@ -133,8 +133,80 @@ REST_FRAMEWORK = {
 CHARTS_DB_SOURCE = os.getenv('CHARTS_DB_SOURCE', 'LOVATI')
 CHARTS_DB = LOVATI_SERVER if CHARTS_DB_SOURCE.upper() == 'LOVATI' else SQL_SERVER
 
+# >>> added: справочник PTI × IDS в памяти (charts/directory.py) — период проверки изменений, сек
+CHARTS_DIRECTORY_TTL = int(os.getenv('CHARTS_DIRECTORY_TTL', '300'))
+
+# >>> added: справочник UNITS TERMOCOM5 в памяти (termocom_charts/directory.py) — период обновления, сек
+TERMOCOM_UNITS_TTL = int(os.getenv('TERMOCOM_UNITS_TTL', '600'))
+
+# >>> added: локальное зеркало HTREND TERMOCOM5 (termocom_charts/mirror.py); пусто — выключено.
+# Заполняется командой: python manage.py sync_termocom_mirror --loop 300
+TERMOCOM_MIRROR_PATH = os.getenv('TERMOCOM_MIRROR_PATH') or None        # напр. storage/termocom_mirror.sqlite3
+TERMOCOM_MIRROR_LIVE_MINUTES = int(os.getenv('TERMOCOM_MIRROR_LIVE_MINUTES', '10'))
+TERMOCOM_MIRROR_INITIAL_DAYS = int(os.getenv('TERMOCOM_MIRROR_INITIAL_DAYS', '365'))
+# каждый проход перечитывает столько минут перед watermark — строки, пришедшие в HTREND с опозданием
+TERMOCOM_MIRROR_OVERLAP_MINUTES = int(os.getenv('TERMOCOM_MIRROR_OVERLAP_MINUTES', '60'))
+
+# >>> added: кэш Django (суточные куски LR в charts/chunks.py, итоги помп по суткам в pumps/analytics.py).
+# LocMemCache — у каждого процесса (воркера, manage.py-команды) свой; лимит записей поднят с 300 по умолчанию.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "OPTIONS": {"MAX_ENTRIES": int(os.getenv('CACHE_MAX_ENTRIES', '5000'))},
+    },
+}
+
+# >>> added: индекс полноты данных графиков (charts/completeness.py, manage.py build_chart_completeness)
+CHARTS_COMPLETENESS_PATH = BASE_DIR / "storage" / "chart_completeness.sqlite3"
+# ожидаемый шаг точек по источнику, сек (LR-прибор / TERMOCOM5 HTREND)
+CHARTS_EXPECTED_INTERVAL = {
+    "lr": int(os.getenv('CHARTS_EXPECTED_INTERVAL_LR', '600')),
+    "tc": int(os.getenv('CHARTS_EXPECTED_INTERVAL_TC', '600')),
+}
+
+# >>> added: ночные роллапы час/сутки для графиков (charts/rollups.py, manage.py build_chart_rollups)
+CHARTS_ROLLUP_PATH = BASE_DIR / "storage" / "chart_rollups.sqlite3"
+
+# >>> added: окно скользящих гистограмм стоимости запросов графиков (charts/costs.py), минут
+CHARTS_COSTS_WINDOW_MINUTES = int(os.getenv('CHARTS_COSTS_WINDOW_MINUTES', '60'))
+
 # ===== Pumps / PTC links =====
 PTC_VIEW_URL_TEMPLATE = os.getenv(
     'PTC_VIEW_URL_TEMPLATE',
     'http://10.1.1.174/view/view_page.php?title={ptc}'
 )
+
+# >>> added: общий дедлайн параллельного чтения источников страницы помп (pumps/service.py), сек;
+# не успевший источник отдаётся из последнего удачного чтения со stale=True
+PUMPS_SOURCE_DEADLINE = float(os.getenv('PUMPS_SOURCE_DEADLINE', '8'))
+
+# >>> added: общий снимок текущего состояния (monitoring/snapshot.py): срок жизни, сек
+MONITORING_SNAPSHOT_TTL = float(os.getenv('MONITORING_SNAPSHOT_TTL', '25'))
+# страница помп берёт строки из этого снимка, если он не старше (сек); иначе читает БД сама
+PUMPS_SNAPSHOT_MAX_AGE = float(os.getenv('PUMPS_SNAPSHOT_MAX_AGE', '60'))
+
+# >>> added: индекс помп LOVATI (PTI.id + флаги pompa2/pompa3 из IDS) в памяти (pumps/repositories/lovati_repo.py), сек
+PUMPS_LOVATI_INDEX_TTL = int(os.getenv('PUMPS_LOVATI_INDEX_TTL', '600'))
+
+# >>> added: статистика пусков помп по истории (pumps/analytics.py, /pumps/api/runs/)
+# точка «держит» состояние не дольше (сек): дыры в данных не считаются ни работой, ни простоем
+PUMPS_RUN_MAX_HOLD = int(os.getenv('PUMPS_RUN_MAX_HOLD', '1800'))
+PUMPS_RUN_DAY_TTL = 31 * 24 * 3600        # сколько держим в кэше итоги закрытых суток, сек
+
+# >>> added: кольцевой буфер переходов цвета помп (pumps/events.py, /pumps/api/events/), событий
+PUMPS_EVENTS_BUFFER = int(os.getenv('PUMPS_EVENTS_BUFFER', '1000'))
+
+# >>> added: long-poll страницы помп (pumps/longpoll.py, /pumps/api/watch/)
+PUMPS_WATCH_INTERVAL = float(os.getenv('PUMPS_WATCH_INTERVAL', '10'))   # период общего цикла обновления, сек
+PUMPS_WATCH_IDLE = 120                                                  # цикл засыпает, если никто не ждал столько сек
+
+# >>> added: реестр помп по объектам (pumps/topology.py): файл и как часто проверять его изменение, сек
+PUMPS_TOPOLOGY_PATH = os.getenv('PUMPS_TOPOLOGY_PATH', '')          # пусто — pumps/data/topology.json
+PUMPS_TOPOLOGY_CHECK = float(os.getenv('PUMPS_TOPOLOGY_CHECK', '30'))
+
+# >>> added: тренд тока помп TERMOCOM (pumps/trend.py): окно показаний на помпу, минимум точек,
+# порог роста тока (A/мин), с которого помпа помечается trending_up
+PUMPS_TREND_WINDOW = int(os.getenv('PUMPS_TREND_WINDOW', '30'))
+PUMPS_TREND_MIN_POINTS = int(os.getenv('PUMPS_TREND_MIN_POINTS', '5'))
+PUMPS_TREND_SLOPE = float(os.getenv('PUMPS_TREND_SLOPE', '2'))
+PUMPS_TREND_MAX_AGE = float(os.getenv('PUMPS_TREND_MAX_AGE', '1800'))   # сек; ≈ окно × интервал показаний (30 × 60 с)
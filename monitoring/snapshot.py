@@ -0,0 +1,74 @@
+# monitoring/snapshot.py
+# МОДУЛЬ: общий снимок текущего состояния объектов в памяти процесса.
+# monitoring.views регистрирует здесь свои загрузчики (_fetch_termocom_rows / _fetch_lovati_rows):
+#   - get(name) — строки источника не старше ttl; устарели → загрузка (одна на процесс,
+#     параллельные запросы ждут её же результат, а не идут в БД сами);
+#   - peek(name, max_age) — только посмотреть, без загрузки (для других приложений, например pumps:
+#     они проецируют уже прочитанные строки и не создают своей нагрузки на БД).
+# Строки снимка общие для всех читателей — их нельзя менять на месте (копируйте dict перед правкой).
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from django.conf import settings
+
+SNAPSHOT_TTL = getattr(settings, "MONITORING_SNAPSHOT_TTL", 25)
+
+Rows = List[Dict[str, Any]]
+
+
+class CurrentState:
+    """Строки одного источника + время их чтения; загрузка single-flight."""
+
+    def __init__(self, name: str, loader: Callable[[], Rows], ttl: float = SNAPSHOT_TTL) -> None:
+        self.name = name
+        self._loader = loader
+        self.ttl = float(ttl)
+        self._lock = threading.Lock()
+        self._rows: Optional[Rows] = None
+        self.fetched_at: Optional[float] = None          # time.time() последней удачной загрузки
+        self.version = 0
+
+    def age(self) -> Optional[float]:
+        return None if self.fetched_at is None else time.time() - self.fetched_at
+
+    def get(self) -> Rows:
+        age = self.age()
+        if age is not None and age < self.ttl:
+            return self._rows  # type: ignore[return-value]
+        with self._lock:
+            age = self.age()                              # пока ждали, другой поток мог уже загрузить
+            if age is not None and age < self.ttl:
+                return self._rows  # type: ignore[return-value]
+            rows = self._loader()
+            self._rows = rows
+            self.fetched_at = time.time()
+            self.version += 1
+            return rows
+
+    def peek(self, max_age: float) -> Optional[Tuple[Rows, float]]:
+        """(строки, возраст в сек), если снимок есть и не старше max_age; иначе None."""
+        rows, fetched_at = self._rows, self.fetched_at
+        if rows is None or fetched_at is None:
+            return None
+        age = time.time() - fetched_at
+        return (rows, age) if age <= max_age else None
+
+
+_registry: Dict[str, CurrentState] = {}
+
+
+def register(name: str, loader: Callable[[], Rows], ttl: float = SNAPSHOT_TTL) -> CurrentState:
+    state = _registry.get(name)
+    if state is None:
+        state = _registry[name] = CurrentState(name, loader, ttl)
+    return state
+
+
+def peek(name: str, max_age: float) -> Optional[Tuple[Rows, float]]:
+    """Снимок источника name, если его кто-то уже загрузил и он достаточно свежий."""
+    state = _registry.get(name)
+    return state.peek(max_age) if state is not None else None
@@ -20,9 +20,11 @@ from urllib.parse import urlencode
 from django.urls import reverse
 
 from .utils import can_edit_from_request
+from . import snapshot
 from monitoring_PTC.charts.http_clients import fetch_xml
 from monitoring_PTC.charts.xml_parser import parse_series
 from monitoring_PTC.charts.timezone_utils import TZ_CHISINAU, to_epoch_seconds
+from pumps.topology import get_topology
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # --- Конфиг таймаута подключения к SQL Server (секунды) ---
@@ -36,13 +38,9 @@ LR_CACHE_TTL = 300  # seconds
 # ВАЖНО: для LOVATI фолбэк отключаем, чтобы при отсутствии корректного ID ячейка была пустой.
 LOVATI_FALLBACK_TO_PARAM = False
 
-# LOVATI: объекты, где PTI.pompa/pompa2/pompa3 = 0/1 (0=ON зелёный, 1=OFF красный).
+# LOVATI: объекты, где PTI.pompa/pompa2/pompa3 = 0/1 (0=ON зелёный, 1=OFF красный) —
+# берутся из общего реестра помп (pumps/topology.py, get_topology().lovati).
 # Здесь насосы НЕ должны зависеть от IDS/LR.
-LOVATI_PUMP01_PTC = {
-    "2113","2209","2407","1012","1018","3001","3002","3003","3004","3005",
-    "3013","3025","3038","3043","3054","3064","3083","3107","3111","3118",
-    "3127","4018","4044","5012","5013","5023","5043","5051",
-}
 
 
 
@@ -711,47 +709,8 @@ def _fetch_termocom_rows():
     TERMOCOM5: UNITS.UNIT_NAME вида PT_####/#####, нормализованные dict.
     Для графиков используем param_rokura (у нас нет PTI.id из LOVATI).
     """
-    pompa_map = {
-        "2009": [2],
-        "2055": [2, 3],
-        "2056": [2],
-        "2057": [2],
-        "2201": [2],
-        "2202": [2, 3],
-        "2209": [1],
-        "2216": [2],
-        "3012": [2],
-        "3125": [1, 2, 3],
-        "4009": [2],
-        "4012": [2],
-        "4014": [2],
-        "4016": [2],
-        "4019": [2],
-        "4021": [2],
-        "4025": [2],
-        "4027": [2],
-        "4037": [2],
-        "4040": [2],
-        "4041": [2],
-        "4050": [2],
-        "4054": [2],
-        "4058": [2],
-        "4063": [2],
-        "4065": [2],
-        "4066": [2],
-        "4068": [2],
-        "4077": [2],
-        "5002": [2],
-        "5003": [2],
-        "5008": [2],
-        "5009": [2],
-        "5014": [2],
-        "5019": [2],
-        "5047": [2],
-        "5057": [2],
-        "5058": [2],
-        "5075": [2],
-    }
+    # номера помп TERMOCOM по PTC — общий реестр помп (pumps/topology.py)
+    pompa_map = get_topology().termocom
 
     # --- LOVATI: адреса по PTC ---
     dsn_lavati = _dsn(settings.LOVATI_SERVER)
@@ -958,7 +917,7 @@ def _fetch_termocom_rows():
                     "sursa": v220_on,
                     "id_sursa": _url_1111_param(obiect, "sursa"),
                     "pompa": pompa_vals,
-                    "pompa_nums": pompa_map.get(ptc, []),
+                    "pompa_nums": list(pompa_map.get(ptc, ())),
                     "id_pompa1": _url_1111_param(obiect, "pompa"),
                     "id_pompa2": _url_1111_param(obiect, "pompa2"),
                     "id_pompa3": _url_1111_param(obiect, "pompa3"),
@@ -1150,6 +1109,7 @@ def _fetch_lovati_rows():
             return None
         return _chart_url(ptc, key)
 
+    lovati_pump_ptc = get_topology().lovati
     out = []
     for r, pid, ptc, address, ips, ids_map in parsed_rows:
         g1 = _to_float(r.G1)
@@ -1208,7 +1168,7 @@ def _fetch_lovati_rows():
         pompa_nums: list[int] = []
 
         # ✅ Если это “наши” LOVATI объекты — берём статусы насосов прямо из PTI: r.Pompa/r.Pompa2/r.Pompa3
-        if ptc in LOVATI_PUMP01_PTC:
+        if ptc in lovati_pump_ptc:
             raw_pumps_01: list[tuple[int, int]] = []
 
             def _to01(x):
@@ -1367,16 +1327,23 @@ def _fetch_lovati_rows():
     return out
 
 
+# Общий снимок текущего состояния (monitoring/snapshot.py): его же читает страница помп (pumps)
+TERMOCOM_STATE = snapshot.register("termocom", _fetch_termocom_rows)
+LOVATI_STATE = snapshot.register("lovati", _fetch_lovati_rows)
+
+
 def fetch_ptc_data():
     """TERMOCOM5 + LOVATI с de-dup по PTC. Приоритет у TERMOCOM5.
     ДОПОЛНИТЕЛЬНО: рассчитываем Gacm-P (прогноз) по шаблону суток из LOVATI.
+    Строки берутся из общего снимка (не старше MONITORING_SNAPSHOT_TTL), поэтому копируются:
+    ниже они дополняются на месте.
     """
-    termo_rows = _fetch_termocom_rows()
+    termo_rows = [dict(r) for r in TERMOCOM_STATE.get()]
     termo_ptc = {row["ptc"] for row in termo_rows}
 
-    lovati_rows = _fetch_lovati_rows()
+    lovati_rows = LOVATI_STATE.get()
     # LOVATI-строки с PTC, которые уже есть в TERMOCOM5, убираем
-    lovati_rows = [r for r in lovati_rows if r.get("ptc") not in termo_ptc]
+    lovati_rows = [dict(r) for r in lovati_rows if r.get("ptc") not in termo_ptc]
 
     # объединяем
     rows = termo_rows + lovati_rows
@@ -0,0 +1,74 @@
+# charts/catalog.py
+# МОДУЛЬ: готовые (предсериализованные) ответы для списка объектов в выпадающих списках графиков.
+# Для каждого набора typeObj (например {0} или {0, 1}) JSON-ответ собирается один раз,
+# хранится байтами вместе с ETag и живёт, пока не изменится справочник PTI × IDS (directory.version).
+# Открытие страницы графика при тёплом справочнике не делает ни одного SQL-запроса,
+# а повторный запрос браузера с If-None-Match получает 304 без тела.
+
+from __future__ import annotations
+import hashlib                                       # ETag = хеш тела ответа
+import json                                          # сериализация один раз, дальше отдаём байты
+import threading                                     # защита кэша при параллельных запросах
+from typing import Dict, Iterable, Tuple
+
+from .directory import PTI_DIRECTORY                 # версия справочника для инвалидации
+from .repositories import list_objects               # фильтрация объектов по справочнику
+from .serializers import ObjectItemSerializer        # та же схема, что и раньше в ObjectsView
+
+_lock = threading.Lock()
+_cache: Dict[Tuple[int, ...], Tuple[bytes, str]] = {}   # (типы) → (JSON-байты, ETag)
+_cache_version = -1                                      # для какой версии справочника собран кэш
+
+
+def _build(types: Tuple[int, ...]) -> Tuple[bytes, str]:
+    """Собрать ответ: те же поля, что раньше отдавал ObjectsView, плюс ETag."""
+    rows = list_objects(type_obj=list(types))
+    payload = [
+        {
+            "pti": r["pti"],
+            "adres": r["adres"],
+            "ips": r["ips"],
+            "ids": {"t1": r["id_t1"], "t2": r["id_t2"]},
+        }
+        for r in rows
+    ]
+    data = ObjectItemSerializer(payload, many=True).data
+    body = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+    return body, etag
+
+
+def get_catalog(types: Iterable[int]) -> Tuple[bytes, str]:
+    """Вернуть (JSON-байты, ETag) для набора типов; пересобирает только при смене справочника."""
+    global _cache_version
+    key = tuple(sorted({int(t) for t in types}))
+
+    PTI_DIRECTORY.get()                                   # прогреть/обновить справочник
+    version = PTI_DIRECTORY.version
+
+    with _lock:
+        if version != _cache_version:                     # PTI/IDS изменились — всё собранное устарело
+            _cache.clear()
+            _cache_version = version
+        hit = _cache.get(key)
+    if hit is not None:
+        return hit
+
+    built = _build(key)
+    with _lock:
+        if _cache_version == version:                     # не кладём, если справочник успел смениться
+            _cache[key] = built
+    return built
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Проверка заголовка If-None-Match (список тегов, допускается W/ и '*')."""
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == "*" or tag == etag:
+            return True
+    return False
@@ -0,0 +1,101 @@
+# charts/chunks.py
+# МОДУЛЬ: суточные куски рядов LR в кэше Django.
+# Идея: закрытые (прошедшие) сутки у прибора уже не меняются, поэтому их точки можно хранить
+#       в кэше по ключу (ips, param_id, локальная дата) и не ходить за ними к прибору повторно.
+#       Текущие сутки не кэшируются — они всегда берутся «живыми».
+# Всё, чего нет в кэше (включая сегодня), забирается ОДНИМ запросом к прибору на общий диапазон
+# и раскладывается по суткам; все закрытые сутки из этого диапазона сразу попадают в кэш.
+# Точки хранятся компактно: [(epoch_utc_сек, value), ...], отсортированы по времени.
+# В кэш попадают только сутки из XML, который разобрался: на мусор/обрезанный ответ прибора (HTTP 200)
+# load_lr_days поднимает DeviceXMLError и ничего не запоминает — следующий запрос снова спросит прибор.
+# Кэш — default из CACHES (LocMemCache): у каждого процесса свой, общий между воркерами он не будет.
+
+from __future__ import annotations
+import logging
+from datetime import date, datetime, time as dtime, timedelta
+from typing import Dict, Iterable, List, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .http_clients import fetch_xml                         # HTTP к прибору (сырые байты XML)
+from .xml_parser import DeviceXMLError, iter_records        # потоковый разбор <record>
+from .timezone_utils import TZ_CHISINAU, to_epoch_seconds   # локальная TZ и перевод в epoch
+
+DAY_CHUNK_TTL = getattr(settings, "CHARTS_DAY_CHUNK_TTL", 7 * 24 * 3600)  # сколько держим закрытые сутки, сек
+
+DayPoints = List[Tuple[int, float]]                          # [(epoch_utc, value), ...]
+
+logger = logging.getLogger(__name__)
+
+
+def local_today() -> date:
+    """Текущая дата по Кишинёву."""
+    return datetime.now(TZ_CHISINAU).date()
+
+
+def day_bounds(day: date) -> Tuple[int, int]:
+    """Границы локальных суток в epoch: [начало, конец] (конец включительно, как ждёт прибор)."""
+    start = datetime.combine(day, dtime.min, tzinfo=TZ_CHISINAU)
+    stop = datetime.combine(day + timedelta(days=1), dtime.min, tzinfo=TZ_CHISINAU)
+    return to_epoch_seconds(start), to_epoch_seconds(stop) - 1
+
+
+def _key(ips: int, param_id: str, day: date) -> str:
+    return f"charts:lr-day:v1:{ips}:{param_id}:{day.isoformat()}"
+
+
+def load_lr_days(ips: int, param_id: str, days: Iterable[date]) -> Tuple[Dict[date, DayPoints], int]:
+    """
+    Вернуть точки по каждым запрошенным суткам и число реальных запросов к прибору (0 или 1).
+    Будущие сутки → пустой список; закрытые сутки — из кэша; остальное — одним fetch_xml.
+    Неразбираемый ответ прибора → DeviceXMLError (в кэш при этом ничего не пишется).
+    """
+    today = local_today()
+    wanted = sorted(set(days))
+    out: Dict[date, DayPoints] = {}
+
+    closed_keys = {d: _key(ips, param_id, d) for d in wanted if d < today}
+    cached = cache.get_many(list(closed_keys.values())) if closed_keys else {}
+
+    missing: List[date] = []
+    for d in wanted:
+        if d > today:
+            out[d] = []
+            continue
+        k = closed_keys.get(d)
+        if k is not None and k in cached:
+            out[d] = cached[k]
+        else:
+            missing.append(d)
+
+    if not missing:
+        return out, 0
+
+    # один запрос к прибору на весь диапазон недостающих суток (сегодня — до текущего момента)
+    start_epoch = day_bounds(missing[0])[0]
+    stop_epoch = min(day_bounds(missing[-1])[1], to_epoch_seconds(datetime.now(TZ_CHISINAU)))
+    raw_xml = fetch_xml(ips, str(param_id), start_epoch, stop_epoch)
+
+    n_days = (missing[-1] - missing[0]).days + 1
+    buckets: Dict[date, DayPoints] = {missing[0] + timedelta(days=i): [] for i in range(n_days)}
+    try:
+        for dt, val in iter_records(raw_xml, strict=True):
+            b = buckets.get(dt.date())                       # dt уже в Europe/Chisinau
+            if b is not None:
+                b.append((int(dt.timestamp()), val))
+    except DeviceXMLError:
+        # ничего не кэшируем: пустые сутки здесь значат «прибор не ответил», а не «данных нет»
+        logger.warning("LR %s/%s %s..%s: bad XML, days not cached", ips, param_id, missing[0], missing[-1])
+        raise
+    for pts in buckets.values():
+        pts.sort(key=lambda p: p[0])
+
+    # все закрытые сутки диапазона — в кэш (даже те, что не просили: пригодятся соседним запросам)
+    cache.set_many(
+        {_key(ips, param_id, d): pts for d, pts in buckets.items() if d < today},
+        DAY_CHUNK_TTL,
+    )
+    for d in missing:
+        out[d] = buckets[d]
+    return out, 1
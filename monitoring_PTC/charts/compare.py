@@ -0,0 +1,83 @@
+# charts/compare.py
+# МОДУЛЬ: сравнение рядов разных источников (LR-прибор и TERMOCOM5) на одной оси времени.
+# У источников разные соглашения о времени: прибор отдаёт UTC (parse_device_timestamp),
+# TERMOCOM хранит локальное naive-время. sources.iter_points уже приводит оба к aware Europe/Chisinau,
+# здесь всё переводится в настоящий epoch UTC и раскладывается на общую сетку с шагом step
+# (значение ячейки = среднее попавших в неё точек). Ряды читаются параллельно, каждый —
+# потоком прямо в суммы ячеек, без списков точек.
+
+from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from .sources import ResolvedSeries, iter_points
+from .stats import SeriesSummary
+from .timezone_utils import TZ_CHISINAU
+
+COMPARE_MAX_SERIES = 8                 # рядов в одном запросе
+COMPARE_MAX_CELLS = 20_000             # ячеек сетки (интервал / step)
+COMPARE_DEFAULT_STEP = 600             # шаг сетки по умолчанию: 10 минут
+
+# Один пул потоков на процесс (не создаём заново на каждый запрос!)
+COMPARE_EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix="charts-compare")
+
+
+def grid_bounds(dt_start: datetime, dt_end: datetime, step: int) -> Tuple[int, int]:
+    """Начало сетки (epoch UTC, выровнено на step) и число ячеек."""
+    t0 = int(dt_start.timestamp()) // step * step
+    t1 = int(dt_end.timestamp())
+    return t0, (t1 - t0) // step + 1
+
+
+def _resample(rs: ResolvedSeries, dt_start: datetime, dt_end: datetime, t0: int, n: int, step: int) -> Dict[str, Any]:
+    """Прочитать ряд и сразу разложить по ячейкам сетки: {"values": [...], "summary": {...}}."""
+    sums = [0.0] * n
+    cnts = [0] * n
+    summary = SeriesSummary()
+    for dt, val in iter_points(rs, dt_start, dt_end):
+        i = (int(dt.timestamp()) - t0) // step
+        if 0 <= i < n:
+            sums[i] += val
+            cnts[i] += 1
+            summary.add(val)
+    return {
+        "values": [sums[i] / cnts[i] if cnts[i] else None for i in range(n)],
+        "summary": summary.as_dict(),
+    }
+
+
+def build_compare(series: List[ResolvedSeries], dt_start: datetime, dt_end: datetime, step: int) -> Dict[str, Any]:
+    """
+    Ответ сравнения: общая ось (labels — локальное ISO-время начала ячейки) и массив на каждый ряд.
+    Ряды читаются одновременно в COMPARE_EXECUTOR. Ошибка одного источника не валит ответ:
+    у такого ряда values = null по всей оси и поле "error".
+    Для ровно двух рядов добавляется "diff" = первый − второй (там, где есть оба значения).
+    """
+    t0, n = grid_bounds(dt_start, dt_end, step)
+    futures = [COMPARE_EXECUTOR.submit(_resample, rs, dt_start, dt_end, t0, n, step) for rs in series]
+
+    out_series: List[Dict[str, Any]] = []
+    for rs, fut in zip(series, futures):
+        item: Dict[str, Any] = {"name": rs.spec.name, "src": rs.spec.src, "pti": rs.spec.pti, "param": rs.spec.param}
+        try:
+            item.update(fut.result())
+        except Exception as e:
+            item.update({"values": [None] * n, "summary": SeriesSummary().as_dict(), "error": str(e)})
+        out_series.append(item)
+
+    labels = [datetime.fromtimestamp(t0 + i * step, TZ_CHISINAU).isoformat() for i in range(n)]
+    payload: Dict[str, Any] = {"step": step, "t0": t0, "labels": labels, "series": out_series}
+
+    if len(out_series) == 2:
+        a, b = out_series[0]["values"], out_series[1]["values"]
+        payload["diff"] = [x - y if x is not None and y is not None else None for x, y in zip(a, b)]
+    return payload
+
+
+def parse_step(raw: Optional[str]) -> int:
+    """step=сек (≥60); ValueError при неверном значении."""
+    step = int(raw or COMPARE_DEFAULT_STEP)
+    if step < 60:
+        raise ValueError("step must be >= 60 seconds")
+    return step
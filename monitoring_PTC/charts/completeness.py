@@ -0,0 +1,272 @@
+# charts/completeness.py
+# МОДУЛЬ: индекс полноты данных по объектам и параметрам (LR-приборы и TERMOCOM5).
+# Ночная задача (manage.py build_chart_completeness) считает для каждого объекта × параметра × суток,
+# какая доля ожидаемых точек реально пришла — по каждому часу и за сутки целиком.
+# Ожидаемый шаг точек задаётся в CHARTS_EXPECTED_INTERVAL по источнику (сек).
+# Результат — компактная таблица SQLite (storage/), одна строка на (src, pti, param, сутки):
+#   ratio  — доля за сутки (0..1), hours — по байту на каждый фактический час суток, доля в процентах (0..100).
+#   Сутки перехода на летнее/зимнее время — 23/25 часов (границы из chunks.day_bounds), а не 24.
+# API отдаёт её мгновенно: серые дни в календаре графика, список худших объектов за день.
+
+from __future__ import annotations
+import logging
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, time as dtime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+
+from .chunks import day_bounds, load_lr_days                 # границы суток и точки LR по суткам
+from .directory import get_directory                         # справочник PTI × IDS
+from .repositories import LR_PARAM_ALIASES, PARAM_COLUMNS, is_valid_id
+from .timezone_utils import TZ_CHISINAU
+
+from monitoring_PTC.termocom_charts.directory import get_units_directory
+from monitoring_PTC.termocom_charts.repositories import (
+    TERMOCOM_PARAM_MAP,
+    count_termocom_hourly,
+    resolve_unit_id_by_ptc,
+    series_lookup,
+)
+
+logger = logging.getLogger(__name__)
+
+COMPLETENESS_PATH = getattr(
+    settings, "CHARTS_COMPLETENESS_PATH", Path(settings.BASE_DIR) / "storage" / "chart_completeness.sqlite3"
+)
+EXPECTED_INTERVAL: Dict[str, int] = getattr(settings, "CHARTS_EXPECTED_INTERVAL", {"lr": 600, "tc": 600})
+
+_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS completeness (
+        src      TEXT    NOT NULL,
+        pti      TEXT    NOT NULL,
+        param    TEXT    NOT NULL,
+        day      TEXT    NOT NULL,
+        samples  INTEGER NOT NULL,
+        expected INTEGER NOT NULL,
+        ratio    REAL    NOT NULL,
+        hours    BLOB    NOT NULL,
+        PRIMARY KEY (src, pti, param, day)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS completeness_day_ratio ON completeness (day, ratio);
+"""
+
+Row = Tuple[str, str, str, str, int, int, float, bytes]
+
+
+def _connect(readonly: bool = False) -> sqlite3.Connection:
+    if readonly:
+        return sqlite3.connect(f"file:{COMPLETENESS_PATH}?mode=ro", uri=True, timeout=5)
+    conn = sqlite3.connect(str(COMPLETENESS_PATH), timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def _per_hour(src: str) -> int:
+    return max(1, 3600 // int(EXPECTED_INTERVAL.get(src, 600)))
+
+
+def _hour_slots(day: date) -> List[int]:
+    """Локальный час (0..23) каждого фактического часа суток: 24 элемента, в дни перевода часов — 23 или 25."""
+    start, stop = day_bounds(day)
+    return [datetime.fromtimestamp(t, TZ_CHISINAU).hour for t in range(start, stop + 1, 3600)]
+
+
+def _wall_to_slots(wall: List[int], slots: List[int], per_hour: int) -> List[int]:
+    """
+    Счётчики по «настенным» часам (TERMOCOM хранит naive локальное время) → по фактическим часам суток.
+    Несуществующий час весной выпадает; повторный час осенью записан в один настенный час дважды —
+    первому из двух достаётся не больше per_hour точек, остаток второму.
+    """
+    left = list(wall)
+    out: List[int] = []
+    for i, h in enumerate(slots):
+        take = left[h] if h not in slots[i + 1:] else min(left[h], per_hour)
+        left[h] -= take
+        out.append(take)
+    return out
+
+
+def _make_row(src: str, pti: str, param: str, day: date, counts: List[int]) -> Row:
+    """Счётчики по часам → строка таблицы (доли обрезаются сверху единицей: дубли не «лечат» пропуски)."""
+    per_hour = _per_hour(src)
+    samples = sum(min(c, per_hour) for c in counts)
+    expected = per_hour * len(counts)
+    hours = bytes(min(100, round(100 * c / per_hour)) for c in counts)
+    return (src, pti, param, day.isoformat(), sum(counts), expected, samples / expected, hours)
+
+
+# ---------- подсчёт ----------
+
+def _known_series(src: str) -> set:
+    """(pti, param), которые уже есть в индексе для источника."""
+    conn = _connect()
+    try:
+        return set(conn.execute("SELECT DISTINCT pti, param FROM completeness WHERE src = ?", (src,)).fetchall())
+    finally:
+        conn.close()
+
+
+def lr_series_jobs() -> List[Tuple[str, str, int, str]]:
+    """(pti, param, ips, param_id) для всех объектов и параметров с валидным id (синонимы вроде Q пропускаем: он же Q1)."""
+    jobs: List[Tuple[str, str, int, str]] = []
+    seen = set()
+    for e in get_directory().entries:
+        if e.ips is None or e.pti in seen:
+            continue
+        seen.add(e.pti)
+        for param, col in PARAM_COLUMNS.items():
+            if param in LR_PARAM_ALIASES:
+                continue
+            pid = e.ids.get(col.lower())
+            if is_valid_id(pid):
+                jobs.append((e.pti, param, int(e.ips), str(pid).strip()))
+    return jobs
+
+
+def _lr_row(job: Tuple[str, str, int, str], day: date) -> Row:
+    pti, param, ips, param_id = job
+    points_by_day, _ = load_lr_days(ips, param_id, [day])
+    start, stop = day_bounds(day)
+    counts = [0] * ((stop + 1 - start) // 3600)          # 23/24/25 часов
+    for epoch, _ in points_by_day.get(day) or []:
+        if start <= epoch <= stop:
+            counts[(epoch - start) // 3600] += 1
+    return _make_row("lr", pti, param, day, counts)
+
+
+def _tc_rows(day: date, known: set) -> List[Row]:
+    """
+    TERMOCOM: один GROUP BY на колонку по всем объектам.
+    Ряд (объект, параметр) попадает в индекс, если объект писал в ту же HTREND-таблицу в эти сутки
+    или ряд уже был в индексе раньше (known) — иначе у объектов без DCX все DCX-параметры были бы «нулями».
+    """
+    units = get_units_directory()
+    counts = count_termocom_hourly(datetime.combine(day, dtime.min))     # 24 настенных часа
+    slots = _hour_slots(day)
+    per_hour = _per_hour("tc")
+    active_tables = {(unit_id, TERMOCOM_PARAM_MAP[param][0]) for unit_id, param in counts}
+
+    rows: List[Row] = []
+    for name, unit_id in zip(units.names, units.ids):
+        pti = name[3:]                                     # "PT_5019A" → "5019A"
+        for param, (table_name, _, _) in TERMOCOM_PARAM_MAP.items():
+            c = counts.get((unit_id, param))
+            if c is None:
+                if (unit_id, table_name) not in active_tables and (pti, param) not in known:
+                    continue
+                c = [0] * 24
+            rows.append(_make_row("tc", pti, param, day, _wall_to_slots(c, slots, per_hour)))
+    return rows
+
+
+def build_completeness(day: date, workers: int = 8, sources: Iterable[str] = ("lr", "tc")) -> Tuple[int, int]:
+    """
+    Посчитать и записать индекс за одни сутки. Вернёт (строк записано, ошибок).
+    LR опрашивается параллельно (workers потоков), ошибка одного прибора пропускает только его строку.
+    """
+    rows: List[Row] = []
+    errors = 0
+
+    if "lr" in sources:
+        jobs = lr_series_jobs()
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="charts-completeness") as ex:
+            futures = [ex.submit(_lr_row, job, day) for job in jobs]
+            for job, fut in zip(jobs, futures):
+                try:
+                    rows.append(fut.result())
+                except Exception:
+                    errors += 1
+                    logger.warning("completeness: lr %s %s failed", job[0], job[1], exc_info=True)
+
+    if "tc" in sources:
+        try:
+            rows.extend(_tc_rows(day, _known_series("tc")))
+        except Exception:
+            errors += 1
+            logger.exception("completeness: termocom failed")
+
+    conn = _connect()
+    try:
+        conn.executemany("INSERT OR REPLACE INTO completeness VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        conn.commit()
+    finally:
+        conn.close()
+    return len(rows), errors
+
+
+# ---------- чтение для API ----------
+
+def _as_dict(r) -> Dict[str, Any]:
+    src, pti, param, day, samples, expected, ratio, hours = r
+    return {
+        "src": src, "pti": pti, "param": param, "date": day,
+        "samples": samples, "expected": expected, "ratio": round(ratio, 4),
+        "hours": [b / 100 for b in hours],
+    }
+
+
+def index_key(src: str, pti: str, param: str) -> Optional[Tuple[str, str]]:
+    """
+    (pti, param), как ряд лежит в индексе, для пары, которую присылает страница графика — так же,
+    как её разрешают API рядов: LR Q → Q1; TERMOCOM — series_lookup (GACM 5019/4046 → G1 от «A»-объекта)
+    и полное имя объекта из UNITS ("5118" из списка → "5118/1"). Объект не найден → None.
+    """
+    if src == "lr":
+        return pti, LR_PARAM_ALIASES.get(param, param)
+    lookup_pti, lookup_param = series_lookup(pti, param)
+    unit_id = resolve_unit_id_by_ptc(lookup_pti)
+    name = get_units_directory().by_id.get(unit_id) if unit_id else None
+    return (name[3:], lookup_param) if name else None
+
+
+def series_days(src: str, pti: str, param: str, start: date, end: date) -> List[Dict[str, Any]]:
+    """
+    Полнота по дням одного ряда (для календаря графика); pti/param — как их шлёт страница графика.
+    Нет файла индекса или объекта → пустой список.
+    """
+    key = index_key(src, pti, param)
+    if key is None:
+        return []
+    pti, param = key
+    try:
+        conn = _connect(readonly=True)
+    except sqlite3.Error:
+        return []
+    try:
+        cur = conn.execute(
+            "SELECT * FROM completeness WHERE src = ? AND pti = ? AND param = ? AND day BETWEEN ? AND ? ORDER BY day",
+            (src, pti, param, start.isoformat(), end.isoformat()),
+        )
+        return [_as_dict(r) for r in cur.fetchall()]
+    except sqlite3.Error:
+        return []
+    finally:
+        conn.close()
+
+
+def worst(day: date, limit: int = 50, src: Optional[str] = None, param: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Худшие ряды за сутки (по возрастанию ratio) — индекс (day, ratio)."""
+    sql = "SELECT * FROM completeness WHERE day = ?"
+    args: List[Any] = [day.isoformat()]
+    if src:
+        sql += " AND src = ?"
+        args.append(src)
+    if param:
+        sql += " AND param = ?"
+        args.append(param)
+    sql += " ORDER BY ratio LIMIT ?"
+    args.append(int(limit))
+    try:
+        conn = _connect(readonly=True)
+    except sqlite3.Error:
+        return []
+    try:
+        return [_as_dict(r) for r in conn.execute(sql, args).fetchall()]
+    except sqlite3.Error:
+        return []
+    finally:
+        conn.close()
@@ -0,0 +1,169 @@
+# charts/costs.py
+# МОДУЛЬ: учёт стоимости запросов к API графиков (LR и TERMOCOM).
+#   - StageTimer — разбивка одного запроса по стадиям: catalog (поиск объекта/параметра),
+#     fetch (SQL / CGI прибора), parse, aggregate, serialize + сколько байт/точек пришло;
+#     отдаётся в debug=1 ответа;
+#   - record(...) складывает итог запроса в скользящие гистограммы задержек по серверу и по параметру
+#     (корзины по минутам, окно CHARTS_COSTS_WINDOW_MINUTES); query(...) — сводка для /charts/api/costs/.
+#     Режимы API (detail, agg, overlay, page, multi) копятся раздельно: дешёвые ответы из роллапов
+#     не должны размывать перцентили детальных рядов.
+# В debug=1 стоимость попадает в тело ответа до его рендера, поэтому serialize там нет;
+# в гистограммы запрос уходит уже с ней (рендерится ровно то тело, которое отдаётся клиенту).
+# Гистограммы живут в памяти процесса: у каждого воркера своя статистика.
+
+from __future__ import annotations
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+
+WINDOW_MINUTES = getattr(settings, "CHARTS_COSTS_WINDOW_MINUTES", 60)
+
+STAGES = ("catalog", "fetch", "parse", "aggregate", "serialize")
+MODES = ("detail", "agg", "overlay", "page", "multi")
+
+# верхние границы корзин гистограммы, мс (последняя — «всё, что дольше»)
+BOUNDS_MS: Tuple[float, ...] = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, float("inf"))
+
+
+class StageTimer:
+    """Засекает стадии одного запроса: with t.stage("fetch"): ...; t.add_bytes(len(raw))."""
+
+    def __init__(self) -> None:
+        self._t0 = time.perf_counter()
+        self.stages: Dict[str, float] = {}               # стадия → секунды (повтор стадии суммируется)
+        self.bytes = 0
+        self.points = 0
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        t = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - t
+
+    def add_bytes(self, n: int) -> None:
+        self.bytes += int(n)
+
+    @property
+    def total(self) -> float:
+        return time.perf_counter() - self._t0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "stages_ms": {k: round(v * 1000, 2) for k, v in self.stages.items()},
+            "total_ms": round(self.total * 1000, 2),
+            "bytes": self.bytes,
+            "points": self.points,
+        }
+
+
+class _Minute:
+    """Одна минутная корзина: гистограмма total + суммы по стадиям."""
+    __slots__ = ("minute", "hist", "count", "stage_sums", "bytes")
+
+    def __init__(self, minute: int) -> None:
+        self.minute = minute
+        self.hist = [0] * len(BOUNDS_MS)
+        self.count = 0
+        self.stage_sums: Dict[str, float] = {}
+        self.bytes = 0
+
+
+class _Rolling:
+    """Скользящее окно минутных корзин для одного ключа (сервер или параметр)."""
+
+    def __init__(self) -> None:
+        self.minutes: Deque[_Minute] = deque()
+
+    def add(self, now_min: int, total_ms: float, stages: Dict[str, float], nbytes: int) -> None:
+        if not self.minutes or self.minutes[-1].minute != now_min:
+            self.minutes.append(_Minute(now_min))
+        self._trim(now_min)
+        m = self.minutes[-1]
+        m.hist[bisect_left(BOUNDS_MS, total_ms)] += 1
+        m.count += 1
+        m.bytes += nbytes
+        for k, v in stages.items():
+            m.stage_sums[k] = m.stage_sums.get(k, 0.0) + v
+
+    def _trim(self, now_min: int) -> None:
+        while self.minutes and self.minutes[0].minute <= now_min - WINDOW_MINUTES:
+            self.minutes.popleft()
+
+    def summary(self, now_min: int, minutes: int) -> Optional[Dict[str, Any]]:
+        hist = [0] * len(BOUNDS_MS)
+        count = 0
+        nbytes = 0
+        stage_sums: Dict[str, float] = {}
+        for m in self.minutes:
+            if m.minute <= now_min - minutes:
+                continue
+            count += m.count
+            nbytes += m.bytes
+            for i, c in enumerate(m.hist):
+                hist[i] += c
+            for k, v in m.stage_sums.items():
+                stage_sums[k] = stage_sums.get(k, 0.0) + v
+        if not count:
+            return None
+        return {
+            "count": count,
+            "p50_ms": _hist_quantile(hist, count, 0.5),
+            "p95_ms": _hist_quantile(hist, count, 0.95),
+            "p99_ms": _hist_quantile(hist, count, 0.99),
+            "avg_stage_ms": {k: round(v * 1000 / count, 2) for k, v in stage_sums.items()},
+            "avg_bytes": nbytes // count,
+            "histogram": [
+                {"le_ms": None if b == float("inf") else b, "count": c} for b, c in zip(BOUNDS_MS, hist) if c
+            ],
+        }
+
+
+def _hist_quantile(hist: List[int], count: int, q: float) -> Optional[float]:
+    """Квантиль по гистограмме — верхняя граница корзины (для последней корзины — None)."""
+    target = q * count
+    acc = 0
+    for b, c in zip(BOUNDS_MS, hist):
+        acc += c
+        if acc >= target:
+            return None if b == float("inf") else b
+    return None
+
+
+_lock = threading.Lock()
+_by_key: Dict[Tuple[str, str, str, str], _Rolling] = {}     # (api, режим, "server"|"param", ключ) → окно
+
+
+def record(api: str, server: Any, param: str, timer: StageTimer, mode: str = "detail") -> None:
+    """Учесть завершённый запрос: api = 'lr' | 'tc', server — код сервера LR или 'termocom', mode — из MODES."""
+    now_min = int(time.time() // 60)
+    total_ms = timer.total * 1000
+    with _lock:
+        for kind, key in (("server", str(server)), ("param", str(param))):
+            r = _by_key.get((api, mode, kind, key))
+            if r is None:
+                r = _by_key[(api, mode, kind, key)] = _Rolling()
+            r.add(now_min, total_ms, timer.stages, timer.bytes)
+
+
+def query(by: str = "server", api: Optional[str] = None, minutes: int = WINDOW_MINUTES,
+          mode: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Сводка по ключам за последние minutes минут (отсортирована по p95, самые медленные сверху)."""
+    now_min = int(time.time() // 60)
+    minutes = max(1, min(int(minutes), WINDOW_MINUTES))
+    out: List[Dict[str, Any]] = []
+    with _lock:
+        for (a, m, kind, key), r in _by_key.items():
+            if kind != by or (api and a != api) or (mode and m != mode):
+                continue
+            s = r.summary(now_min, minutes)
+            if s:
+                out.append({"api": a, "mode": m, by: key, **s})
+    out.sort(key=lambda x: float("inf") if x["p95_ms"] is None else x["p95_ms"], reverse=True)
+    return out
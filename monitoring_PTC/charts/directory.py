@@ -0,0 +1,129 @@
+# charts/directory.py
+# МОДУЛЬ: справочник PTI × IDS в памяти процесса (для всех API графиков LR).
+# Зачем: раньше каждый SeriesView/ParamIdView открывал новое pyodbc-соединение и искал объект
+#        через WHERE LTRIM(RTRIM(CAST(p.pti ...))) = ? — такой предикат не использует индекс.
+#        Связка pti → IPs и колонка IDS → id_lovati меняется редко, поэтому держим её целиком в памяти.
+# Как обновляется:
+#   - раз в CHARTS_DIRECTORY_TTL секунд (по умолчанию 300) в фоне считается дешёвая подпись
+#     (COUNT + CHECKSUM_AGG по IDS и по «статичным» колонкам PTI);
+#   - если подпись изменилась — справочник перечитывается одним запросом, иначе просто продлевается.
+# Поиск по pti — O(1) (dict), ключ нормализуется так же, как в старом SQL (trim + без учёта регистра).
+
+from __future__ import annotations                          # аннотации типов на старых версиях Python
+from dataclasses import dataclass                           # неизменяемые записи справочника
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.conf import settings
+
+from .utils.db import fetchall                              # обёртка SELECT → список dict
+from .utils.refresh import RefreshingSnapshot               # снимок с фоновым обновлением
+
+DIRECTORY_TTL = getattr(settings, "CHARTS_DIRECTORY_TTL", 300)  # секунд между проверками подписи
+
+
+@dataclass(frozen=True)
+class PtiEntry:
+    """Одна строка PTI ⋈ IDS: всё, что нужно API графиков для объекта."""
+    pti: str                              # код объекта (строка, '3107', '2050.01', ...)
+    adres: str                            # адрес (adres_unicode)
+    ips: Optional[int]                    # код сервера LR (PTI.IPs)
+    type_obj: Optional[int]               # PTI.typeObj (0/1)
+    ids: Dict[str, Optional[str]]         # колонка IDS (lower) → id_lovati (trim) или None
+
+
+@dataclass(frozen=True)
+class PtiDirectory:
+    """Снимок справочника: строки в порядке ORDER BY pti и индекс по нормализованному pti."""
+    entries: Tuple[PtiEntry, ...]         # все строки (как отдавал LEFT JOIN, могут быть дубли pti)
+    by_pti: Dict[str, PtiEntry]           # первая строка для каждого pti
+
+    def get(self, pti: str) -> Optional[PtiEntry]:
+        return self.by_pti.get(normalize_pti(pti))
+
+
+def normalize_pti(pti: Any) -> str:
+    """Ключ поиска: как LTRIM(RTRIM(...)) = ? в SQL Server (collation без учёта регистра)."""
+    return str(pti).strip().upper()
+
+
+def _to_int_or_none(x) -> Optional[int]:
+    try:
+        return int(str(x).strip())
+    except (TypeError, ValueError):
+        return None
+
+
+def _ids_columns() -> List[str]:
+    """Фактический набор колонок IDS (кроме служебных) — чтобы не падать, если pompa2/pompa3 нет."""
+    rows = fetchall(
+        """
+        SELECT COLUMN_NAME AS cn
+        FROM INFORMATION_SCHEMA.COLUMNS
+        WHERE TABLE_NAME = 'IDS'
+        """
+    )
+    skip = {"id", "pti"}
+    return [str(r["cn"]) for r in rows if r.get("cn") and str(r["cn"]).lower() not in skip]
+
+
+def _load_directory() -> PtiDirectory:
+    """Полная загрузка PTI ⋈ IDS одним запросом."""
+    cols = _ids_columns()
+    ids_select = "".join(f",\n        i.[{c}] AS [ids__{c.lower()}]" for c in cols)
+    sql = f"""
+    SELECT
+        LTRIM(RTRIM(CAST(p.pti AS NVARCHAR(64)))) AS pti,
+        p.adres_unicode AS adres,
+        p.IPs           AS ips,
+        p.typeObj       AS type_obj{ids_select}
+    FROM [LOVATI].[dbo].[PTI] AS p
+    LEFT JOIN [LOVATI].[dbo].[IDS] AS i
+           ON p.id = i.PTI
+    ORDER BY p.pti ASC
+    """
+    entries: List[PtiEntry] = []
+    by_pti: Dict[str, PtiEntry] = {}
+    for d in fetchall(sql):
+        if d.get("pti") is None:
+            continue
+        ids = {
+            k[len("ids__"):]: (str(v).strip() if v else None)
+            for k, v in d.items() if k.startswith("ids__")
+        }
+        e = PtiEntry(
+            pti=str(d["pti"]).strip(),
+            adres=(d.get("adres") or "").strip(),
+            ips=_to_int_or_none(d.get("ips")),
+            type_obj=_to_int_or_none(d.get("type_obj")),
+            ids=ids,
+        )
+        entries.append(e)
+        by_pti.setdefault(normalize_pti(e.pti), e)   # как rows[0] в старом get_ips_and_param
+    return PtiDirectory(entries=tuple(entries), by_pti=by_pti)
+
+
+def _directory_signature() -> Tuple[Any, ...]:
+    """Дешёвая проверка изменений: количество строк и контрольные суммы IDS и статичных колонок PTI."""
+    rows = fetchall(
+        """
+        SELECT
+            (SELECT COUNT_BIG(*) FROM [LOVATI].[dbo].[IDS])                        AS ids_n,
+            (SELECT CHECKSUM_AGG(BINARY_CHECKSUM(*)) FROM [LOVATI].[dbo].[IDS])    AS ids_cs,
+            (SELECT COUNT_BIG(*) FROM [LOVATI].[dbo].[PTI])                        AS pti_n,
+            (SELECT CHECKSUM_AGG(BINARY_CHECKSUM(id, pti, IPs, typeObj, adres_unicode))
+               FROM [LOVATI].[dbo].[PTI])                                          AS pti_cs
+        """
+    )
+    d = rows[0] if rows else {}
+    return (d.get("ids_n"), d.get("ids_cs"), d.get("pti_n"), d.get("pti_cs"))
+
+
+# единственный снимок на процесс
+PTI_DIRECTORY: RefreshingSnapshot[PtiDirectory] = RefreshingSnapshot(
+    "charts:pti-directory", _load_directory, ttl=DIRECTORY_TTL, signature=_directory_signature,
+)
+
+
+def get_directory() -> PtiDirectory:
+    """Текущий снимок справочника (первый вызов загружает синхронно)."""
+    return PTI_DIRECTORY.get()
@@ -0,0 +1,94 @@
+# charts/export.py
+# МОДУЛЬ: потоковая выгрузка рядов графиков в CSV / XLSX (LR и TERMOCOM, несколько рядов в одном файле).
+#   - CSV: генератор строк для StreamingHttpResponse — точки идут от источника прямо в ответ;
+#     первый ряд открывается и первая точка читается ещё ДО ответа (недоступный источник → 502, а не
+#     пустой CSV со статусом 200); если источник падает уже посреди выдачи, в конец ряда пишется
+#     строка-маркер "#error", чтобы обрезанный файл не выглядел полным;
+#   - XLSX: openpyxl в write-only режиме, каждый ряд — отдельный лист; строки пишутся сразу
+#     во временный файл книги, списков в памяти нет; готовый файл отдаётся кусками через FileResponse.
+
+from __future__ import annotations
+import csv                                       # корректное экранирование CSV
+import logging
+import tempfile                                  # временный файл для XLSX
+from datetime import datetime
+from itertools import chain
+from typing import IO, Iterator, List, Optional, Tuple
+
+from .sources import ResolvedSeries, iter_points
+
+logger = logging.getLogger(__name__)
+
+CSV_HEADER = ("series", "src", "pti", "param", "time", "value")
+CSV_ERROR_MARK = "#error"                        # колонка series у строки-маркера сбоя посреди выгрузки
+
+
+class _Echo:
+    """Псевдо-файл для csv.writer: write() просто возвращает строку (рецепт из документации Django)."""
+    def write(self, value: str) -> str:
+        return value
+
+
+def iter_csv(series: List[ResolvedSeries], dt_start: datetime, dt_end: datetime) -> Iterator[str]:
+    """
+    CSV в «длинном» формате: одна строка = одна точка; ряды идут подряд.
+    Не генератор: первый ряд запрашивается здесь же, и ошибка источника на первой порции
+    поднимается исключением до того, как вью вернёт StreamingHttpResponse.
+    """
+    body = _csv_rows(series, dt_start, dt_end)
+    header = next(body)                          # до первого yield генератор успевает прочитать первую точку
+    return chain((header,), body)
+
+
+def _csv_rows(series: List[ResolvedSeries], dt_start: datetime, dt_end: datetime) -> Iterator[str]:
+    writer = csv.writer(_Echo())
+    points = iter_points(series[0], dt_start, dt_end) if series else iter(())
+    first: Optional[Tuple[datetime, float]] = next(points, None)                   # ошибка здесь уходит вызывающему iter_csv
+    yield writer.writerow(CSV_HEADER)
+
+    for i, rs in enumerate(series):
+        spec = rs.spec
+        try:
+            if i:
+                points = iter_points(rs, dt_start, dt_end)
+            elif first is not None:
+                dt, val = first
+                yield writer.writerow((spec.name, spec.src, spec.pti, spec.param, dt.isoformat(), val))
+            for dt, val in points:
+                yield writer.writerow((spec.name, spec.src, spec.pti, spec.param, dt.isoformat(), val))
+        except Exception as e:
+            logger.warning("export: %s failed mid-stream", spec.name, exc_info=True)
+            yield writer.writerow((CSV_ERROR_MARK, spec.src, spec.pti, spec.param, "",
+                                   f"{spec.name}: export incomplete: {e}"))
+
+
+def _sheet_title(name: str, used: set) -> str:
+    """Имя листа Excel: без запрещённых символов, ≤31 символа, уникальное."""
+    base = "".join("_" if c in '[]:*?/\\' else c for c in name)[:31] or "series"
+    title, i = base, 2
+    while title in used:
+        suffix = f"~{i}"
+        title = base[:31 - len(suffix)] + suffix
+        i += 1
+    used.add(title)
+    return title
+
+
+def write_xlsx(series: List[ResolvedSeries], dt_start: datetime, dt_end: datetime) -> IO[bytes]:
+    """Собрать XLSX (write-only) во временный файл и вернуть его открытым, с позицией в начале."""
+    from openpyxl import Workbook                # импорт здесь: модуль нужен только для экспорта
+
+    wb = Workbook(write_only=True)
+    used: set = set()
+    for rs in series:
+        ws = wb.create_sheet(title=_sheet_title(rs.spec.name, used))
+        ws.append(["time", "value"])
+        for dt, val in iter_points(rs, dt_start, dt_end):
+            ws.append([dt.replace(tzinfo=None), val])   # Excel не понимает tz — пишем локальное время
+    if not used:
+        wb.create_sheet(title="series").append(["time", "value"])
+
+    fh = tempfile.TemporaryFile(suffix=".xlsx")
+    wb.save(fh)
+    fh.seek(0)
+    return fh
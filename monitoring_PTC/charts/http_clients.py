@@ -3,6 +3,8 @@
 # Хранит карту серверов (IPS -> URL) и одну функцию fetch_xml, которая делает GET-запрос и
 # возвращает сырые байты XML без преобразований. Это удобно, потому что дальше парсер сам
 # разбирает bytes и не страдает от ошибок перекодировки.
+# open_xml_stream — тот же запрос с stream=True: тело не читается в память, его разбирают из r.raw
+# (xml_parser.iter_records_stream) — для экспорта длинных интервалов.
 
 from __future__ import annotations  # поддержка аннотаций типов в ранних версиях Python# нет влияния на рантайм
 import requests  # внешняя библиотека для HTTP-запросов# используем для GET
@@ -39,4 +41,26 @@ def fetch_xml(ips: int, param_id: str, start_epoch: int, stop_epoch: int, timeou
 
     r = requests.get(base, params=params, timeout=timeout)  # делаем HTTP GET с таймаутом
     r.raise_for_status()                                  # если код ответа не 2xx — бросит HTTPError
-    return r.content  # <-- байты                         # отдаём сырые байты XML без .text
\ No newline at end of file
+    return r.content  # <-- байты                         # отдаём сырые байты XML без .text
+
+
+def open_xml_stream(ips: int, param_id: str, start_epoch: int, stop_epoch: int,
+                    timeout: int = 15) -> requests.Response:
+    """
+    ФУНКЦИЯ: тот же запрос, что fetch_xml, но ответ открыт с stream=True и тело НЕ прочитано.
+    XML читается из r.raw по мере прихода; вызывающий обязан закрыть ответ (r.close()),
+    иначе соединение не вернётся в пул. Исключения — как у fetch_xml (статус проверен сразу).
+    """
+    base = SERVER_MAP.get(int(ips))
+    if not base:
+        raise ValueError(f"Unknown server code: {ips}")
+
+    params = {"param": str(param_id), "start": int(start_epoch), "stop": int(stop_epoch)}
+    r = requests.get(base, params=params, timeout=timeout, stream=True)
+    try:
+        r.raise_for_status()
+    except Exception:
+        r.close()
+        raise
+    r.raw.decode_content = True                           # gzip/deflate распаковывает urllib3, парсер видит чистый XML
+    return r
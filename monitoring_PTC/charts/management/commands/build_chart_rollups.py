@@ -0,0 +1,36 @@
+# monitoring_PTC/charts/management/commands/build_chart_rollups.py
+#
+# Ночной расчёт роллапов час/сутки для всех рядов LR и TERMOCOM (см. charts/rollups.py). Для cron:
+#   python manage.py build_chart_rollups                          — за вчера
+#   python manage.py build_chart_rollups --date 2025-11-17 --days 30   — 30 суток, заканчивая 17.11
+
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from monitoring_PTC.charts.chunks import local_today
+from monitoring_PTC.charts.rollups import build_rollups
+
+
+class Command(BaseCommand):
+    help = "Compute hourly and daily min/avg/max/count rollups for every LR and TERMOCOM series"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--date", help="last day to compute, YYYY-MM-DD (default: yesterday)")
+        parser.add_argument("--days", type=int, default=1, help="number of days ending at --date")
+        parser.add_argument("--workers", type=int, default=8, help="parallel LR device requests")
+        parser.add_argument("--source", choices=("lr", "tc", "all"), default="all")
+
+    def handle(self, *args, **options):
+        try:
+            last = date.fromisoformat(options["date"]) if options["date"] else local_today() - timedelta(days=1)
+        except ValueError as e:
+            raise CommandError(f"bad --date: {e}")
+        if last >= local_today():
+            raise CommandError("only closed days can be rolled up")
+        sources = ("lr", "tc") if options["source"] == "all" else (options["source"],)
+
+        for i in range(max(1, options["days"]) - 1, -1, -1):
+            day = last - timedelta(days=i)
+            n, errors = build_rollups(day, workers=options["workers"], sources=sources)
+            self.stdout.write(f"{day}: {n} series, {errors} errors")
@@ -0,0 +1,83 @@
+# charts/overlay.py
+# МОДУЛЬ: наложение «сегодня vs прошлые периоды» (day-over-day / week-over-week).
+# Каждый период (сутки) переносится на общую ось «время суток» (00:00 … 23:50) и ресемплится
+# в массив фиксированной длины: значение ячейки = среднее точек, попавших в интервал step.
+# Пустые ячейки → None (фронт рисует разрыв). Источник точек — любой «загрузчик суток»
+# (LR: суточные куски из chunks.py; TERMOCOM: SQL), поэтому модуль общий для обоих графиков.
+
+from __future__ import annotations
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .stats import SeriesSummary                      # сводка по каждому периоду
+from .timezone_utils import TZ_CHISINAU
+
+OVERLAY_MAX_PERIODS = 31                              # не больше месяца назад за один запрос
+OVERLAY_DEFAULT_STEP = 600                            # шаг оси по умолчанию: 10 минут
+
+DayPoints = List[Tuple[int, float]]                   # [(epoch_utc, value), ...]
+
+
+def parse_overlay_params(qp, today: date) -> Tuple[date, int, str, int]:
+    """
+    Разбор параметров режима overlay из query_params:
+      date=YYYY-MM-DD (опорные сутки, по умолчанию сегодня), periods=N (сколько прошлых периодов, 7),
+      period=day|week (шаг назад: сутки или неделя), step=сек (шаг оси, ≥60, делитель суток).
+    Ошибки формата → ValueError с понятным текстом.
+    """
+    date_s = (qp.get("date") or "").strip()
+    ref_day = date.fromisoformat(date_s) if date_s else today
+
+    periods = int(qp.get("periods") or 7)
+    if not 1 <= periods <= OVERLAY_MAX_PERIODS:
+        raise ValueError(f"periods must be 1..{OVERLAY_MAX_PERIODS}")
+
+    period = (qp.get("period") or "day").strip().lower()
+    if period not in ("day", "week"):
+        raise ValueError("period must be 'day' or 'week'")
+
+    step = int(qp.get("step") or OVERLAY_DEFAULT_STEP)
+    if step < 60 or 86400 % step != 0:
+        raise ValueError("step must be >= 60 seconds and divide 86400")
+    return ref_day, periods, period, step
+
+
+def overlay_days(ref_day: date, periods: int, period: str) -> List[date]:
+    """Опорные сутки + N прошлых: [ref, ref-1, ...] или [ref, ref-7, ...]."""
+    delta = timedelta(days=7 if period == "week" else 1)
+    return [ref_day - delta * i for i in range(periods + 1)]
+
+
+def time_axis(step: int) -> List[str]:
+    """Подписи общей оси: 'HH:MM' от 00:00 с шагом step."""
+    return [f"{s // 3600:02d}:{(s % 3600) // 60:02d}" for s in range(0, 86400, step)]
+
+
+def resample_day(points: Sequence[Tuple[int, float]], step: int) -> List[Optional[float]]:
+    """
+    Точки одних суток → массив длиной 86400/step по локальному времени суток (средние в ячейках).
+    Используем локальные «настенные» часы, поэтому сутки с переводом времени тоже ложатся на ту же ось.
+    """
+    n = 86400 // step
+    sums = [0.0] * n
+    cnts = [0] * n
+    for epoch, val in points:
+        lt = datetime.fromtimestamp(epoch, TZ_CHISINAU)
+        i = (lt.hour * 3600 + lt.minute * 60 + lt.second) // step
+        sums[i] += val
+        cnts[i] += 1
+    return [sums[i] / cnts[i] if cnts[i] else None for i in range(n)]
+
+
+def build_overlay(days: List[date], points_by_day: Dict[date, DayPoints], step: int) -> Dict[str, Any]:
+    """Собрать ответ overlay: общая ось + по массиву на каждый период (offset 0 — опорные сутки)."""
+    series: List[Dict[str, Any]] = []
+    for offset, day in enumerate(days):
+        pts = points_by_day.get(day) or []
+        series.append({
+            "date": day.isoformat(),
+            "offset": offset,
+            "values": resample_day(pts, step),
+            "summary": SeriesSummary().extend(v for _, v in pts).as_dict(),
+        })
+    return {"mode": "overlay", "step": step, "axis": time_axis(step), "series": series}
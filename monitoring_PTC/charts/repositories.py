@@ -4,27 +4,29 @@
 #   - get_object_by_pti(...) — получить один объект по коду pti (без фильтра по typeObj)
 #   - get_ips_and_param(...) — по (pti, param) вернуть {ips, param_id}
 #   - PARAM_COLUMNS — карта "имя параметра в API" -> "колонка в IDS"
+# Все функции читают из справочника в памяти (directory.py), а не из SQL.
 
 from __future__ import annotations  # поддержка аннотаций типов в ранних версиях Python  # не влияет на рантайм
-from typing import List, Dict, Any, Iterable
-from .utils.db import fetchall  # обёртка для выполнения SQL и получения списка dict
+import re                                            # проверка «в id есть буква»
+from typing import List, Dict, Any
+from .directory import get_directory  # кэш PTI × IDS в памяти процесса
 
 
-def _to_int_or_none(x):
-    """Пытается привести x к int; при ошибке возвращает None (удобно для p.IPs)."""
-    try:
-        return int(str(x).strip())
-    except (TypeError, ValueError):
-        return None
+# колонки IDS, наличие хотя бы одного валидного id в которых делает объект видимым в списке
+CATALOG_ID_COLUMNS: tuple[str, ...] = (
+    "t1", "t2", "t31", "t32", "t41", "t42", "t43", "t44",
+    "q1", "g1", "g2", "dg", "dt", "tacm", "gacm", "gadaos", "sursa",
+)
+
+_HAS_LETTER = re.compile(r"[A-Za-z]")
 
 
-def _where_typeobj(types: Iterable[int]) -> tuple[str, tuple]:
-    """Собирает фрагмент WHERE для p.typeObj с плейсхолдерами %s и кортеж параметров."""
-    t = [int(v) for v in types]
-    if len(t) == 1:
-        return "p.typeObj = %s", (t[0],)
-    ph = ",".join(["%s"] * len(t))
-    return f"p.typeObj IN ({ph})", tuple(t)
+def is_valid_id(v) -> bool:
+    """Как в старом SQL: не NULL, не пусто, не '0' и содержит латинскую букву (PATINDEX('%[A-Za-z]%'))."""
+    if v is None:
+        return False
+    s = str(v).strip()
+    return s not in ("", "0") and _HAS_LETTER.search(s) is not None
 
 
 def list_objects(type_obj: int | list[int] = 0) -> List[Dict[str, Any]]:
@@ -34,52 +36,26 @@ def list_objects(type_obj: int | list[int] = 0) -> List[Dict[str, Any]]:
 
     По умолчанию поведение прежнее: type_obj=0.
     Для объединённого списка используйте [0, 1].
+    Фильтрация идёт по справочнику в памяти (directory.py) — 17 OR-условий по IDS больше не гоняем в SQL.
     """
     if isinstance(type_obj, (list, tuple, set)):
-        where_t, params_t = _where_typeobj(type_obj)
+        types = {int(v) for v in type_obj}
     else:
-        where_t, params_t = _where_typeobj([type_obj])
-
-    # адрес берём из unicode-поля
-    sql = f"""
-    SELECT
-        p.pti,
-        p.adres_unicode AS adres,
-        p.IPs   AS ips,
-        i.T1    AS id_t1,
-        i.T2    AS id_t2
-    FROM [LOVATI].[dbo].[PTI] AS p
-    LEFT JOIN [LOVATI].[dbo].[IDS] AS i
-           ON p.id = i.PTI
-    WHERE {where_t}
-      AND (
-            (i.T1    IS NOT NULL AND LTRIM(RTRIM(i.T1    )) <> '' AND LTRIM(RTRIM(i.T1    )) <> '0' AND PATINDEX('%[A-Za-z]%', i.T1    ) > 0) OR
-            (i.T2    IS NOT NULL AND LTRIM(RTRIM(i.T2    )) <> '' AND LTRIM(RTRIM(i.T2    )) <> '0' AND PATINDEX('%[A-Za-z]%', i.T2    ) > 0) OR
-            (i.T31   IS NOT NULL AND LTRIM(RTRIM(i.T31   )) <> '' AND LTRIM(RTRIM(i.T31   )) <> '0' AND PATINDEX('%[A-Za-z]%', i.T31   ) > 0) OR
-            (i.T32   IS NOT NULL AND LTRIM(RTRIM(i.T32   )) <> '' AND LTRIM(RTRIM(i.T32   )) <> '0' AND PATINDEX('%[A-Za-z]%', i.T32   ) > 0) OR
-            (i.T41   IS NOT NULL AND LTRIM(RTRIM(i.T41   )) <> '' AND LTRIM(RTRIM(i.T41   )) <> '0' AND PATINDEX('%[A-Za-z]%', i.T41   ) > 0) OR
-            (i.T42   IS NOT NULL AND LTRIM(RTRIM(i.T42   )) <> '' AND LTRIM(RTRIM(i.T42   )) <> '0' AND PATINDEX('%[A-Za-z]%', i.T42   ) > 0) OR
-            (i.T43   IS NOT NULL AND LTRIM(RTRIM(i.T43   )) <> '' AND LTRIM(RTRIM(i.T43   )) <> '0' AND PATINDEX('%[A-Za-z]%', i.T43   ) > 0) OR
-            (i.T44   IS NOT NULL AND LTRIM(RTRIM(i.T44   )) <> '' AND LTRIM(RTRIM(i.T44   )) <> '0' AND PATINDEX('%[A-Za-z]%', i.T44   ) > 0) OR
-            (i.Q1    IS NOT NULL AND LTRIM(RTRIM(i.Q1    )) <> '' AND LTRIM(RTRIM(i.Q1    )) <> '0' AND PATINDEX('%[A-Za-z]%', i.Q1    ) > 0) OR
-            (i.G1    IS NOT NULL AND LTRIM(RTRIM(i.G1    )) <> '' AND LTRIM(RTRIM(i.G1    )) <> '0' AND PATINDEX('%[A-Za-z]%', i.G1    ) > 0) OR
-            (i.G2    IS NOT NULL AND LTRIM(RTRIM(i.G2    )) <> '' AND LTRIM(RTRIM(i.G2    )) <> '0' AND PATINDEX('%[A-Za-z]%', i.G2    ) > 0) OR
-            (i.DG    IS NOT NULL AND LTRIM(RTRIM(i.DG    )) <> '' AND LTRIM(RTRIM(i.DG    )) <> '0' AND PATINDEX('%[A-Za-z]%', i.DG    ) > 0) OR
-            (i.DT    IS NOT NULL AND LTRIM(RTRIM(i.DT    )) <> '' AND LTRIM(RTRIM(i.DT    )) <> '0' AND PATINDEX('%[A-Za-z]%', i.DT    ) > 0) OR
-            (i.TACM  IS NOT NULL AND LTRIM(RTRIM(i.TACM  )) <> '' AND LTRIM(RTRIM(i.TACM  )) <> '0' AND PATINDEX('%[A-Za-z]%', i.TACM  ) > 0) OR
-            (i.GACM  IS NOT NULL AND LTRIM(RTRIM(i.GACM  )) <> '' AND LTRIM(RTRIM(i.GACM  )) <> '0' AND PATINDEX('%[A-Za-z]%', i.GACM  ) > 0) OR
-            (i.GADAOS IS NOT NULL AND LTRIM(RTRIM(i.GADAOS)) <> '' AND LTRIM(RTRIM(i.GADAOS)) <> '0' AND PATINDEX('%[A-Za-z]%', i.GADAOS) > 0) OR
-            (i.SURSA IS NOT NULL AND LTRIM(RTRIM(i.SURSA )) <> '' AND LTRIM(RTRIM(i.SURSA )) <> '0' AND PATINDEX('%[A-Za-z]%', i.SURSA ) > 0)
-          )
-    ORDER BY p.pti ASC
-    """
-    rows = fetchall(sql, params_t)
-    for d in rows:
-        d["pti"] = str(d["pti"]).strip() if d.get("pti") is not None else None
-        d["ips"] = _to_int_or_none(d.get("ips"))
-        d["adres"] = (d.get("adres") or "").strip()
-        d["id_t1"] = None if not d.get("id_t1") else str(d["id_t1"]).strip()
-        d["id_t2"] = None if not d.get("id_t2") else str(d["id_t2"]).strip()
+        types = {int(type_obj)}
+
+    rows: List[Dict[str, Any]] = []
+    for e in get_directory().entries:                     # уже в порядке ORDER BY p.pti
+        if e.type_obj not in types:
+            continue
+        if not any(is_valid_id(e.ids.get(c)) for c in CATALOG_ID_COLUMNS):
+            continue
+        rows.append({
+            "pti": e.pti,
+            "adres": e.adres,
+            "ips": e.ips,
+            "id_t1": e.ids.get("t1") or None,
+            "id_t2": e.ids.get("t2") or None,
+        })
     return rows
 
 
@@ -87,30 +63,19 @@ def get_object_by_pti(pti: str) -> Dict[str, Any] | None:
     """
     Один объект по коду pti (строка). Нужны ips и ids T1/T2.
     БЕЗ ограничения по typeObj — подходит и для 0, и для 1.
+    Берётся из справочника в памяти (O(1)), SQL в пути запроса нет.
     """
-    sql = """
-    SELECT
-        p.pti,
-        p.adres_unicode AS adres,
-        p.IPs   AS ips,
-        i.T1    AS id_t1,
-        i.T2    AS id_t2
-    FROM [LOVATI].[dbo].[PTI] AS p
-    LEFT JOIN [LOVATI].[dbo].[IDS] AS i
-           ON p.id = i.PTI
-    WHERE LTRIM(RTRIM(CAST(p.pti AS NVARCHAR(64)))) = %s
-    """
-    rows = fetchall(sql, (str(pti).strip(),))
-    if not rows:
+    e = get_directory().get(pti)
+    if e is None:
         return None
 
-    d = rows[0]
-    d["pti"] = str(d.get("pti") or "").strip()
-    d["ips"] = _to_int_or_none(d.get("ips"))
-    d["adres"] = (d.get("adres") or "").strip()
-    d["id_t1"] = None if not d.get("id_t1") else str(d["id_t1"]).strip()
-    d["id_t2"] = None if not d.get("id_t2") else str(d["id_t2"]).strip()
-    return d
+    return {
+        "pti": e.pti,
+        "adres": e.adres,
+        "ips": e.ips,
+        "id_t1": e.ids.get("t1") or None,
+        "id_t2": e.ids.get("t2") or None,
+    }
 
 
 # === карта поддерживаемых параметров (имя в API -> колонка в LOVATI.dbo.IDS) ===
@@ -138,32 +103,26 @@ PARAM_COLUMNS: Dict[str, str] = {
     "POMPA3": "pompa3",
 }
 
+# параметры-синонимы (тот же столбец IDS): ночные индексы считают ряд один раз, под каноническим именем
+LR_PARAM_ALIASES: Dict[str, str] = {"Q": "Q1"}
+
 
 def get_ips_and_param(pti: str, param: str) -> Dict[str, Any] | None:
     """
     По pti и имени параметра (из PARAM_COLUMNS) вернуть {ips, param_id}.
     Берём PTI.IPs и IDS.<column> для данного параметра. Подходит для typeObj 0/1.
+    Поиск идёт по справочнику в памяти (directory.py), а не отдельным SQL-запросом.
     """
     key = (param or "").strip().upper()
     col = PARAM_COLUMNS.get(key)
     if not col:
         return None
 
-    sql = f"""
-    SELECT
-        p.IPs AS ips,
-        i.{col} AS param_id
-    FROM [LOVATI].[dbo].[PTI] AS p
-    LEFT JOIN [LOVATI].[dbo].[IDS] AS i
-           ON p.id = i.PTI
-    WHERE LTRIM(RTRIM(CAST(p.pti AS NVARCHAR(64)))) = %s
-    """
-    rows = fetchall(sql, (str(pti).strip(),))
-    if not rows:
+    e = get_directory().get(pti)
+    if e is None:
         return None
 
-    d = rows[0]
     return {
-        "ips": _to_int_or_none(d.get("ips")),
-        "param_id": (str(d.get("param_id")).strip() if d.get("param_id") else None),
-    }
\ No newline at end of file
+        "ips": e.ips,
+        "param_id": e.ids.get(col.lower()),
+    }
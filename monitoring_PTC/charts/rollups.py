@@ -0,0 +1,287 @@
+# charts/rollups.py
+# МОДУЛЬ: ночные роллапы рядов (час / сутки) для LR и TERMOCOM5.
+# Любой многонедельный график раньше пересчитывал агрегаты из сырых точек при каждом запросе.
+# Команда manage.py build_chart_rollups раз в сутки считает по каждому PTC × параметру
+# count/min/avg/max (+ m2 для точной σ) за каждый час и за сутки и пишет их в SQLite (storage/).
+# API рядов с agg=hour|day берут самый грубый роллап, шаг которого укладывается в запрошенный,
+# а за дни, которых в роллапах ещё нет (сегодня, не посчитанные сутки), досчитывают вживую.
+# Время бакета — «настенные» локальные секунды (как в termocom_charts.repositories), метки
+# совпадают с агрегатами TERMOCOM из SQL.
+
+from __future__ import annotations
+import logging
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, time as dtime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+
+from .chunks import load_lr_days                              # точки LR по суткам
+from .completeness import lr_series_jobs                      # все (pti, param, ips, param_id) LR
+from .repositories import LR_PARAM_ALIASES                     # Q → Q1: ряд посчитан под одним именем
+from .stats import SeriesSummary
+from .timezone_utils import TZ_CHISINAU
+
+from monitoring_PTC.termocom_charts.directory import get_units_directory
+from monitoring_PTC.termocom_charts.repositories import (
+    fetch_termocom_hourly_stats,
+    wall_datetime,
+    wall_seconds,
+)
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_PATH = getattr(
+    settings, "CHARTS_ROLLUP_PATH", Path(settings.BASE_DIR) / "storage" / "chart_rollups.sqlite3"
+)
+
+# разрешения от грубого к мелкому: имя → длина бакета, сек
+RESOLUTIONS: Tuple[Tuple[str, int], ...] = (("day", 86400), ("hour", 3600))
+
+# (начало бакета в «настенных» секундах, count, min, avg, max, m2)
+Bucket = Tuple[int, int, float, float, float, float]
+
+_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS rollup (
+        src   TEXT    NOT NULL,
+        pti   TEXT    NOT NULL,
+        param TEXT    NOT NULL,
+        res   TEXT    NOT NULL,
+        ts    INTEGER NOT NULL,
+        n     INTEGER NOT NULL,
+        vmin  REAL    NOT NULL,
+        vavg  REAL    NOT NULL,
+        vmax  REAL    NOT NULL,
+        m2    REAL    NOT NULL,
+        PRIMARY KEY (src, pti, param, res, ts)
+    ) WITHOUT ROWID;
+    -- какие сутки уже посчитаны: по ряду (LR — приборы опрашиваются по одному)
+    -- или целиком по источнику, pti = param = '*' (TERMOCOM — один запрос на все объекты)
+    CREATE TABLE IF NOT EXISTS coverage (
+        src   TEXT NOT NULL,
+        pti   TEXT NOT NULL,
+        param TEXT NOT NULL,
+        day   TEXT NOT NULL,
+        PRIMARY KEY (src, pti, param, day)
+    ) WITHOUT ROWID;
+"""
+
+
+def _connect(readonly: bool = False) -> sqlite3.Connection:
+    if readonly:
+        return sqlite3.connect(f"file:{ROLLUP_PATH}?mode=ro", uri=True, timeout=5)
+    conn = sqlite3.connect(str(ROLLUP_PATH), timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def pick_resolution(bucket_seconds: int) -> Optional[str]:
+    """Самый грубый роллап, из бакетов которого складывается бакет запроса (day для суток, hour для часа)."""
+    for name, size in RESOLUTIONS:
+        if bucket_seconds >= size and bucket_seconds % size == 0:
+            return name
+    return None
+
+
+# ---------- бакеты ----------
+
+def _merge(a: Bucket, b: Bucket) -> Bucket:
+    """Слить два бакета (формула Чана для m2)."""
+    ts, n1, mn1, mean1, mx1, m21 = a
+    _, n2, mn2, mean2, mx2, m22 = b
+    n = n1 + n2
+    delta = mean2 - mean1
+    return (ts, n, min(mn1, mn2), mean1 + delta * n2 / n, max(mx1, mx2), m21 + m22 + delta * delta * n1 * n2 / n)
+
+
+def bucket_points(points: Iterable[Tuple[datetime, float]], step: int) -> List[Bucket]:
+    """Точки (aware datetime, value) → бакеты по «настенному» локальному времени с шагом step (Уэлфорд в бакете)."""
+    acc: Dict[int, List[float]] = {}                  # ts → [n, min, mean, max, m2]
+    for dt, val in points:
+        wall = wall_seconds(dt.astimezone(TZ_CHISINAU).replace(tzinfo=None))
+        ts = wall - wall % step
+        a = acc.get(ts)
+        if a is None:
+            acc[ts] = [1, val, val, val, 0.0]
+            continue
+        a[0] += 1
+        if val < a[1]:
+            a[1] = val
+        if val > a[3]:
+            a[3] = val
+        delta = val - a[2]
+        a[2] += delta / a[0]
+        a[4] += delta * (val - a[2])
+    return [(ts, int(a[0]), a[1], a[2], a[3], a[4]) for ts, a in sorted(acc.items())]
+
+
+def coarsen(buckets: Iterable[Bucket], step: int) -> List[Bucket]:
+    """Слить бакеты в более крупные с шагом step (часы → 2 часа, сутки → неделя и т.п.)."""
+    out: List[Bucket] = []
+    for b in buckets:
+        ts = b[0] - b[0] % step
+        b = (ts,) + tuple(b[1:])                      # type: ignore[assignment]
+        if out and out[-1][0] == ts:
+            out[-1] = _merge(out[-1], b)
+        else:
+            out.append(b)
+    return out
+
+
+def agg_payload(agg: str, buckets: List[Bucket]) -> Dict[str, Any]:
+    """Ответ agg-режима (общий для LR и TERMOCOM): labels/values(среднее)/min/max/count + summary по всему ряду."""
+    summary = SeriesSummary()
+    labels: List[str] = []
+    values: List[float] = []
+    mins: List[float] = []
+    maxs: List[float] = []
+    counts: List[int] = []
+    for ts, n, vmin, vavg, vmax, m2 in buckets:
+        labels.append(wall_datetime(ts).isoformat())
+        values.append(vavg)
+        mins.append(vmin)
+        maxs.append(vmax)
+        counts.append(n)
+        summary.add_bucket(n, vavg, m2, vmin, vmax)
+    return {
+        "agg": agg,
+        "labels": labels,
+        "values": values,
+        "min": mins,
+        "max": maxs,
+        "count": counts,
+        "summary": summary.as_dict(),
+    }
+
+
+# ---------- чтение ----------
+
+def read_rollup(
+    src: str, pti: str, param: str, bucket_seconds: int, start: datetime, end: datetime,
+) -> Tuple[List[Bucket], Optional[datetime]]:
+    """
+    Бакеты из роллапов за непрерывный «покрытый» префикс интервала [start, end] (naive локальное время).
+    Вернёт (бакеты с шагом bucket_seconds, начало непокрытой части или None, если покрыто всё).
+    Нет подходящего роллапа / файла / первого дня → ([], start): всё считать вживую.
+    """
+    res = pick_resolution(bucket_seconds)
+    if res is None:
+        return [], start
+    if src == "lr":
+        param = LR_PARAM_ALIASES.get(param, param)
+    try:
+        conn = _connect(readonly=True)
+    except sqlite3.Error:
+        return [], start
+    try:
+        day = start.date()
+        last = end.date()
+        covered = {
+            r[0] for r in conn.execute(
+                "SELECT day FROM coverage WHERE src = ? AND ((pti = ? AND param = ?) OR pti = '*') "
+                "AND day BETWEEN ? AND ?",
+                (src, pti, param, day.isoformat(), last.isoformat()),
+            )
+        }
+        while day <= last and day.isoformat() in covered:
+            day += timedelta(days=1)
+        if day == start.date():
+            return [], start
+
+        rest = datetime.combine(day, dtime.min) if day <= last else None
+        hi = wall_seconds(rest) - 1 if rest else wall_seconds(end)
+        lo = wall_seconds(start)
+        lo -= lo % dict(RESOLUTIONS)[res]
+        rows = conn.execute(
+            "SELECT ts, n, vmin, vavg, vmax, m2 FROM rollup "
+            "WHERE src = ? AND pti = ? AND param = ? AND res = ? AND ts BETWEEN ? AND ? ORDER BY ts",
+            (src, pti, param, res, lo, hi),
+        ).fetchall()
+        return coarsen(rows, bucket_seconds), rest
+    except sqlite3.Error:
+        logger.exception("rollup read failed")
+        return [], start
+    finally:
+        conn.close()
+
+
+# ---------- ночной расчёт ----------
+
+def _day_rows(src: str, pti: str, param: str, day: date, hourly: List[Bucket]) -> List[tuple]:
+    rows = [(src, pti, param, "hour") + tuple(b) for b in hourly]
+    rows += [(src, pti, param, "day") + tuple(b) for b in coarsen(hourly, 86400)]
+    return rows
+
+
+def _lr_hourly(job: Tuple[str, str, int, str], day: date) -> List[Bucket]:
+    _, _, ips, param_id = job
+    points_by_day, _ = load_lr_days(ips, param_id, [day])
+    return bucket_points(((datetime.fromtimestamp(e, TZ_CHISINAU), v) for e, v in points_by_day.get(day) or []), 3600)
+
+
+def build_rollups(day: date, workers: int = 8, sources: Iterable[str] = ("lr", "tc")) -> Tuple[int, int]:
+    """
+    Посчитать и записать часовые и суточные роллапы за одни (закрытые) сутки. Вернёт (рядов, ошибок).
+    Суточный бакет получается слиянием часовых — моменты точные, повторного чтения нет.
+    """
+    series: List[Tuple[str, str, str, List[Bucket]]] = []
+    covered: List[Tuple[str, str, str]] = []          # отметки coverage
+    errors = 0
+
+    if "lr" in sources:
+        jobs = lr_series_jobs()
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="charts-rollups") as ex:
+            futures = [ex.submit(_lr_hourly, job, day) for job in jobs]
+            for job, fut in zip(jobs, futures):
+                try:
+                    hourly = fut.result()
+                    series.append(("lr", job[0], job[1], hourly))
+                    # сутки без единой точки не отмечаем посчитанными: прибор мог просто не отдать данные,
+                    # такие сутки API досчитает вживую, а следующий ночной проход попробует снова
+                    if hourly:
+                        covered.append(("lr", job[0], job[1]))
+                except Exception:
+                    errors += 1
+                    logger.warning("rollups: lr %s %s failed", job[0], job[1], exc_info=True)
+
+    if "tc" in sources:
+        try:
+            day_start = datetime.combine(day, dtime.min)
+            base = wall_seconds(day_start)
+            by_id = get_units_directory().by_id
+            for (unit_id, param), hours in fetch_termocom_hourly_stats(day_start).items():
+                name = by_id.get(unit_id)
+                if not name:
+                    continue
+                hourly = [(base + h * 3600, n, vmin, vavg, vmax, max(sumsq - n * vavg * vavg, 0.0))
+                          for h, n, vmin, vavg, vmax, sumsq in sorted(hours)]
+                series.append(("tc", name[3:], param, hourly))
+            covered.append(("tc", "*", "*"))
+        except Exception:
+            errors += 1
+            logger.exception("rollups: termocom failed")
+
+    lo = wall_seconds(datetime.combine(day, dtime.min))
+    conn = _connect()
+    try:
+        for src, pti, param, hourly in series:
+            # сутки пересчитываются целиком: сначала чистим старые бакеты этих суток
+            conn.execute(
+                "DELETE FROM rollup WHERE src = ? AND pti = ? AND param = ? AND ts BETWEEN ? AND ?",
+                (src, pti, param, lo, lo + 86399),
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO rollup VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                _day_rows(src, pti, param, day, hourly),
+            )
+        conn.executemany(
+            "INSERT OR REPLACE INTO coverage VALUES (?, ?, ?, ?)",
+            [(src, pti, param, day.isoformat()) for src, pti, param in covered],
+        )
+        conn.commit()
+    finally:
+        conn.close()
+    return len(series), errors
@@ -27,6 +27,10 @@ class SeriesSummarySerializer(serializers.Serializer):  # агрегирован
     avg = serializers.FloatField(allow_null=True)       # среднее (float) или null
     median = serializers.FloatField(allow_null=True)    # медиана (float) или null
     stdev = serializers.FloatField(allow_null=True)     # стандартное отклонение (float) или null
+    variance = serializers.FloatField(allow_null=True, required=False)  # дисперсия (популяционная) или null
+    p5 = serializers.FloatField(allow_null=True, required=False)        # 5-й перцентиль (приближённо, скетч)
+    p50 = serializers.FloatField(allow_null=True, required=False)       # 50-й перцентиль (= median)
+    p95 = serializers.FloatField(allow_null=True, required=False)       # 95-й перцентиль (приближённо, скетч)
 
 # --- Ответ эндпоинта /charts/api/series: метки времени, значения и статистика ---
 class SeriesResponseSerializer(serializers.Serializer):   # структура ответа для графика
@@ -0,0 +1,102 @@
+# charts/sources.py
+# МОДУЛЬ: единый доступ к рядам обоих источников (LR-приборы и TERMOCOM5) для экспорта и сравнения.
+# Описание ряда — строка "src:pti:param", например "lr:3107:T1" или "tc:5020:G1".
+#   - resolve_series(...) проверяет ряд заранее (есть ли объект/параметр) и бросает LookupError/ValueError,
+#     чтобы ошибку можно было вернуть кодом 4xx ДО начала потоковой выдачи;
+#   - iter_points(...) — генератор точек (aware datetime Europe/Chisinau, value) без сборки списков.
+
+from __future__ import annotations
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Iterator, List, Optional, Tuple
+
+from .repositories import get_ips_and_param, PARAM_COLUMNS       # LR: сервер и id параметра
+from .http_clients import open_xml_stream                         # LR: HTTP к прибору (stream=True)
+from .xml_parser import iter_records_stream                       # LR: разбор XML из потока (XMLPullParser)
+from .timezone_utils import TZ_CHISINAU, to_epoch_seconds
+
+from monitoring_PTC.termocom_charts.repositories import (         # TERMOCOM: UNITS и HTREND-таблицы
+    TERMOCOM_PARAM_MAP,
+    resolve_unit_id_by_ptc,
+    iter_termocom_series,
+    series_lookup,
+)
+
+SOURCES = ("lr", "tc")
+
+
+@dataclass(frozen=True)
+class SeriesSpec:
+    src: str          # 'lr' | 'tc'
+    pti: str          # код объекта
+    param: str        # код параметра (верхний регистр)
+
+    @property
+    def name(self) -> str:
+        return f"{self.src}:{self.pti}:{self.param}"
+
+
+@dataclass(frozen=True)
+class ResolvedSeries:
+    spec: SeriesSpec
+    ips: Optional[int] = None        # LR: код сервера
+    param_id: Optional[str] = None   # LR: id параметра в LOVATI
+    unit_id: Optional[int] = None    # TC: UNIT_ID в TERMOCOM5
+    tc_param: Optional[str] = None   # TC: фактически читаемый параметр (GACM → G1 для 5019/4046)
+
+
+def parse_series_specs(raw: str) -> List[SeriesSpec]:
+    """'lr:3107:T1,tc:5020:G1' → [SeriesSpec, ...]. Формат нарушен → ValueError."""
+    out: List[SeriesSpec] = []
+    for part in (raw or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        bits = part.split(":")
+        if len(bits) != 3:
+            raise ValueError(f"bad series '{part}', expected src:pti:param")
+        src, pti, param = bits[0].strip().lower(), bits[1].strip(), bits[2].strip().upper()
+        if src not in SOURCES or not pti or not param:
+            raise ValueError(f"bad series '{part}', src must be one of {', '.join(SOURCES)}")
+        out.append(SeriesSpec(src=src, pti=pti, param=param))
+    return out
+
+
+def resolve_series(spec: SeriesSpec) -> ResolvedSeries:
+    """Проверить ряд и найти всё, что нужно для чтения. Нет объекта/маппинга → LookupError."""
+    if spec.src == "lr":
+        if spec.param not in PARAM_COLUMNS:
+            raise ValueError(f"{spec.name}: param not supported")
+        info = get_ips_and_param(spec.pti, spec.param)
+        if not info or not info.get("ips") or not info.get("param_id"):
+            raise LookupError(f"{spec.name}: pti not found or no mapping")
+        return ResolvedSeries(spec=spec, ips=int(info["ips"]), param_id=str(info["param_id"]))
+
+    if spec.param not in TERMOCOM_PARAM_MAP:
+        raise ValueError(f"{spec.name}: param not supported")
+    lookup_pti, lookup_param = series_lookup(spec.pti, spec.param)
+    unit_id = resolve_unit_id_by_ptc(lookup_pti)
+    if not unit_id:
+        raise LookupError(f"{spec.name}: PTC '{lookup_pti}' not found or not enabled in TERMOCOM5")
+    return ResolvedSeries(spec=spec, unit_id=int(unit_id), tc_param=lookup_param)
+
+
+def iter_points(rs: ResolvedSeries, dt_start: datetime, dt_end: datetime) -> Iterator[Tuple[datetime, float]]:
+    """
+    Точки ряда в интервале [dt_start, dt_end] (aware, локальное время) — генератором.
+    LR отдаёт записи в порядке XML прибора (разбор идёт прямо из HTTP-потока); TERMOCOM — ORDER BY по времени.
+    Оборванный/испорченный XML прибора → DeviceXMLError посреди выдачи (а не молча урезанный ряд).
+    """
+    if rs.spec.src == "lr":
+        r = open_xml_stream(rs.ips, rs.param_id, to_epoch_seconds(dt_start), to_epoch_seconds(dt_end))
+        try:
+            yield from iter_records_stream(r.raw, strict=True)
+        finally:
+            r.close()
+        return
+
+    # TERMOCOM хранит локальное naive-время
+    start_naive = dt_start.astimezone(TZ_CHISINAU).replace(tzinfo=None)
+    end_naive = dt_end.astimezone(TZ_CHISINAU).replace(tzinfo=None)
+    for ts, val in iter_termocom_series(rs.unit_id, rs.tc_param, start_naive, end_naive):
+        yield ts.replace(tzinfo=TZ_CHISINAU), val
@@ -0,0 +1,203 @@
+# charts/stats.py
+# МОДУЛЬ: однопроходная статистика по временным рядам (общая для LR и TERMOCOM графиков).
+# Что считает:
+#   - count / min / max / mean / variance — за ОДИН проход по алгоритму Уэлфорда
+#     (без хранения всех значений и без повторных проходов, как было со statistics.*);
+#   - приближённые перцентили p5 / p50 / p95 — через компактный скетч с ограниченной памятью
+#     (пока точек меньше ёмкости скетча — результат точный, медиана совпадает со statistics.median).
+# Сводки можно наполнять по кусочкам (add/extend) и сливать между собой (merge) —
+# удобно, когда ряд приходит потоком или собирается из закэшированных суточных кусков.
+
+from __future__ import annotations                     # аннотации типов на старых версиях Python
+import math                                            # sqrt / isfinite
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+class QuantileSketch:
+    """
+    Скетч квантилей с ограниченной памятью (упрощённый KLL).
+    Уровень h хранит элементы веса 2**h; когда уровень заполняется до capacity,
+    он сортируется и «прореживается»: каждый второй элемент уходит на уровень выше с удвоенным весом.
+    Память: O(capacity · log(n / capacity)); до capacity точек — точный ответ.
+    """
+
+    def __init__(self, capacity: int = 2048):
+        self.capacity = max(8, int(capacity))
+        self._levels: List[List[float]] = [[]]          # levels[h] — элементы веса 2**h
+        self._offsets: List[int] = [0]                  # чередуем смещение прореживания (без систематического сдвига)
+
+    @property
+    def is_exact(self) -> bool:
+        """True, пока не было ни одного прореживания (все точки хранятся как есть)."""
+        return len(self._levels) == 1
+
+    def add(self, x: float) -> None:
+        self._levels[0].append(x)
+        if len(self._levels[0]) >= self.capacity:
+            self._compact(0)
+
+    def merge(self, other: "QuantileSketch") -> None:
+        for h, items in enumerate(other._levels):
+            while len(self._levels) <= h:
+                self._levels.append([])
+                self._offsets.append(0)
+            self._levels[h].extend(items)
+        for h in range(len(self._levels)):
+            if len(self._levels[h]) >= self.capacity:
+                self._compact(h)
+
+    def _compact(self, h: int) -> None:
+        while h < len(self._levels) and len(self._levels[h]) >= self.capacity:
+            items = sorted(self._levels[h])
+            off = self._offsets[h]
+            self._offsets[h] ^= 1
+            keep: List[float] = []
+            if len(items) % 2 == 1:                     # лишний элемент оставляем на своём уровне (край чередуем)
+                keep.append(items.pop(0) if off else items.pop())
+            if h + 1 == len(self._levels):
+                self._levels.append([])
+                self._offsets.append(0)
+            self._levels[h + 1].extend(items[off::2])
+            self._levels[h] = keep
+            h += 1
+
+    def quantiles(self, qs: Iterable[float]) -> List[Optional[float]]:
+        """Квантили для списка q ∈ [0, 1]. Пустой скетч → None."""
+        qs = list(qs)
+        if self.is_exact:
+            vals = sorted(self._levels[0])
+            n = len(vals)
+            if n == 0:
+                return [None for _ in qs]
+            out: List[Optional[float]] = []
+            for q in qs:                                # линейная интерполяция (как numpy 'linear')
+                pos = min(max(q, 0.0), 1.0) * (n - 1)
+                lo = int(math.floor(pos))
+                hi = min(lo + 1, n - 1)
+                frac = pos - lo
+                out.append(vals[lo] + (vals[hi] - vals[lo]) * frac)
+            return out
+
+        weighted: List[Tuple[float, int]] = []
+        for h, items in enumerate(self._levels):
+            w = 1 << h
+            weighted.extend((v, w) for v in items)
+        weighted.sort(key=lambda p: p[0])
+        total = sum(w for _, w in weighted)
+
+        out = []
+        for q in qs:
+            target = min(max(q, 0.0), 1.0) * total
+            acc = 0
+            val = weighted[-1][0]
+            for v, w in weighted:
+                acc += w
+                if acc >= target:
+                    val = v
+                    break
+            out.append(val)
+        return out
+
+
+class SeriesSummary:
+    """
+    Накопитель статистики ряда: Уэлфорд для count/min/max/mean/variance + QuantileSketch для перцентилей.
+    Использование:
+        s = SeriesSummary(); s.extend(values); s.as_dict()
+    или по кускам: s.merge(summary_of_chunk).
+    """
+
+    def __init__(self, sketch_capacity: int = 2048):
+        self.count = 0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+        self.mean = 0.0
+        self._m2 = 0.0                                  # сумма квадратов отклонений (Уэлфорд)
+        self.sketch = QuantileSketch(sketch_capacity)
+
+    def add(self, x: float) -> None:
+        x = float(x)
+        if not math.isfinite(x):                        # NaN/inf в статистику не пускаем
+            return
+        self.count += 1
+        if self.min is None or x < self.min:
+            self.min = x
+        if self.max is None or x > self.max:
+            self.max = x
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (x - self.mean)
+        self.sketch.add(x)
+
+    def extend(self, xs: Iterable[float]) -> "SeriesSummary":
+        for x in xs:
+            self.add(x)
+        return self
+
+    def merge(self, other: "SeriesSummary") -> "SeriesSummary":
+        """Слить сводку другого куска (формула Чана для параллельного Уэлфорда)."""
+        if other.count == 0:
+            return self
+        if self.count == 0:
+            self.count, self.mean, self._m2 = other.count, other.mean, other._m2
+            self.min, self.max = other.min, other.max
+        else:
+            n = self.count + other.count
+            delta = other.mean - self.mean
+            self.mean += delta * other.count / n
+            self._m2 += other._m2 + delta * delta * self.count * other.count / n
+            self.count = n
+            self.min = min(self.min, other.min)         # type: ignore[type-var]
+            self.max = max(self.max, other.max)         # type: ignore[type-var]
+        self.sketch.merge(other.sketch)
+        return self
+
+    def add_bucket(self, count: int, mean: float, m2: float, vmin: float, vmax: float) -> None:
+        """
+        Добавить уже агрегированный интервал (например, GROUP BY в SQL): моменты сливаются точно,
+        а в скетч перцентилей попадает только среднее интервала (перцентили — по средним бакетов).
+        """
+        if not count:
+            return
+        other = SeriesSummary(self.sketch.capacity)
+        other.count, other.mean, other._m2 = int(count), float(mean), max(float(m2), 0.0)
+        other.min, other.max = float(vmin), float(vmax)
+        other.sketch.add(float(mean))
+        self.merge(other)
+
+    @property
+    def variance(self) -> Optional[float]:
+        """Популяционная дисперсия (как statistics.pvariance)."""
+        if self.count == 0:
+            return None
+        return self._m2 / self.count if self.count > 1 else 0.0
+
+    @property
+    def stdev(self) -> Optional[float]:
+        """Популяционное σ (как statistics.pstdev)."""
+        var = self.variance
+        return None if var is None else math.sqrt(max(var, 0.0))
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Формат поля summary в ответах API (старые ключи + variance и перцентили)."""
+        if self.count == 0:
+            return {"count": 0, "min": None, "max": None, "avg": None, "median": None, "stdev": None,
+                    "variance": None, "p5": None, "p50": None, "p95": None}
+        p5, p50, p95 = self.sketch.quantiles((0.05, 0.5, 0.95))
+        return {
+            "count": self.count,
+            "min": self.min,
+            "max": self.max,
+            "avg": self.mean,
+            "median": p50,
+            "stdev": self.stdev,
+            "variance": self.variance,
+            "p5": p5,
+            "p50": p50,
+            "p95": p95,
+        }
+
+
+def summarize(values: Iterable[float]) -> Dict[str, Any]:
+    """Короткий путь: один проход по values → dict для summary."""
+    return SeriesSummary().extend(values).as_dict()
@@ -1,14 +1,18 @@
 # monitoring_PTC/charts/urls.py
 # МОДУЛЬ URL-роутинга приложения "charts".
-# Определяет namespace 'charts' и 4 маршрута:
+# Определяет namespace 'charts' и маршруты:
 #   - /charts/api/objects/  → список объектов LOVATI (для выпадающего списка и сравнения)
 #   - /charts/api/series/   → данные временного ряда для выбранного параметра
 #   - /charts/api/param-id/ → получить id LOVATI параметра по pti+param
+#   - /charts/api/export/   → выгрузка рядов LR/TERMOCOM в CSV/XLSX
+#   - /charts/api/compare/  → ряды LR и TERMOCOM на общей сетке времени
+#   - /charts/api/completeness/ → полнота данных по дням/часам (ночной индекс)
+#   - /charts/api/costs/    → гистограммы задержек API графиков по серверу/параметру
 #   - /charts/chart/        → страница с графиком (HTML + JS)
 
 from django.urls import path                           # path() — декларативное описание маршрутов
 from .views import chart_page                           # view страницы графика
-from .views_api import ObjectsView, SeriesView, ParamIdView  # DRF-классы для API
+from .views_api import ObjectsView, SeriesView, ParamIdView, SeriesExportView, CompareView, CompletenessView, CostsView  # DRF-классы для API
 
 app_name = "charts"  # ← полезно для namespace              # позволит делать reverse('charts:имя_маршрута')
 
@@ -16,5 +20,9 @@ urlpatterns = [                                           # список мар
     path("api/objects/", ObjectsView.as_view(), name="api_objects"),   # GET список объектов: /charts/api/objects/
     path("api/series/",  SeriesView.as_view(),  name="api_series"),    # GET серия значений: /charts/api/series/
     path("api/param-id/", ParamIdView.as_view(), name="api_param_id"), # GET id параметра: /charts/api/param-id/
+    path("api/export/", SeriesExportView.as_view(), name="api_export"), # GET выгрузка CSV/XLSX: /charts/api/export/
+    path("api/compare/", CompareView.as_view(), name="api_compare"),   # GET сравнение рядов: /charts/api/compare/
+    path("api/completeness/", CompletenessView.as_view(), name="api_completeness"),  # GET полнота данных
+    path("api/costs/", CostsView.as_view(), name="api_costs"),         # GET стоимость запросов: /charts/api/costs/
     path("chart/", chart_page, name="chart_page"),                     # HTML-страница графика: /charts/chart/
 ]
\ No newline at end of file
@@ -0,0 +1,109 @@
+# monitoring_PTC/charts/utils/refresh.py
+# МОДУЛЬ: периодически обновляемый снимок данных в памяти процесса.
+# Используется для редко меняющихся справочников (PTI × IDS, UNITS и т.п.):
+#   - первая загрузка синхронная (запрос ждёт данные);
+#   - после истечения ttl обновление идёт в фоновом потоке, запрос получает текущий снимок сразу;
+#   - если задана функция signature(), сначала проверяется дешёвая «подпись» источника:
+#     подпись не изменилась → просто продлеваем срок жизни, полную загрузку не делаем;
+#   - version растёт при каждой реальной смене данных (удобно для производных кэшей).
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Generic, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class RefreshingSnapshot(Generic[T]):
+    """Снимок данных с фоновым обновлением по ttl и опциональной проверкой подписи."""
+
+    def __init__(
+        self,
+        name: str,
+        loader: Callable[[], T],
+        ttl: float,
+        signature: Optional[Callable[[], Any]] = None,
+    ):
+        self.name = name
+        self._loader = loader
+        self._signature = signature
+        self.ttl = float(ttl)
+
+        self._lock = threading.Lock()          # защищает загрузку/переключение снимка
+        self._flag_lock = threading.Lock()     # короткая блокировка только для флага _refreshing
+        self._value: Optional[T] = None
+        self._sig: Any = None
+        self._loaded = False
+        self._checked_at = 0.0                 # monotonic-время последней проверки/загрузки
+        self._refreshing = False               # идёт ли фоновое обновление (single-flight)
+        self.version = 0                       # растёт при каждой смене данных
+        self.loaded_at: Optional[float] = None # wall-clock время последней полной загрузки
+
+    # ---------- публичный API ----------
+
+    def get(self) -> T:
+        """Вернуть текущий снимок; при необходимости загрузить или запустить фоновое обновление."""
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:           # двойная проверка: другой поток мог уже загрузить
+                    self._refresh_locked(force=True)
+            return self._value  # type: ignore[return-value]
+
+        if self._is_stale():
+            self._spawn_background_refresh()
+        return self._value  # type: ignore[return-value]
+
+    def refresh(self, force: bool = False) -> bool:
+        """Синхронное обновление. Возвращает True, если данные реально поменялись."""
+        with self._lock:
+            return self._refresh_locked(force=force)
+
+    def invalidate(self) -> None:
+        """Пометить снимок устаревшим: следующий get() запустит обновление с полной загрузкой."""
+        self._sig = None
+        self._checked_at = 0.0
+
+    # ---------- внутреннее ----------
+
+    def _is_stale(self) -> bool:
+        return (time.monotonic() - self._checked_at) >= self.ttl
+
+    def _refresh_locked(self, force: bool) -> bool:
+        sig = None
+        if self._signature is not None:
+            sig = self._signature()
+            if not force and self._loaded and self._sig is not None and sig == self._sig:
+                self._checked_at = time.monotonic()   # источник не менялся — продлеваем снимок
+                return False
+
+        value = self._loader()
+        self._value = value
+        self._sig = sig
+        self._loaded = True
+        self._checked_at = time.monotonic()
+        self.loaded_at = time.time()
+        self.version += 1
+        return True
+
+    def _spawn_background_refresh(self) -> None:
+        with self._flag_lock:
+            if self._refreshing or not self._is_stale():
+                return
+            self._refreshing = True
+
+        def _run():
+            try:
+                self.refresh()
+            except Exception:
+                # источник недоступен — продолжаем отдавать старый снимок, повторим через ttl
+                logger.exception("refresh of %s failed", self.name)
+                self._checked_at = time.monotonic()
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=_run, name=f"refresh:{self.name}", daemon=True).start()
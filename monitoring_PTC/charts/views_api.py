@@ -1,24 +1,45 @@
 # charts/views_api.py
 # МОДУЛЬ: DRF-вью для API графиков.
 # Содержит три endpoint-а:
-#   - ObjectsView  → список объектов (c поддержкой ?types=0,1 и обратной совместимостью ?typeObj=0)
-#   - SeriesView   → временной ряд по pti+param и интервалу времени (тянет XML с прибора и парсит)
+#   - ObjectsView  → список объектов (c поддержкой ?types=0,1 и обратной совместимостью ?typeObj=0), с ETag
+#   - SeriesView   → временной ряд по pti+param и интервалу времени (тянет XML с прибора и парсит);
+#                    mode=overlay — опорные сутки + N прошлых периодов на общей оси времени суток
 #   - ParamIdView  → получить для pti+param связку {ips, param_id}
+#   - SeriesExportView → выгрузка одного или нескольких рядов (LR и TERMOCOM) в CSV/XLSX потоком
+#   - CompareView  → ряды LR и TERMOCOM на общей сетке времени (параллельное чтение источников)
+#   - CompletenessView → полнота данных по дням/часам из ночного индекса (календарь, худшие объекты)
+#   - CostsView    → скользящие гистограммы задержек API графиков по серверу / параметру
 
 from __future__ import annotations                         # аннотации типов на старых версиях Python
 from typing import Any, Dict, List                         # подсказки типов
+from datetime import date                                  # даты в API полноты данных
 
 from rest_framework.views import APIView                   # базовый класс DRF-вью
 from rest_framework.response import Response               # HTTP-ответ DRF
 from rest_framework import status                          # коды статусов
+from django.http import HttpResponse, StreamingHttpResponse, FileResponse  # каталог байтами, потоковый экспорт
 
-from .repositories import list_objects, get_ips_and_param, PARAM_COLUMNS  # доступ к БД/маппингам
-from .serializers import ObjectItemSerializer, SeriesResponseSerializer    # схемы ответа
-from .timezone_utils import parse_local_iso, to_epoch_seconds              # разбор дат и конвертация в epoch
+from .repositories import get_ips_and_param, PARAM_COLUMNS                 # доступ к справочнику/маппингам
+from .catalog import get_catalog, etag_matches                             # предсобранные ответы списка объектов
+from .serializers import SeriesResponseSerializer                          # схема ответа
+from .timezone_utils import parse_local_iso, to_epoch_seconds, TZ_CHISINAU # разбор дат и конвертация в epoch
 from .http_clients import fetch_xml, SERVER_MAP                            # HTTP-клиент к приборам
-from .xml_parser import parse_series                                       # парсер XML → (ts, value)
+from .xml_parser import parse_series, iter_records                         # парсер XML → (ts, value)
 
-from statistics import mean, median, pstdev                 # базовая статистика
+from .stats import summarize                                # однопроходная статистика ряда
+from .chunks import load_lr_days, local_today               # суточные куски LR в кэше
+from .overlay import parse_overlay_params, overlay_days, build_overlay  # режим наложения периодов
+from .sources import parse_series_specs, resolve_series, SeriesSpec      # ряды LR/TERMOCOM по "src:pti:param"
+from .export import iter_csv, write_xlsx                                  # потоковая выгрузка CSV/XLSX
+from .compare import (                                                    # сравнение рядов на общей сетке
+    build_compare, grid_bounds, parse_step, COMPARE_MAX_SERIES, COMPARE_MAX_CELLS,
+)
+from . import completeness                                  # ночной индекс полноты данных
+from .rollups import read_rollup, bucket_points, agg_payload  # ночные роллапы час/сутки
+from monitoring_PTC.termocom_charts.repositories import AGG_BUCKET_MINUTES  # шаги agg (общие с TERMOCOM)
+from . import costs                                         # стоимость запросов по стадиям
+from .costs import StageTimer
+from rest_framework.renderers import JSONRenderer           # рендер JSON внутри вью (стадия serialize)
 from urllib.parse import urlencode                          # сборка URL в debug-ответах
 
 
@@ -49,27 +70,21 @@ class ObjectsView(APIView):
             except ValueError:
                 return Response({"detail": "typeObj must be int"}, status=status.HTTP_400_BAD_REQUEST)
 
-        rows = list_objects(type_obj=types)                                     # берём объекты из репозитория
-        payload: List[Dict[str, Any]] = [                                        # собираем полезный ответ
-            {
-                "pti": r["pti"],                                                # код объекта (строка)
-                "adres": r["adres"],                                            # адрес
-                "ips": r["ips"],                                                # сервер (код)
-                "ids": {                                                        # вложенные ID параметров (минимально: T1/T2)
-                    "t1": r["id_t1"],
-                    "t2": r["id_t2"],
-                },
-            }
-            for r in rows
-        ]
-        ser = ObjectItemSerializer(payload, many=True)                           # валидация/серилизация структурой DRF
-        return Response(ser.data, status=status.HTTP_200_OK)                     # 200 + данные
+        body, etag = get_catalog(types)                                          # готовый JSON + ETag из кэша каталога
+        if etag_matches(request.headers.get("If-None-Match", ""), etag):          # у браузера уже актуальная версия
+            resp = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            resp = HttpResponse(body, content_type="application/json")           # байты без повторной сериализации
+        resp["ETag"] = etag
+        resp["Cache-Control"] = "no-cache"                                        # браузер всегда переспрашивает по ETag
+        return resp
 
 
 class SeriesView(APIView):
     """
     GET /charts/api/series/?pti=3107&param=T1&start=2025-03-01T00:00&end=2025-10-31T23:59
     `param` в: Q/Q1, G1, G2, DG, DT, T1, T2, T31, T32, T41, T42, T43, T44, TACM, GACM, GADAOS, SURSA.
+    [&agg=detail|10min|hour|day] — min/avg/max по бакетам (hour/day — из ночных роллапов, где они есть)
     """
     def get(self, request, *args, **kwargs):
         # pti — СТРОКА (поддерживает '2050.01', '28.145' и т.п.)
@@ -78,6 +93,12 @@ class SeriesView(APIView):
         start_s = (request.query_params.get("start") or "").strip()             # начало интервала, локальное ISO
         end_s = (request.query_params.get("end") or "").strip()                 # конец интервала, локальное ISO
         debug = (request.query_params.get("debug") or "").lower() in ("1", "true", "yes")  # флаг debug-режима
+        mode = (request.query_params.get("mode") or "").strip().lower()         # '' | 'overlay'
+
+        if mode == "overlay":                                                    # наложение прошлых периодов
+            return self._overlay(request, pti, param)
+
+        timer = StageTimer()                                                     # разбивка стоимости запроса по стадиям
 
         if not pti or not start_s or not end_s:                                 # проверка обязательных полей
             return Response(
@@ -90,7 +111,8 @@ class SeriesView(APIView):
                             status=status.HTTP_400_BAD_REQUEST)
 
         # 1) ips и ID параметра
-        info = get_ips_and_param(pti, param)                                    # ищем сервер и id параметра в IDS
+        with timer.stage("catalog"):
+            info = get_ips_and_param(pti, param)                                # ищем сервер и id параметра в IDS
         if not info:
             return Response({"detail": f"pti '{pti}' not found or no mapping"}, status=status.HTTP_404_NOT_FOUND)
 
@@ -113,6 +135,14 @@ class SeriesView(APIView):
 
         if stop_epoch < start_epoch:                                             # если даты перепутаны —
             start_epoch, stop_epoch = stop_epoch, start_epoch                    # меняем местами
+            dt_start, dt_end = dt_end, dt_start
+
+        agg = (request.query_params.get("agg") or "detail").strip().lower()     # detail | 10min | hour | day
+        if agg != "detail":
+            if agg not in AGG_BUCKET_MINUTES:
+                return Response({"detail": f"agg must be detail or one of: {', '.join(AGG_BUCKET_MINUTES.keys())}"},
+                                status=status.HTTP_400_BAD_REQUEST)
+            return self._aggregated(pti, param, ips, str(param_id), dt_start, dt_end, agg, timer)
 
         # 3) HTTP к прибору
         try:
@@ -120,43 +150,112 @@ class SeriesView(APIView):
         except Exception:
             ips_int = ips                                                        # fallback (не ломаемся)
         try:
-            raw_xml = fetch_xml(ips_int, str(param_id), start_epoch, stop_epoch) # тянем XML байтами
+            with timer.stage("fetch"):
+                raw_xml = fetch_xml(ips_int, str(param_id), start_epoch, stop_epoch)  # тянем XML байтами
         except Exception as e:
             return Response({"detail": f"http error: {e}"}, status=status.HTTP_502_BAD_GATEWAY)
+        timer.add_bytes(len(raw_xml))                                            # сколько байт отдал прибор
 
         # 4) парсим серию
-        pairs = parse_series(raw_xml)                                            # bytes XML → [(iso_ts, value), ...]
-        labels = [ts for ts, _ in pairs]                                         # список меток времени
-        values = [v for _, v in pairs]                                           # список значений
-
-        # 5) статистика
-        if values:                                                               # если есть точки —
-            summary = {
-                "count": len(values),                                            # количество
-                "min": min(values),                                              # минимум
-                "max": max(values),                                              # максимум
-                "avg": mean(values),                                             # среднее (популяционное)
-                "median": median(values),                                        # медиана
-                "stdev": pstdev(values) if len(values) > 1 else 0.0,            # σ (pstdev) или 0 при 1 точке
-            }
-        else:
-            summary = {"count": 0, "min": None, "max": None, "avg": None, "median": None, "stdev": None}  # пусто
+        with timer.stage("parse"):
+            pairs = parse_series(raw_xml)                                        # bytes XML → [(iso_ts, value), ...]
+            labels = [ts for ts, _ in pairs]                                     # список меток времени
+            values = [v for _, v in pairs]                                       # список значений
+        timer.points = len(values)
+
+        # 5) статистика — один проход (Уэлфорд + скетч перцентилей)
+        with timer.stage("aggregate"):
+            summary = summarize(values)                                          # count/min/max/avg/median/stdev/p5/p95
 
         payload: Dict[str, Any] = {"labels": labels, "values": values, "summary": summary}  # итоговый ответ
 
-        if debug:                                                                # режим отладки — добавляем URL
+        if debug:                                                                # режим отладки — URL + стоимость
+            payload["debug"] = {
+                "points": len(values),                                           # сколько точек получили
+                "server": ips_int,                                               # код сервера
+                "param_id": param_id,                                            # какой id параметра
+                "cost": timer.as_dict(),                                         # стадии до рендера, мс + байты
+            }
             base = SERVER_MAP.get(ips_int)                                       # находим базовый CGI по серверу
             if base:
-                payload["debug"] = {
-                    "url": f"{base}?{urlencode({'param': param_id, 'start': start_epoch, 'stop': stop_epoch})}",  # прямой запрос
-                    "points": len(values),                                       # сколько точек получили
-                    "server": ips_int,                                           # код сервера
-                    "param_id": param_id,                                        # какой id параметра
-                }
-            return Response(payload, status=status.HTTP_200_OK)                  # возвращаем как есть (без DRF-схемы)
+                payload["debug"]["url"] = f"{base}?{urlencode({'param': param_id, 'start': start_epoch, 'stop': stop_epoch})}"  # прямой запрос
+
+        with timer.stage("serialize"):                                           # рендерим ровно то, что отдаём
+            body = JSONRenderer().render(payload if debug else SeriesResponseSerializer(payload).data)  # debug — без DRF-схемы
+        costs.record("lr", ips_int, param, timer)
+        return HttpResponse(body, content_type="application/json")              # 200 + данные
+
+    def _aggregated(self, pti: str, param: str, ips, param_id: str, dt_start, dt_end, agg: str,
+                    timer: StageTimer):
+        """
+        agg-режим LR (формат как у TERMOCOM): закрытые сутки из ночных роллапов (charts/rollups.py),
+        остаток интервала — одним запросом к прибору и бакетами в памяти.
+        """
+        step = AGG_BUCKET_MINUTES[agg] * 60                                     # ширина бакета, сек
+        start = dt_start.replace(tzinfo=None)                                    # роллапы — в локальном «настенном» времени
+        end = dt_end.replace(tzinfo=None)
+        with timer.stage("fetch"):
+            buckets, rest = read_rollup("lr", pti, param, step, start, end)      # покрытый ночью префикс интервала
+        from_rollup = len(buckets)
+
+        if rest is not None:                                                     # досчитываем непокрытый хвост
+            try:
+                with timer.stage("fetch"):
+                    raw_xml = fetch_xml(int(ips), param_id, to_epoch_seconds(rest.replace(tzinfo=TZ_CHISINAU)),
+                                        to_epoch_seconds(dt_end))
+            except Exception as e:
+                return Response({"detail": f"http error: {e}"}, status=status.HTTP_502_BAD_GATEWAY)
+            timer.add_bytes(len(raw_xml))
+            with timer.stage("parse"):
+                buckets.extend(bucket_points(iter_records(raw_xml), step))
+        timer.points = len(buckets)
+
+        with timer.stage("aggregate"):
+            payload = agg_payload(agg, buckets)
+        payload["rollup_buckets"] = from_rollup
+        with timer.stage("serialize"):
+            body = JSONRenderer().render(payload)
+        costs.record("lr", ips, param, timer, mode="agg")
+        return HttpResponse(body, content_type="application/json")
+
+    def _overlay(self, request, pti: str, param: str):
+        """
+        GET /charts/api/series/?mode=overlay&pti=3107&param=T1&date=2025-11-17&periods=7&period=day&step=600
+        Опорные сутки + N прошлых периодов на общей оси времени суток.
+        Закрытые сутки берутся из кэша суточных кусков → не больше одного запроса к прибору.
+        """
+        if not pti or param not in PARAM_COLUMNS:                                # для overlay даты не нужны
+            return Response(
+                {"detail": "required: pti (+ param in: " + ", ".join(sorted(PARAM_COLUMNS.keys())) + ")"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            ref_day, periods, period, step = parse_overlay_params(request.query_params, local_today())
+        except ValueError as e:
+            return Response({"detail": f"bad overlay params: {e}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        timer = StageTimer()
+        with timer.stage("catalog"):
+            info = get_ips_and_param(pti, param)                                 # сервер и id параметра
+        if not info or not info.get("ips") or not info.get("param_id"):
+            return Response({"detail": f"pti '{pti}' not found or no mapping for {param}"},
+                            status=status.HTTP_404_NOT_FOUND)
 
-        ser = SeriesResponseSerializer(payload)                                  # валидация/сериализация по схеме
-        return Response(ser.data, status=status.HTTP_200_OK)                     # 200 + данные под схему
+        days = overlay_days(ref_day, periods, period)                            # [ref, ref-1, ...] / [ref, ref-7, ...]
+        try:
+            with timer.stage("fetch"):                                           # кэш суточных кусков + разбор XML
+                points_by_day, fetches = load_lr_days(int(info["ips"]), str(info["param_id"]), days)
+        except Exception as e:
+            return Response({"detail": f"http error: {e}"}, status=status.HTTP_502_BAD_GATEWAY)
+        timer.points = sum(len(p) for p in points_by_day.values())
+
+        with timer.stage("aggregate"):
+            payload = build_overlay(days, points_by_day, step)                   # общая ось + выровненные массивы
+        payload.update({"pti": pti, "param": param, "period": period, "device_fetches": fetches})
+        with timer.stage("serialize"):
+            body = JSONRenderer().render(payload)
+        costs.record("lr", info["ips"], param, timer, mode="overlay")
+        return HttpResponse(body, content_type="application/json")
 
 
 class ParamIdView(APIView):
@@ -188,4 +287,179 @@ class ParamIdView(APIView):
             return Response(payload, status=status.HTTP_200_OK)                  # 200
 
         except Exception as exc:                                                 # защита от неожиданных ошибок
-            return Response({"detail": f"ParamIdView error: {exc}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+            return Response({"detail": f"ParamIdView error: {exc}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+class SeriesExportView(APIView):
+    """
+    GET /charts/api/export/?series=lr:3107:T1,tc:5020:G1&start=2025-11-01T00:00&end=2025-11-17T23:59&filetype=csv
+    Один ряд можно задать и по-старому: ?src=lr&pti=3107&param=T1.
+    filetype: csv (по умолчанию, потоком) | xlsx (write-only книга, лист на каждый ряд).
+    (не ?format=… — этот параметр DRF забирает себе под выбор рендерера)
+    """
+    def get(self, request, *args, **kwargs):
+        qp = request.query_params
+        start_s = (qp.get("start") or "").strip()                                # начало интервала, локальное ISO
+        end_s = (qp.get("end") or "").strip()                                    # конец интервала, локальное ISO
+        fmt = (qp.get("filetype") or "csv").strip().lower()                      # csv | xlsx
+
+        try:
+            if qp.get("series"):
+                specs = parse_series_specs(qp.get("series"))                     # несколько рядов сразу
+            else:
+                src = (qp.get("src") or "lr").strip().lower()
+                specs = parse_series_specs(f"{src}:{(qp.get('pti') or '').strip()}:{(qp.get('param') or '').strip()}")
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not specs or not start_s or not end_s:
+            return Response({"detail": "required: series (src:pti:param,...) or pti+param, start, end"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if fmt not in ("csv", "xlsx"):
+            return Response({"detail": "filetype must be csv or xlsx"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            dt_start = parse_local_iso(start_s)
+            dt_end = parse_local_iso(end_s)
+        except Exception as e:
+            return Response({"detail": f"bad datetime: {e}"}, status=status.HTTP_400_BAD_REQUEST)
+        if dt_end < dt_start:
+            dt_start, dt_end = dt_end, dt_start
+
+        # все ряды проверяем ДО начала выдачи: после первого байта код ответа уже не поменять
+        try:
+            resolved = [resolve_series(sp) for sp in specs]
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except LookupError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_404_NOT_FOUND)
+
+        fname = _export_filename(specs, dt_start, fmt)
+        if fmt == "csv":
+            try:
+                rows = iter_csv(resolved, dt_start, dt_end)           # первая порция читается здесь, до ответа
+            except Exception as e:
+                return Response({"detail": f"export error: {e}"}, status=status.HTTP_502_BAD_GATEWAY)
+            resp = StreamingHttpResponse(rows, content_type="text/csv; charset=utf-8")
+            resp["Content-Disposition"] = f'attachment; filename="{fname}"'
+            return resp
+
+        try:
+            fh = write_xlsx(resolved, dt_start, dt_end)
+        except Exception as e:
+            return Response({"detail": f"export error: {e}"}, status=status.HTTP_502_BAD_GATEWAY)
+        return FileResponse(
+            fh, as_attachment=True, filename=fname,
+            content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        )
+
+
+class CompareView(APIView):
+    """
+    GET /charts/api/compare/?series=lr:3107:T1,tc:5020:T1&start=2025-11-17T00:00&end=2025-11-17T23:59&step=600
+    Короткая форма для двух рядов: ?a=lr:3107:T1&b=tc:5020:T1.
+    Ответ: {"step", "t0", "labels", "series": [{name, src, pti, param, values, summary}], "diff"?}
+    """
+    def get(self, request, *args, **kwargs):
+        qp = request.query_params
+        start_s = (qp.get("start") or "").strip()
+        end_s = (qp.get("end") or "").strip()
+        raw = qp.get("series") or ",".join(x for x in (qp.get("a"), qp.get("b")) if x)
+
+        try:
+            specs = parse_series_specs(raw)
+            step = parse_step(qp.get("step"))
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not specs or not start_s or not end_s:
+            return Response({"detail": "required: series (src:pti:param,...) or a+b, start, end"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if len(specs) > COMPARE_MAX_SERIES:
+            return Response({"detail": f"at most {COMPARE_MAX_SERIES} series"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            dt_start = parse_local_iso(start_s)
+            dt_end = parse_local_iso(end_s)
+        except Exception as e:
+            return Response({"detail": f"bad datetime: {e}"}, status=status.HTTP_400_BAD_REQUEST)
+        if dt_end < dt_start:
+            dt_start, dt_end = dt_end, dt_start
+
+        if grid_bounds(dt_start, dt_end, step)[1] > COMPARE_MAX_CELLS:
+            return Response({"detail": f"too many grid cells, increase step (max {COMPARE_MAX_CELLS})"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            resolved = [resolve_series(sp) for sp in specs]
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except LookupError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_404_NOT_FOUND)
+
+        return Response(build_compare(resolved, dt_start, dt_end, step), status=status.HTTP_200_OK)
+
+
+class CompletenessView(APIView):
+    """
+    Полнота данных из ночного индекса (manage.py build_chart_completeness), без чтения рядов:
+      GET /charts/api/completeness/?src=lr&pti=3107&param=T1&start=2025-11-01&end=2025-11-30
+          -> {"src", "pti", "param", "days": [{date, ratio, samples, expected, hours: [доли по часам: 24, в дни перевода часов 23/25]}, ...]}
+      GET /charts/api/completeness/?date=2025-11-17[&src=tc][&param=T1][&limit=50]
+          -> {"date", "worst": [...]}  — худшие ряды за сутки (по возрастанию ratio)
+    """
+    def get(self, request, *args, **kwargs):
+        qp = request.query_params
+        src = (qp.get("src") or "").strip().lower() or None
+        param = (qp.get("param") or "").strip().upper() or None
+        pti = (qp.get("pti") or "").strip()
+        if src and src not in ("lr", "tc"):
+            return Response({"detail": "src must be lr or tc"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            if pti:
+                if not src or not param or not qp.get("start") or not qp.get("end"):
+                    return Response({"detail": "required: src, pti, param, start, end"},
+                                    status=status.HTTP_400_BAD_REQUEST)
+                start = date.fromisoformat(qp.get("start")[:10])
+                end = date.fromisoformat(qp.get("end")[:10])
+                if end < start:
+                    start, end = end, start
+                days = completeness.series_days(src, pti, param, start, end)
+                return Response({"src": src, "pti": pti, "param": param, "days": days}, status=status.HTTP_200_OK)
+
+            day = date.fromisoformat((qp.get("date") or "")[:10])
+            limit = min(max(int(qp.get("limit") or 50), 1), 1000)
+        except ValueError as e:
+            return Response({"detail": f"bad params: {e}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        rows = completeness.worst(day, limit=limit, src=src, param=param)
+        return Response({"date": day.isoformat(), "worst": rows}, status=status.HTTP_200_OK)
+
+
+class CostsView(APIView):
+    """
+    GET /charts/api/costs/?by=server|param[&api=lr|tc][&mode=detail|agg|overlay|page|multi][&minutes=60]
+    -> {"by", "minutes", "items": [{api, mode, server|param, count, p50_ms, p95_ms, p99_ms, avg_stage_ms, avg_bytes, histogram}]}
+    Статистика текущего процесса (у каждого воркера своя), самые медленные ключи сверху.
+    """
+    def get(self, request, *args, **kwargs):
+        qp = request.query_params
+        by = (qp.get("by") or "server").strip().lower()
+        api = (qp.get("api") or "").strip().lower() or None
+        mode = (qp.get("mode") or "").strip().lower() or None
+        if by not in ("server", "param") or api not in (None, "lr", "tc") or (mode and mode not in costs.MODES):
+            return Response({"detail": f"by must be server|param, api must be lr|tc, mode in {'|'.join(costs.MODES)}"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            minutes = int(qp.get("minutes") or costs.WINDOW_MINUTES)
+        except ValueError:
+            return Response({"detail": "minutes must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+        items = costs.query(by=by, api=api, minutes=minutes, mode=mode)
+        return Response({"by": by, "minutes": minutes, "items": items}, status=status.HTTP_200_OK)
+
+
+def _export_filename(specs: List[SeriesSpec], dt_start, fmt: str) -> str:
+    """series_3107_T1_2025-11-01.csv или series_3_2025-11-01.xlsx для нескольких рядов."""
+    head = f"{specs[0].pti}_{specs[0].param}" if len(specs) == 1 else str(len(specs))
+    head = "".join(c if c.isalnum() or c in "._-" else "_" for c in head)
+    return f"series_{head}_{dt_start.date().isoformat()}.{fmt}"
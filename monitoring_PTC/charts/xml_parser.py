@@ -2,55 +2,126 @@
 # МОДУЛЬ: парсинг XML, который присылают приборы LR.
 # Задача: превратить сырые XML-байты/строку в ОТСОРТИРОВАННЫЙ список точек
 #         вида [(ISO-время, значение_float), ...], где ISO — локальное время Europe/Chisinau.
+# iter_records — то же самое, но генератором и без сортировки (для потоковой обработки);
+#   strict=True — мусор/обрезанный XML не «пустой ряд», а DeviceXMLError (нужно тем, кто кэширует результат).
+# iter_records_stream — то же из потока (XMLPullParser по ответу requests с stream=True), без DOM целиком.
 # Использует parse_device_timestamp для корректной интерпретации форматов времени прибора (UTC → Chisinau).
 
 from __future__ import annotations
-from typing import List, Tuple, Union
+import codecs
+from datetime import datetime
+from typing import IO, Iterator, List, Optional, Tuple, Union
 import xml.etree.ElementTree as ET
 
 from .timezone_utils import parse_device_timestamp
 
 
-def parse_series(xml: Union[str, bytes]) -> List[Tuple[str, float]]:
+STREAM_CHUNK = 64 * 1024                                     # байт за одно чтение из потока
+
+
+class DeviceXMLError(ValueError):
+    """Прибор ответил, но XML не разбирается (мусор, обрезан, пустое тело)."""
+
+
+def iter_records(xml: Union[str, bytes], strict: bool = False) -> Iterator[Tuple[datetime, float]]:
     """
-    ФУНКЦИЯ: принять сырой XML (bytes/str) и вернуть отсортированный список точек:
-        [("2025-03-01T00:00:00+02:00", 57.7), ...]
-    Берём ВСЕ <record> из XML (ничего не отбрасываем специально).
+    ФУНКЦИЯ: пройти по <record> из сырого XML и отдавать точки по одной (генератор, БЕЗ сортировки):
+        (aware datetime Europe/Chisinau, value_float)
+    Нужна там, где весь ряд не хочется держать списком (экспорт, суточные куски, статистика).
+    strict=True: неразбираемый XML → DeviceXMLError (иначе — пустой результат, как раньше).
     """
     if isinstance(xml, bytes):                               # если пришли байты (как из requests), а не строка —
         xml = xml.decode("utf-8", "ignore")                  # декодируем в UTF-8, игнорируя битые символы
 
     try:
         root = ET.fromstring(xml)                            # пробуем распарсить XML в ElementTree
+    except Exception as e:
+        if strict:
+            raise DeviceXMLError(f"unparseable device XML: {e}") from e
+        # если прибор прислал мусор/обрезанный XML — вернуть пустой результат безопаснее
+        return                                               # пустой генератор без падения
+
+    # В типовом XML записи лежат под путём report_data/record, но берём в общем виде ".//record"
+    for rec in root.iterfind(".//record"):                   # обходим все теги <record> где бы они ни находились
+        point = _record_point(rec)
+        if point is not None:
+            yield point
+
+
+def iter_records_stream(fh: IO[bytes], strict: bool = False,
+                        chunk_size: int = STREAM_CHUNK) -> Iterator[Tuple[datetime, float]]:
+    """
+    ФУНКЦИЯ: то же, что iter_records, но XML читается из файлоподобного объекта (например, r.raw
+    у requests-ответа с stream=True) кусками через ET.XMLPullParser — дерево целиком в памяти не строится:
+    разобранный <record> сразу отцепляется от родителя, в памяти живёт только текущая запись.
+    Байты декодируются так же, как в iter_records (UTF-8, битые байты выбрасываются), поэтому
+    «грязный» ответ прибора (например, cp1251 в <name>) разбирается, как и раньше.
+    strict=True: XML оборвался/испорчен посреди потока → DeviceXMLError (уже отданные точки остаются у вызывающего).
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")("ignore")
+    parser = ET.XMLPullParser(events=("start", "end"))
+    path: List[ET.Element] = []                              # текущая цепочка открытых элементов (корень → ...)
+    try:
+        while True:
+            chunk = fh.read(chunk_size)
+            if chunk:
+                parser.feed(decoder.decode(chunk))
+            else:
+                parser.feed(decoder.decode(b"", final=True))
+                parser.close()                               # обрезанный XML → ParseError здесь
+            for event, elem in parser.read_events():
+                if event == "start":
+                    path.append(elem)
+                    continue
+                path.pop()
+                if elem.tag != "record":                     # вложенные <value>/<real_time> читаем в составе <record>
+                    continue
+                point = _record_point(elem)
+                if path:
+                    path[-1].remove(elem)                    # отцепляем разобранную запись от родителя
+                if point is not None:
+                    yield point
+            if not chunk:
+                return
+    except ET.ParseError as e:
+        if strict:
+            raise DeviceXMLError(f"unparseable device XML: {e}") from e
+        return                                               # как в iter_records: обрезанный XML — конец ряда
+
+
+def _record_point(rec: ET.Element) -> Optional[Tuple[datetime, float]]:
+    """Один <record> → (aware datetime, value) или None, если время/значение отсутствуют или не парсятся."""
+    # 1) время (timestamp)
+    ts_raw = rec.get("round_time")                           # сначала пробуем атрибут round_time у <record>
+    if not ts_raw:                                           # если его нет или он пустой —
+        rt = rec.findtext("real_time")                       # пробуем взять текст из вложенного <real_time>
+        if rt:
+            ts_raw = rt.strip()                              # нормализуем пробелы
+
+    # 2) значение (value)
+    val_raw = rec.findtext("value")                          # значение обычно лежит в элементе <value>
+    if not ts_raw or not val_raw:                            # если нет времени или значения —
+        return None                                          # пропускаем эту запись
+
+    try:
+        dt = parse_device_timestamp(ts_raw.strip())          # парсим формат времени прибора (UTC → Chisinau aware)
+        val = float(val_raw.strip())                         # приводим значение к float
     except Exception:
-        # если прибор прислал мусор/обрезанный XML — вернуть пустой список безопаснее
-        return []                                            # пустой результат без падения
+        # если время или число не парсятся — пропускаем только эту запись (остальные продолжаем)
+        return None
+    return dt, val
 
-    points: List[Tuple[str, float]] = []                     # сюда будем накапливать пары (iso_timestamp, value)
 
-    # В типовом XML записи лежат под путём report_data/record, но берём в общем виде ".//record"
-    for rec in root.findall(".//record"):                    # обходим все теги <record> где бы они ни находились
-        # 1) время (timestamp)
-        ts_raw = rec.get("round_time")                       # сначала пробуем атрибут round_time у <record>
-        if not ts_raw:                                       # если его нет или он пустой —
-            rt = rec.findtext("real_time")                   # пробуем взять текст из вложенного <real_time>
-            if rt:
-                ts_raw = rt.strip()                          # нормализуем пробелы
-
-        # 2) значение (value)
-        val_raw = rec.findtext("value")                      # значение обычно лежит в элементе <value>
-        if not ts_raw or not val_raw:                        # если нет времени или значения —
-            continue                                         # пропускаем эту запись
-
-        try:
-            dt = parse_device_timestamp(ts_raw.strip())      # парсим формат времени прибора (UTC → Chisinau aware)
-            val = float(val_raw.strip())                     # приводим значение к float
-        except Exception:
-            # если время или число не парсятся — пропускаем только эту запись (остальные продолжаем)
-            continue
-
-        points.append((dt.isoformat(), val))                 # добавляем пару (ISO-строка локального времени, float)
+def parse_series(xml: Union[str, bytes]) -> List[Tuple[str, float]]:
+    """
+    ФУНКЦИЯ: принять сырой XML (bytes/str) и вернуть отсортированный список точек:
+        [("2025-03-01T00:00:00+02:00", 57.7), ...]
+    Берём ВСЕ <record> из XML (ничего не отбрасываем специально).
+    """
+    points: List[Tuple[str, float]] = [                      # пары (ISO-строка локального времени, float)
+        (dt.isoformat(), val) for dt, val in iter_records(xml)
+    ]
 
     # ОБЯЗАТЕЛЬНО сортируем по времени, чтобы фронт не зависел от исходного порядка <record>
     points.sort(key=lambda x: x[0])                          # сортировка лексикографически по ISO-времени
-    return points                                            # отдаём готовый список точек
\ No newline at end of file
+    return points                                            # отдаём готовый список точек
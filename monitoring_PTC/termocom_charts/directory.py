@@ -0,0 +1,127 @@
+# monitoring_PTC/termocom_charts/directory.py
+#
+# Справочник объектов TERMOCOM5 (UNITS с UNIT_NAME = 'PT_%') в памяти процесса.
+# Раньше каждый запрос графика открывал соединение ради resolve_unit_id_by_ptc,
+# а список объектов каждый раз перечитывал всю UNITS и адреса из LOVATI.
+# Теперь оба читаются из снимка, который раз в TERMOCOM_UNITS_TTL секунд обновляется в фоне.
+
+from __future__ import annotations
+
+from bisect import bisect_left
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import pyodbc
+from django.conf import settings
+
+from monitoring_PTC.charts.utils.refresh import RefreshingSnapshot
+
+UNITS_TTL = getattr(settings, "TERMOCOM_UNITS_TTL", 600)
+
+
+@dataclass(frozen=True)
+class UnitsDirectory:
+    names: Tuple[str, ...]          # UNIT_NAME (upper), отсортированы — как ORDER BY UNIT_NAME
+    ids: Tuple[int, ...]            # UNIT_ID в том же порядке
+    by_name: Dict[str, int]         # UNIT_NAME (upper) -> UNIT_ID
+    by_id: Dict[int, str]           # UNIT_ID -> UNIT_NAME (upper)
+    objects: Tuple[dict, ...]       # готовый список для селекта: {"pti", "adres"}
+
+    def resolve(self, ptc: str) -> Optional[int]:
+        """
+        Как SELECT TOP 1 ... WHERE UNIT_NAME LIKE 'PT_' + ptc + '%' ORDER BY UNIT_NAME:
+        сначала точное имя PT_<ptc>, иначе первое по порядку имя с этим префиксом
+        (например '5019' -> 'PT_5019A', '5118' -> 'PT_5118/1').
+        """
+        prefix = "PT_" + str(ptc).strip().upper()
+        exact = self.by_name.get(prefix)
+        if exact is not None:
+            return exact
+        i = bisect_left(self.names, prefix)
+        if i < len(self.names) and self.names[i].startswith(prefix):
+            return self.ids[i]
+        return None
+
+    def variants(self, ptc: str) -> List[str]:
+        """Все имена объекта: 'PT_5019', 'PT_5019A', 'PT_5118/1' и т.п."""
+        prefix = "PT_" + str(ptc).strip().upper()
+        i = bisect_left(self.names, prefix)
+        out: List[str] = []
+        while i < len(self.names) and self.names[i].startswith(prefix):
+            out.append(self.names[i])
+            i += 1
+        return out
+
+
+def _dsn(cfg: dict) -> str:
+    return ";".join(f"{k}={v}" for k, v in cfg.items())
+
+
+def _load_address_map() -> Dict[str, str]:
+    """Адреса по PTC из LOVATI.dbo.PTC_adrese (как в Monitoring PTC). LOVATI недоступна — пустой словарь."""
+    try:
+        with pyodbc.connect(_dsn(settings.LOVATI_SERVER)) as conn_l:
+            cur_l = conn_l.cursor()
+            cur_l.execute("""
+                SELECT
+                    RTRIM(PTC)    AS PTC,
+                    RTRIM(adresa) AS adresa
+                FROM [LOVATI].[dbo].[PTC_adrese]
+                WHERE LEN(RTRIM(PTC)) = 4
+                  AND LEFT(RTRIM(PTC), 1) IN ('1','2','3','4','5')
+            """)
+            return {str(r.PTC).strip(): str(r.adresa or '').strip() for r in cur_l.fetchall()}
+    except Exception:
+        return {}
+
+
+def _load_units() -> UnitsDirectory:
+    address_map = _load_address_map()
+
+    with pyodbc.connect(_dsn(settings.SQL_SERVER)) as conn_t:
+        cur_t = conn_t.cursor()
+        cur_t.execute("""
+            SELECT UNIT_ID, UNIT_NAME
+            FROM UNITS
+            WHERE UNIT_ENABLED = 1
+              AND UNIT_NAME LIKE 'PT_%'
+            ORDER BY UNIT_NAME
+        """)
+        rows = cur_t.fetchall()
+
+    pairs: List[Tuple[str, int]] = []
+    objects: List[dict] = []
+    for row in rows:
+        name = (row.UNIT_NAME or '').strip()
+        if row.UNIT_ID is not None and name:
+            pairs.append((name.upper(), int(row.UNIT_ID)))
+
+        if not name.startswith('PT_'):
+            continue
+        # "PT_5118" -> "5118" (как в monitoring/views.py)
+        pti = name[3:].split('/')[0].strip()
+        objects.append({"pti": pti, "adres": address_map.get(pti, "")})
+
+    pairs.sort(key=lambda p: p[0])
+    by_name: Dict[str, int] = {}
+    by_id: Dict[int, str] = {}
+    for name, unit_id in pairs:
+        by_name.setdefault(name, unit_id)
+        by_id.setdefault(unit_id, name)
+
+    return UnitsDirectory(
+        names=tuple(n for n, _ in pairs),
+        ids=tuple(i for _, i in pairs),
+        by_name=by_name,
+        by_id=by_id,
+        objects=tuple(objects),
+    )
+
+
+UNITS_DIRECTORY: RefreshingSnapshot[UnitsDirectory] = RefreshingSnapshot(
+    "termocom:units-directory", _load_units, ttl=UNITS_TTL,
+)
+
+
+def get_units_directory() -> UnitsDirectory:
+    return UNITS_DIRECTORY.get()
@@ -0,0 +1,40 @@
+# monitoring_PTC/termocom_charts/management/commands/sync_termocom_mirror.py
+#
+# Докачка локального зеркала HTREND-таблиц TERMOCOM5 (см. termocom_charts/mirror.py).
+#   python manage.py sync_termocom_mirror              — один проход
+#   python manage.py sync_termocom_mirror --loop 300   — бесконечно, раз в 5 минут
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from monitoring_PTC.termocom_charts.mirror import mirror_enabled, sync_mirror
+from monitoring_PTC.termocom_charts.repositories import mirror_columns
+
+
+class Command(BaseCommand):
+    help = "Incrementally copy new TERMOCOM5 HTREND rows into the local SQLite mirror"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--loop", type=int, default=0, metavar="SECONDS",
+            help="repeat every SECONDS (0 = single pass)",
+        )
+
+    def handle(self, *args, **options):
+        if not mirror_enabled():
+            raise CommandError("TERMOCOM_MIRROR_PATH is not set")
+
+        interval = options["loop"]
+        while True:
+            started = time.monotonic()
+            try:
+                n = sync_mirror(mirror_columns())
+                self.stdout.write(f"synced {n} rows in {time.monotonic() - started:.1f}s")
+            except Exception as e:
+                if not interval:
+                    raise CommandError(f"sync failed: {e}")
+                self.stderr.write(f"sync failed: {e}")
+            if not interval:
+                return
+            time.sleep(max(0.0, interval - (time.monotonic() - started)))
@@ -0,0 +1,213 @@
+# monitoring_PTC/termocom_charts/mirror.py
+#
+# Локальное зеркало HTREND-таблиц TERMOCOM5 (SQLite, необязательное).
+# Длинные графики TERMOCOM бьют прямо в боевой SQL Server диспетчерской; зеркало снимает эту нагрузку:
+#   - sync_mirror(...) (команда manage.py sync_termocom_mirror) инкрементально докачивает новые строки
+#     по watermark времени — отдельно для каждой колонки значения; каждый проход заново перечитывает
+#     последние TERMOCOM_MIRROR_OVERLAP_MINUTES до watermark (строки, дописанные в HTREND с опозданием);
+#   - fetch_termocom_series читает из зеркала интервал (first_ts, last_ts], а в живую БД идёт только за «хвостом»;
+#     начало раньше first_ts (глубже первой закачки) зеркало не обслуживает — весь интервал из живой БД.
+# Хранение: таблица points_v2 с ключом (unit_id, col, ts_us, seq) WITHOUT ROWID — точки одного объекта/параметра
+# лежат рядом, выборка интервала = один проход по диапазону ключа. ts_us — «настенные» микросекунды
+# (полная точность HTREND), seq — номер среди строк с одинаковым временем (повтор часа при переходе
+# на зимнее время и т.п.), поэтому такие строки не склеиваются.
+# Таблицы прежнего формата (points / watermarks, ключ по целым секундам) удаляются — зеркало докачивается заново.
+# Путь задаётся TERMOCOM_MIRROR_PATH; None — зеркало выключено, всё читается как раньше.
+
+from __future__ import annotations
+
+import logging
+import sqlite3
+from array import array
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Iterable, Optional, Tuple
+
+import pyodbc
+from django.conf import settings
+
+from monitoring_PTC.charts.timezone_utils import TZ_CHISINAU
+
+logger = logging.getLogger(__name__)
+
+MIRROR_PATH = getattr(settings, "TERMOCOM_MIRROR_PATH", None)
+LIVE_TAIL_MINUTES = getattr(settings, "TERMOCOM_MIRROR_LIVE_MINUTES", 10)   # последние N минут — только из живой БД
+INITIAL_DAYS = getattr(settings, "TERMOCOM_MIRROR_INITIAL_DAYS", 365)      # глубина первой закачки
+OVERLAP_MINUTES = getattr(settings, "TERMOCOM_MIRROR_OVERLAP_MINUTES", 60) # перечитываем перед watermark
+SYNC_WINDOW = 24 * 3600                                                    # одно окно докачки, сек
+SYNC_BATCH = 5000                                                          # строк на fetchmany / executemany
+
+_WALL_EPOCH = datetime(1970, 1, 1)
+_ONE_SECOND = timedelta(seconds=1)
+_ONE_US = timedelta(microseconds=1)
+_US = 1_000_000
+
+_SCHEMA = """
+    DROP TABLE IF EXISTS points;
+    DROP TABLE IF EXISTS watermarks;
+    CREATE TABLE IF NOT EXISTS points_v2 (
+        unit_id INTEGER NOT NULL,
+        col     TEXT    NOT NULL,
+        ts_us   INTEGER NOT NULL,
+        seq     INTEGER NOT NULL,
+        value   REAL    NOT NULL,
+        PRIMARY KEY (unit_id, col, ts_us, seq)
+    ) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS watermarks_v2 (
+        col       TEXT PRIMARY KEY,
+        tbl       TEXT NOT NULL,
+        first_ts  INTEGER NOT NULL,
+        last_ts   INTEGER NOT NULL,
+        synced_at TEXT NOT NULL
+    );
+"""
+
+
+def mirror_enabled() -> bool:
+    return bool(MIRROR_PATH)
+
+
+def _connect() -> sqlite3.Connection:
+    conn = sqlite3.connect(str(MIRROR_PATH), timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")            # читатели не ждут докачку
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def _wall_now() -> int:
+    now = datetime.now(TZ_CHISINAU).replace(tzinfo=None)
+    return (now - _WALL_EPOCH) // _ONE_SECOND
+
+
+def _wall_datetime(sec: int) -> datetime:
+    return _WALL_EPOCH + timedelta(seconds=sec)
+
+
+# ---------- чтение ----------
+
+def read_mirror(
+    unit_id: int,
+    value_col: str,
+    start_sec: int,
+    end_sec: int,
+    epochs: array,
+    values: array,
+) -> Optional[int]:
+    """
+    Дописать в epochs/values точки из зеркала за [start_sec, min(end_sec, watermark)].
+    Вернёт watermark (до какой секунды зеркало полное) или None, если зеркало не может обслужить
+    начало интервала (раньше первой закачки или позже watermark) — тогда читать нужно целиком из живой БД.
+    """
+    if not mirror_enabled():
+        return None
+    try:
+        conn = sqlite3.connect(f"file:{MIRROR_PATH}?mode=ro", uri=True, timeout=5)
+    except sqlite3.Error:
+        return None
+    try:
+        row = conn.execute("SELECT first_ts, last_ts FROM watermarks_v2 WHERE col = ?", (value_col,)).fetchone()
+        # зеркало полное только на (first_ts, last_ts]
+        if row is None or start_sec <= row[0] or start_sec > row[1]:
+            return None
+        wm = int(row[1])
+        cur = conn.execute(
+            "SELECT ts_us, value FROM points_v2 WHERE unit_id = ? AND col = ? AND ts_us BETWEEN ? AND ?"
+            " ORDER BY ts_us, seq",
+            (unit_id, value_col, start_sec * _US, min(end_sec, wm) * _US),
+        )
+        while True:
+            rows = cur.fetchmany(SYNC_BATCH)
+            if not rows:
+                break
+            for ts_us, val in rows:
+                epochs.append(ts_us // _US)                # наружу — целые секунды, как из живой БД
+                values.append(val)
+        return wm
+    except sqlite3.Error:
+        logger.exception("termocom mirror read failed")
+        return None
+    finally:
+        conn.close()
+
+
+# ---------- докачка ----------
+
+def _sync_column(src, dst: sqlite3.Connection, table: str, ts_col: str, value_col: str, target: int) -> int:
+    """
+    Докачать одну колонку окнами по SYNC_WINDOW до target. Вернёт число записанных строк.
+    Начинаем с watermark − OVERLAP_MINUTES: окно сначала стирается, потом записывается заново целиком —
+    опоздавшие строки попадают в зеркало, а уже скопированные не дублируются.
+    """
+    row = dst.execute("SELECT first_ts, last_ts FROM watermarks_v2 WHERE col = ?", (value_col,)).fetchone()
+    if row:
+        first, wm = int(row[0]), int(row[1])
+        wm = max(first, wm - OVERLAP_MINUTES * 60)
+    else:
+        first = wm = target - INITIAL_DAYS * 86400
+    written = 0
+
+    sql = f"""
+        SELECT UNIT_ID, {ts_col}, {value_col}
+        FROM {table}
+        WHERE {ts_col} > ? AND {ts_col} <= ?
+          AND {value_col} IS NOT NULL
+    """
+    cur = src.cursor()
+    cur.arraysize = SYNC_BATCH
+    while wm < target:
+        hi = min(wm + SYNC_WINDOW, target)
+        dst.execute(
+            "DELETE FROM points_v2 WHERE col = ? AND ts_us > ? AND ts_us <= ?",
+            (value_col, wm * _US, hi * _US),
+        )
+        seen: Counter = Counter()                     # (unit_id, ts_us) → сколько строк с этим временем уже было
+        cur.execute(sql, _wall_datetime(wm), _wall_datetime(hi))
+        while True:
+            rows = cur.fetchmany(SYNC_BATCH)
+            if not rows:
+                break
+            batch = []
+            for u, ts, v in rows:
+                if u is None or ts is None:
+                    continue
+                key = (int(u), (ts - _WALL_EPOCH) // _ONE_US)
+                batch.append((key[0], value_col, key[1], seen[key], float(v)))
+                seen[key] += 1
+            dst.executemany(
+                "INSERT INTO points_v2 (unit_id, col, ts_us, seq, value) VALUES (?, ?, ?, ?, ?)", batch
+            )
+            written += len(batch)
+        # окно записано целиком — двигаем watermark в той же транзакции
+        dst.execute(
+            "INSERT OR REPLACE INTO watermarks_v2 (col, tbl, first_ts, last_ts, synced_at) VALUES (?, ?, ?, ?, ?)",
+            (value_col, table, first, hi, datetime.now().isoformat(timespec="seconds")),
+        )
+        dst.commit()
+        wm = hi
+    return written
+
+
+def sync_mirror(columns: Iterable[Tuple[str, str, str]]) -> int:
+    """
+    Один проход докачки по всем колонкам [(таблица, колонка времени, колонка значения), ...].
+    Зеркало заполняется до «сейчас − LIVE_TAIL_MINUTES»: свежие строки ещё могут дописываться
+    и остаются за живой БД. Вернёт общее число скопированных строк.
+    """
+    if not mirror_enabled():
+        raise RuntimeError("TERMOCOM_MIRROR_PATH is not set")
+
+    target = _wall_now() - LIVE_TAIL_MINUTES * 60
+    dsn = ";".join(f"{k}={v}" for k, v in settings.SQL_SERVER.items())
+    total = 0
+
+    dst = _connect()
+    try:
+        dst.executescript(_SCHEMA)
+        with pyodbc.connect(dsn) as src:
+            for table, ts_col, value_col in columns:
+                n = _sync_column(src, dst, table, ts_col, value_col, target)
+                logger.info("termocom mirror: %s.%s +%d rows", table, value_col, n)
+                total += n
+    finally:
+        dst.close()
+    return total
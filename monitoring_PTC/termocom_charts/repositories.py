@@ -1,11 +1,15 @@
 from __future__ import annotations
 
-from typing import List, Tuple
-from datetime import datetime
+from array import array
+from typing import Dict, Iterator, List, Tuple
+from datetime import datetime, timedelta
 
 import pyodbc
 from django.conf import settings
 
+from .directory import get_units_directory
+from .mirror import read_mirror
+
 
 # --------- маппинг параметров ---------
 # Параметр: (таблица, колонка значения, колонка времени)
@@ -33,127 +37,507 @@ TERMOCOM_PARAM_MAP = {
 }
 
 
+# Специальное правило:
+# для GACM некоторых объектов (5019, 4046) график строим по G1 их "A"-вариантов.
+# 5019  -> G1(5019A)
+# 4046  -> G1(4046A)
+PTC_GACM_FROM_A: Dict[str, str] = {
+    "5019": "5019A",
+    "4046": "4046A",
+}
+
+
+def series_lookup(pti: str, param: str) -> Tuple[str, str]:
+    """
+    Какой (PTC, параметр) реально читать для запрошенной пары.
+    Обычно это та же пара; GACM для 5019/4046 → G1 от 5019A/4046A.
+    """
+    pti = str(pti).strip()
+    param = (param or "").upper().strip()
+    if param == "GACM" and pti in PTC_GACM_FROM_A:
+        return PTC_GACM_FROM_A[pti], "G1"
+    return pti, param
+
 
 def _dsn(cfg: dict) -> str:
     return ";".join(f"{k}={v}" for k, v in cfg.items())
 
 
 def resolve_unit_id_by_ptc(pti: str | int) -> int | None:
-    ptc_str = str(pti).strip()
+    """
+    UNIT_ID по коду PTC (UNIT_NAME LIKE 'PT_' + pti + '%', первый по имени).
+    Ищем в справочнике UNITS в памяти (directory.py) — без SQL в пути запроса.
+    """
+    return get_units_directory().resolve(str(pti).strip())
+
+
+
+# --------- ряд в плотных буферах ---------
+# Время в HTREND — локальное naive. В буфере храним «настенные» секунды от 1970-01-01 (без TZ):
+# перевод туда-обратно однозначен и не зависит от перевода часов.
+_WALL_EPOCH = datetime(1970, 1, 1)
+_ONE_SECOND = timedelta(seconds=1)
+
+
+def wall_seconds(ts: datetime) -> int:
+    """naive локальное время → «настенные» секунды."""
+    return (ts - _WALL_EPOCH) // _ONE_SECOND
+
+
+def wall_datetime(sec: int) -> datetime:
+    """«Настенные» секунды → naive локальное время."""
+    return _WALL_EPOCH + timedelta(seconds=sec)
+
+
+class SeriesArrays:
+    """
+    Ряд TERMOCOM без объектов на каждую точку: epochs — array('q') «настенных» секунд,
+    values — array('d'). Итерация отдаёт (naive datetime, float) — для кода, которому нужны пары.
+    """
+    __slots__ = ("epochs", "values")
+
+    def __init__(self) -> None:
+        self.epochs = array('q')
+        self.values = array('d')
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def __iter__(self) -> Iterator[Tuple[datetime, float]]:
+        for sec, val in zip(self.epochs, self.values):
+            yield wall_datetime(sec), val
+
+    def iso_labels(self) -> List[str]:
+        """Метки 'YYYY-MM-DDTHH:MM:SS' (как datetime.isoformat()); дата форматируется один раз на сутки."""
+        out: List[str] = []
+        day = None
+        prefix = ""
+        for sec in self.epochs:
+            d, rest = divmod(sec, 86400)
+            if d != day:
+                day = d
+                prefix = wall_datetime(d * 86400).strftime("%Y-%m-%dT")
+            h, rest = divmod(rest, 3600)
+            m, sc = divmod(rest, 60)
+            out.append(f"{prefix}{h:02d}:{m:02d}:{sc:02d}")
+        return out
+
+
+def mirror_columns() -> List[Tuple[str, str, str]]:
+    """Уникальные (таблица, колонка времени, колонка значения) из TERMOCOM_PARAM_MAP — что копирует зеркало."""
+    return list(dict.fromkeys((t, ts, v) for t, v, ts in TERMOCOM_PARAM_MAP.values()))
+
+
+def fetch_termocom_series(
+    unit_id: int,
+    param_code: str,
+    start_dt: datetime,
+    end_dt: datetime,
+    batch_size: int = 5000,
+) -> SeriesArrays:
+    """
+    Ряд параметра за интервал. Строки читаются пачками (fetchmany, cursor.arraysize) и сразу
+    раскладываются в array('q')/array('d') — без промежуточного списка кортежей.
+    Если включено локальное зеркало (mirror.py), всё до его watermark читается из SQLite,
+    а в TERMOCOM5 уходит только запрос за оставшийся «хвост».
+    Доли секунды в метках времени отбрасываются.
+    """
+    param_code = param_code.upper().strip()
+    out = SeriesArrays()
+
+    if param_code not in TERMOCOM_PARAM_MAP:
+        return out
+
+    table_name, value_col, ts_col = TERMOCOM_PARAM_MAP[param_code]
+
+    # время в HTREND — локальное naive (pyodbc всё равно отбрасывает tzinfo)
+    start_dt = start_dt.replace(tzinfo=None)
+    end_dt = end_dt.replace(tzinfo=None)
+
+    ts_cond = f"{ts_col} BETWEEN ? AND ?"
+    wm = read_mirror(unit_id, value_col, wall_seconds(start_dt), wall_seconds(end_dt), out.epochs, out.values)
+    if wm is not None:
+        if wall_seconds(end_dt) <= wm:
+            return out
+        start_dt = wall_datetime(wm)
+        ts_cond = f"{ts_col} > ? AND {ts_col} <= ?"
+
+    sql = f"""
+        SELECT {ts_col}, {value_col}
+        FROM {table_name}
+        WHERE UNIT_ID = ?
+          AND {ts_cond}
+        ORDER BY {ts_col}
+    """
 
     dsn = _dsn(settings.SQL_SERVER)
+    epochs_append = out.epochs.append
+    values_append = out.values.append
+
     with pyodbc.connect(dsn) as conn:
         cur = conn.cursor()
-        cur.execute(
-            """
-            SELECT TOP (1) UNIT_ID, UNIT_NAME
-            FROM UNITS
-            WHERE UNIT_ENABLED = 1
-              AND UNIT_NAME LIKE 'PT_' + ? + '%'
-            ORDER BY UNIT_NAME
-            """,
-            ptc_str,
-        )
-        row = cur.fetchone()
-        return int(row.UNIT_ID) if row and row.UNIT_ID is not None else None
+        cur.arraysize = batch_size
+        cur.execute(sql, unit_id, start_dt, end_dt)
 
+        while True:
+            rows = cur.fetchmany(batch_size)
+            if not rows:
+                break
+            for ts, val in rows:
+                if ts is None or val is None:
+                    continue
+                epochs_append((ts - _WALL_EPOCH) // _ONE_SECOND)
+                values_append(val)
 
-def fetch_termocom_series(
+    return out
+
+
+# Ключ keyset-пагинации: (время в «настенных» микросекундах, значение, сколько строк с ровно такими
+# временем и значением уже отдано). Своего id у строк HTREND нет, поэтому порядок — (время, значение),
+# а полные дубли различаются только счётчиком.
+PageKey = Tuple[int, float, int]
+
+_ONE_US = timedelta(microseconds=1)
+_ONE_MS = timedelta(milliseconds=1)
+
+
+def fetch_termocom_page(
     unit_id: int,
     param_code: str,
     start_dt: datetime,
     end_dt: datetime,
-) -> List[Tuple[datetime, float]]:
+    limit: int,
+    after: PageKey | None = None,
+) -> Tuple[SeriesArrays, PageKey | None]:
+    """
+    Одна страница ряда для keyset-пагинации: первые `limit` точек после ключа after
+    (или с start_dt для первой страницы) и ≤ end_dt, по возрастанию (время, значение).
+    Вернёт (страница, ключ последней отданной точки — None, если страница пустая).
+    TOP (?) + ORDER BY по колонке времени — сервер не читает и не держит весь интервал.
+    Время сравнивается с запасом в 1 мс и досеивается здесь по точному ключу: datetime SQL Server
+    (шаг 1/300 с) при сравнении с параметром-datetime2 не обязан совпадать с прочитанным значением.
+    """
     param_code = param_code.upper().strip()
+    out = SeriesArrays()
 
     if param_code not in TERMOCOM_PARAM_MAP:
+        return out, None
+
+    table_name, value_col, ts_col = TERMOCOM_PARAM_MAP[param_code]
+
+    start_dt = start_dt.replace(tzinfo=None)
+    end_dt = end_dt.replace(tzinfo=None)
+    lower = start_dt
+    if after is not None:
+        lower = max(start_dt, _WALL_EPOCH + after[0] * _ONE_US - _ONE_MS)
+
+    sql = f"""
+        SELECT TOP (?) {ts_col}, {value_col}
+        FROM {table_name}
+        WHERE UNIT_ID = ?
+          AND {ts_col} >= ?
+          AND {ts_col} <= ?
+          AND {value_col} IS NOT NULL
+        ORDER BY {ts_col}, {value_col}
+    """
+
+    rows: List[Tuple[int, float]] = []
+    extra = 16                                   # строки до ключа, попавшие в запас по времени
+    dsn = _dsn(settings.SQL_SERVER)
+    with pyodbc.connect(dsn) as conn:
+        cur = conn.cursor()
+        while True:
+            cur.arraysize = min(limit + extra, 5000)
+            cur.execute(sql, limit + extra, unit_id, lower, end_dt)
+            raw = cur.fetchall()
+            rows = _after_key(
+                [((ts - _WALL_EPOCH) // _ONE_US, float(val)) for ts, val in raw if ts is not None],
+                after, limit,
+            )
+            if len(rows) >= limit or len(raw) < limit + extra:
+                break
+            extra *= 4                           # запас съел страницу — перечитать шире
+
+    if not rows:
+        return out, None
+    for ts_us, val in rows:
+        out.epochs.append(ts_us // 1_000_000)
+        out.values.append(val)
+
+    last = rows[-1]
+    dup = sum(1 for r in rows if r == last)
+    if after is not None and (after[0], after[1]) == last and dup == len(rows):
+        dup += after[2]                          # вся страница — продолжение тех же дублей
+    return out, (last[0], last[1], dup)
+
+
+def _after_key(rows: List[Tuple[int, float]], after: PageKey | None, limit: int) -> List[Tuple[int, float]]:
+    """Строки (ts_us, value) в порядке ключа, строго после after; первые limit."""
+    if after is None:
+        return rows[:limit]
+    key = (after[0], after[1])
+    skip = after[2]
+    out: List[Tuple[int, float]] = []
+    for r in rows:
+        if r < key:
+            continue
+        if r == key and skip:
+            skip -= 1
+            continue
+        out.append(r)
+        if len(out) == limit:
+            break
+    return out
+
+
+# --------- агрегирование на стороне SQL ---------
+# agg → ширина бакета в минутах (бакеты выровнены от 1900-01-01, т.е. по границам часов/суток)
+AGG_BUCKET_MINUTES: Dict[str, int] = {
+    '10min': 10,
+    'hour':  60,
+    'day':   1440,
+}
+
+
+def fetch_termocom_series_agg(
+    unit_id: int,
+    param_code: str,
+    start_dt: datetime,
+    end_dt: datetime,
+    agg: str,
+) -> List[Tuple[datetime, float, float, float, int, float]]:
+    """
+    Ряд TERMOCOM, сгруппированный по времени прямо в SQL Server (DATEADD/DATEDIFF + GROUP BY).
+    Возвращает [(начало_бакета, min, avg, max, count, sumsq), ...] — на год при agg=hour это ~9 тыс. строк
+    вместо миллионов сырых. sumsq = сумма квадратов значений (нужна для точной σ по всему ряду).
+    """
+    param_code = param_code.upper().strip()
+    if param_code not in TERMOCOM_PARAM_MAP or agg not in AGG_BUCKET_MINUTES:
         return []
 
     table_name, value_col, ts_col = TERMOCOM_PARAM_MAP[param_code]
+    minutes = AGG_BUCKET_MINUTES[agg]
+    bucket = f"DATEADD(minute, (DATEDIFF(minute, 0, {ts_col}) / {minutes}) * {minutes}, 0)"
 
     sql = f"""
-        SELECT {ts_col}, {value_col}
+        SELECT
+            {bucket}                                                    AS BUCKET,
+            MIN(CAST({value_col} AS float))                             AS VMIN,
+            AVG(CAST({value_col} AS float))                             AS VAVG,
+            MAX(CAST({value_col} AS float))                             AS VMAX,
+            COUNT(*)                                                    AS N,
+            SUM(CAST({value_col} AS float) * CAST({value_col} AS float)) AS SUMSQ
         FROM {table_name}
         WHERE UNIT_ID = ?
           AND {ts_col} BETWEEN ? AND ?
-        ORDER BY {ts_col}
+          AND {value_col} IS NOT NULL
+        GROUP BY {bucket}
+        ORDER BY BUCKET
     """
 
     dsn = _dsn(settings.SQL_SERVER)
-    out: List[Tuple[datetime, float]] = []
+    out: List[Tuple[datetime, float, float, float, int, float]] = []
 
     with pyodbc.connect(dsn) as conn:
         cur = conn.cursor()
         cur.execute(sql, unit_id, start_dt, end_dt)
-
         for row in cur.fetchall():
-            ts = getattr(row, ts_col, None)
-            val = getattr(row, value_col, None)
-            if ts is None or val is None:
+            if row.BUCKET is None or not row.N:
                 continue
-            out.append((ts, float(val)))
+            out.append((row.BUCKET, float(row.VMIN), float(row.VAVG), float(row.VMAX), int(row.N), float(row.SUMSQ)))
 
     return out
 
 
-def list_objects_tc() -> List[dict]:
+def iter_termocom_series(
+    unit_id: int,
+    param_code: str,
+    start_dt: datetime,
+    end_dt: datetime,
+    batch_size: int = 5000,
+) -> Iterator[Tuple[datetime, float]]:
     """
-    Вернёт список объектов TERMOCOM5 для выпадающего списка.
-    Формат: [{"pti": "5118", "adres": "...."}, ...]
-    Адрес берём так же, как в Monitoring PTC: из LOVATI.dbo.PTC_adrese.
+    То же, что fetch_termocom_series, но генератором: строки читаются пачками (fetchmany)
+    и отдаются по одной, весь ряд в памяти не собирается. Соединение закрывается по завершении.
     """
-    # 1) Собираем словарь адресов по PTC из LOVATI
-    address_map: dict[str, str] = {}
+    param_code = param_code.upper().strip()
+    if param_code not in TERMOCOM_PARAM_MAP:
+        return
+
+    table_name, value_col, ts_col = TERMOCOM_PARAM_MAP[param_code]
 
+    sql = f"""
+        SELECT {ts_col}, {value_col}
+        FROM {table_name}
+        WHERE UNIT_ID = ?
+          AND {ts_col} BETWEEN ? AND ?
+        ORDER BY {ts_col}
+    """
+
+    conn = pyodbc.connect(_dsn(settings.SQL_SERVER))
     try:
-        dsn_lovati = _dsn(settings.LOVATI_SERVER)
-        with pyodbc.connect(dsn_lovati) as conn_l:
-            cur_l = conn_l.cursor()
-            cur_l.execute("""
-                SELECT
-                    RTRIM(PTC)    AS PTC,
-                    RTRIM(adresa) AS adresa
-                FROM [LOVATI].[dbo].[PTC_adrese]
-                WHERE LEN(RTRIM(PTC)) = 4
-                  AND LEFT(RTRIM(PTC), 1) IN ('1','2','3','4','5')
-            """)
-            address_map = {
-                str(r.PTC).strip(): str(r.adresa or '').strip()
-                for r in cur_l.fetchall()
-            }
-    except Exception:
-        # Если по какой-то причине LOVATI недоступна — не падаем,
-        # просто вернём объекты без адреса, как было раньше.
-        address_map = {}
-
-    # 2) Читаем объекты из TERMOCOM5.UNITS
-    dsn_termo = _dsn(settings.SQL_SERVER)
-
-    sql_units = """
-        SELECT UNIT_ID, UNIT_NAME
-        FROM UNITS
-        WHERE UNIT_ENABLED = 1
-          AND UNIT_NAME LIKE 'PT_%'
-        ORDER BY UNIT_NAME
-    """
-
-    result: List[dict] = []
-    with pyodbc.connect(dsn_termo) as conn_t:
-        cur_t = conn_t.cursor()
-        for row in cur_t.execute(sql_units):
-            name = (row.UNIT_NAME or '').strip()
-            if not name.startswith('PT_'):
-                continue
+        cur = conn.cursor()
+        cur.arraysize = batch_size
+        cur.execute(sql, unit_id, start_dt, end_dt)
+        while True:
+            rows = cur.fetchmany(batch_size)
+            if not rows:
+                break
+            for ts, val in rows:
+                if ts is None or val is None:
+                    continue
+                yield ts, float(val)
+    finally:
+        conn.close()
+
+
+def fetch_termocom_series_multi(
+    unit_id: int,
+    params,
+    start_dt: datetime,
+    end_dt: datetime,
+) -> Dict[str, List[Tuple[datetime, float]]]:
+    """
+    Несколько параметров одного объекта за один проход по каждой HTREND-таблице.
+    Параметры группируются по таблице (MC_* → MULTICAL, DCX_* → DCX7600); из таблицы одним запросом
+    читаются все нужные колонки значение/время. У каждого параметра своя колонка времени,
+    поэтому фильтр по интервалу проверяется отдельно для каждого параметра.
+    Возвращает {param: [(ts, value), ...]} (неизвестные параметры пропускаются).
+    """
+    by_table: Dict[str, List[Tuple[str, str, str]]] = {}
+    for p in params:
+        code = (p or "").upper().strip()
+        if code in TERMOCOM_PARAM_MAP:
+            table_name, value_col, ts_col = TERMOCOM_PARAM_MAP[code]
+            by_table.setdefault(table_name, []).append((code, value_col, ts_col))
+
+    out: Dict[str, List[Tuple[datetime, float]]] = {code: [] for cols in by_table.values() for code, _, _ in cols}
+    if not by_table:
+        return out
+
+    dsn = _dsn(settings.SQL_SERVER)
+    with pyodbc.connect(dsn) as conn:
+        cur = conn.cursor()
+        for table_name, cols in by_table.items():
+            # одна и та же колонка может обслуживать несколько параметров (T32 и T44 → DCX_TR02)
+            select_cols: List[str] = []
+            for _, value_col, ts_col in cols:
+                for c in (ts_col, value_col):
+                    if c not in select_cols:
+                        select_cols.append(c)
+            ts_cols = list(dict.fromkeys(ts_col for _, _, ts_col in cols))
+            where_ts = " OR ".join(f"{c} BETWEEN ? AND ?" for c in ts_cols)
+            args: List = [unit_id]
+            for _ in ts_cols:
+                args.extend((start_dt, end_dt))
+
+            sql = f"""
+                SELECT {", ".join(select_cols)}
+                FROM {table_name}
+                WHERE UNIT_ID = ?
+                  AND ({where_ts})
+                ORDER BY {ts_cols[0]}
+            """
+            cur.execute(sql, *args)
+
+            idx = {c: i for i, c in enumerate(select_cols)}
+            plan = [(code, idx[ts_col], idx[value_col]) for code, value_col, ts_col in cols]
+            for row in cur.fetchall():
+                for code, i_ts, i_val in plan:
+                    ts = row[i_ts]
+                    val = row[i_val]
+                    if ts is None or val is None or ts < start_dt or ts > end_dt:
+                        continue
+                    out[code].append((ts, float(val)))
+
+    for series in out.values():
+        series.sort(key=lambda p: p[0])       # у разных колонок времени порядок может отличаться
+    return out
 
-            # "PT_5118" -> "5118" (как в monitoring/views.py)
-            pti_raw = name[3:]
-            pti = pti_raw.split('/')[0].strip()
 
-            adres = address_map.get(pti, "")
+def count_termocom_hourly(day_start: datetime, n_hours: int = 24) -> Dict[Tuple[int, str], List[int]]:
+    """
+    Сколько точек пришло по каждому (UNIT_ID, параметр) в каждый час интервала [day_start, +n_hours).
+    Один GROUP BY на колонку значения по ВСЕМ объектам сразу (для ночного индекса полноты данных).
+    Параметры с общей колонкой (T32/T44) получают одинаковые счётчики.
+    Возвращает {(unit_id, param): [count_час0, count_час1, ...]}.
+    """
+    day_start = day_start.replace(tzinfo=None)
+    day_end = day_start + timedelta(hours=n_hours)
 
-            result.append({
-                "pti": pti,
-                "adres": adres,
-            })
+    params_by_col: Dict[Tuple[str, str, str], List[str]] = {}
+    for code, (table_name, value_col, ts_col) in TERMOCOM_PARAM_MAP.items():
+        params_by_col.setdefault((table_name, ts_col, value_col), []).append(code)
 
-    return result
+    out: Dict[Tuple[int, str], List[int]] = {}
+    dsn = _dsn(settings.SQL_SERVER)
+    with pyodbc.connect(dsn) as conn:
+        cur = conn.cursor()
+        for (table_name, ts_col, value_col), codes in params_by_col.items():
+            cur.execute(
+                f"""
+                SELECT UNIT_ID, DATEDIFF(hour, ?, {ts_col}) AS H, COUNT(*) AS N
+                FROM {table_name}
+                WHERE {ts_col} >= ? AND {ts_col} < ?
+                  AND {value_col} IS NOT NULL
+                GROUP BY UNIT_ID, DATEDIFF(hour, ?, {ts_col})
+                """,
+                day_start, day_start, day_end, day_start,
+            )
+            for unit_id, h, n in cur.fetchall():
+                if unit_id is None or h is None or not 0 <= h < n_hours:
+                    continue
+                for code in codes:
+                    out.setdefault((int(unit_id), code), [0] * n_hours)[h] += int(n)
+    return out
+
+
+def fetch_termocom_hourly_stats(
+    day_start: datetime,
+    n_hours: int = 24,
+) -> Dict[Tuple[int, str], List[Tuple[int, int, float, float, float, float]]]:
+    """
+    Часовые агрегаты по ВСЕМ объектам за интервал [day_start, +n_hours): один GROUP BY на колонку значения.
+    Возвращает {(unit_id, param): [(час_от_начала, count, min, avg, max, sumsq), ...]} — для ночных роллапов.
+    """
+    day_start = day_start.replace(tzinfo=None)
+    day_end = day_start + timedelta(hours=n_hours)
+
+    params_by_col: Dict[Tuple[str, str, str], List[str]] = {}
+    for code, (table_name, value_col, ts_col) in TERMOCOM_PARAM_MAP.items():
+        params_by_col.setdefault((table_name, ts_col, value_col), []).append(code)
+
+    out: Dict[Tuple[int, str], List[Tuple[int, int, float, float, float, float]]] = {}
+    dsn = _dsn(settings.SQL_SERVER)
+    with pyodbc.connect(dsn) as conn:
+        cur = conn.cursor()
+        for (table_name, ts_col, value_col), codes in params_by_col.items():
+            v = f"CAST({value_col} AS float)"
+            cur.execute(
+                f"""
+                SELECT UNIT_ID, DATEDIFF(hour, ?, {ts_col}) AS H,
+                       COUNT(*) AS N, MIN({v}) AS VMIN, AVG({v}) AS VAVG, MAX({v}) AS VMAX, SUM({v} * {v}) AS SUMSQ
+                FROM {table_name}
+                WHERE {ts_col} >= ? AND {ts_col} < ?
+                  AND {value_col} IS NOT NULL
+                GROUP BY UNIT_ID, DATEDIFF(hour, ?, {ts_col})
+                """,
+                day_start, day_start, day_end, day_start,
+            )
+            for unit_id, h, n, vmin, vavg, vmax, sumsq in cur.fetchall():
+                if unit_id is None or h is None or not n or not 0 <= h < n_hours:
+                    continue
+                row = (int(h), int(n), float(vmin), float(vavg), float(vmax), float(sumsq))
+                for code in codes:
+                    out.setdefault((int(unit_id), code), []).append(row)
+    return out
+
+
+def list_objects_tc() -> List[dict]:
+    """
+    Вернёт список объектов TERMOCOM5 для выпадающего списка.
+    Формат: [{"pti": "5118", "adres": "...."}, ...]
+    Адрес берём так же, как в Monitoring PTC: из LOVATI.dbo.PTC_adrese.
+    Список собирается при загрузке справочника UNITS (directory.py) и обновляется вместе с ним.
+    """
+    return [dict(o) for o in get_units_directory().objects]
@@ -4,35 +4,44 @@
 
 from __future__ import annotations
 
-from typing import Any, Dict, List
-from datetime import datetime
+import base64
+import json
+from typing import Any, Dict, List, Tuple
+from datetime import date, datetime, time as dtime
 
 from django.shortcuts import render
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse
 
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
+from rest_framework.renderers import JSONRenderer
 
-from monitoring_PTC.charts.timezone_utils import parse_local_iso
-from monitoring_PTC.charts.serializers import SeriesResponseSerializer
+from monitoring_PTC.charts.timezone_utils import parse_local_iso, TZ_CHISINAU
+from monitoring_PTC.charts.stats import summarize
+from monitoring_PTC.charts.chunks import local_today
+from monitoring_PTC.charts.overlay import parse_overlay_params, overlay_days, build_overlay
+from monitoring_PTC.charts.rollups import read_rollup, agg_payload
+from monitoring_PTC.charts import costs
+from monitoring_PTC.charts.costs import StageTimer
 
 from .repositories import (
     TERMOCOM_PARAM_MAP,
     resolve_unit_id_by_ptc,
     fetch_termocom_series,
+    PageKey,
+    fetch_termocom_page,
+    fetch_termocom_series_agg,
+    fetch_termocom_series_multi,
+    AGG_BUCKET_MINUTES,
     list_objects_tc,
+    series_lookup,
+    wall_seconds,
 )
+from .directory import get_units_directory
 
-# Специальное правило:
-# для GACM некоторых объектов (5019, 4046) график строим по G1 их "A"-вариантов.
-# 5019  -> G1(5019A)
-# 4046  -> G1(4046A)
-PTC_GACM_FROM_A: Dict[str, str] = {
-    "5019": "5019A",
-    "4046": "4046A",
-}
-
+# Максимальный размер страницы в постраничном режиме (точек)
+PAGE_SIZE_MAX = 50_000
 
 # ---------- HTML-страница ----------
 
@@ -62,6 +71,11 @@ class TermocomSeriesView(APIView):
         &param=G1
         &start=2025-11-17T00:00
         &end=2025-11-17T23:59
+        [&agg=detail|10min|hour|day]   — min/avg/max по бакетам, сгруппированным в SQL
+        [&params=T1,T2,G1 вместо param] — несколько линий за один проход по таблицам
+        [&mode=overlay&date=...&periods=7] — наложение прошлых периодов
+        [&page_size=N[&cursor=...]]     — постранично по N точек, курсор следующей страницы в "next"
+        [&debug=1]                      — стоимость запроса по стадиям до рендера (serialize — в /charts/api/costs/)
     """
 
     def get(self, request, *args, **kwargs):
@@ -69,6 +83,14 @@ class TermocomSeriesView(APIView):
         param_raw = (request.query_params.get("param") or "").strip()
         start_s = (request.query_params.get("start") or "").strip()
         end_s = (request.query_params.get("end") or "").strip()
+        mode = (request.query_params.get("mode") or "").strip().lower()
+
+        if mode == "overlay":
+            return self._overlay(request, pti_raw, param_raw.upper())
+
+        params_raw = (request.query_params.get("params") or "").strip()
+        if params_raw:                                   # несколько линий на одном графике — один проход по таблицам
+            return self._multi(pti_raw, params_raw, start_s, end_s)
 
         if not pti_raw or not param_raw or not start_s or not end_s:
             return Response(
@@ -84,18 +106,16 @@ class TermocomSeriesView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        # По умолчанию берём серию по самому объекту и тому же параметру
-        lookup_pti = pti_raw
-        lookup_param = param
+        debug = (request.query_params.get("debug") or "").lower() in ("1", "true", "yes")
+        timer = StageTimer()
 
-        # ОСОБОЕ ПРАВИЛО:
-        # если просим GACM для 5019 или 4046, то фактически читаем G1 от 5019A/4046A
-        if param == "GACM" and pti_raw in PTC_GACM_FROM_A:
-            lookup_pti = PTC_GACM_FROM_A[pti_raw]   # '5019A' или '4046A'
-            lookup_param = "G1"
+        # По умолчанию берём серию по самому объекту и тому же параметру
+        # (ОСОБОЕ ПРАВИЛО: GACM для 5019/4046 читается как G1 от 5019A/4046A — см. PTC_GACM_FROM_A)
+        lookup_pti, lookup_param = series_lookup(pti_raw, param)
 
         # 1) ищем UNIT_ID по (lookup_pti) в UNITS
-        unit_id = resolve_unit_id_by_ptc(lookup_pti)
+        with timer.stage("catalog"):
+            unit_id = resolve_unit_id_by_ptc(lookup_pti)
         if not unit_id:
             return Response(
                 {"detail": f"PTC '{lookup_pti}' not found or not enabled in TERMOCOM5"},
@@ -112,36 +132,267 @@ class TermocomSeriesView(APIView):
         if dt_end < dt_start:
             dt_start, dt_end = dt_end, dt_start
 
-        # 3) забираем серию из таблицы
+        # 3a) агрегированный режим: бакеты считаются в SQL, отдаём min/avg/max на бакет
+        agg = (request.query_params.get("agg") or "detail").strip().lower()
+        if agg != "detail":
+            if agg not in AGG_BUCKET_MINUTES:
+                return Response(
+                    {"detail": f"agg must be detail or one of: {', '.join(AGG_BUCKET_MINUTES.keys())}"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            return self._aggregated(unit_id, lookup_param, dt_start, dt_end, agg, timer)
+
+        # 3b) постраничный режим: keyset по времени, сервер держит в памяти только одну страницу
+        if request.query_params.get("page_size"):
+            return self._page(request, unit_id, lookup_param, dt_start, dt_end, timer)
+
+        # 3) забираем серию из таблицы (плотные буферы array('q') / array('d'))
         try:
             # ВАЖНО: используем lookup_param (иногда это G1 вместо GACM)
-            pairs = fetch_termocom_series(unit_id, lookup_param, dt_start, dt_end)
+            with timer.stage("fetch"):
+                series = fetch_termocom_series(unit_id, lookup_param, dt_start, dt_end)
+        except Exception as e:
+            return Response({"detail": f"db error: {e}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        # объём полученных данных: 8 байт время + 8 байт значение на точку
+        timer.add_bytes(series.epochs.itemsize * len(series.epochs) + series.values.itemsize * len(series.values))
+        timer.points = len(series)
+
+        # 4) метки времени и значения для ответа
+        with timer.stage("parse"):
+            labels = series.iso_labels()
+            values = series.values.tolist()
+
+        # 5) статистика (в том же формате, что и LOVATI) — общий однопроходный движок прямо по буферу
+        with timer.stage("aggregate"):
+            summary = summarize(series.values)
+
+        # Форма ответа та же, что у SeriesResponseSerializer; сериализатор не используем,
+        # чтобы не гонять каждую точку через ListField/FloatField. JSON рендерим сами — стадия serialize.
+        payload: Dict[str, Any] = {"labels": labels, "values": values, "summary": summary}
+        if debug:                                        # стоимость до рендера: serialize в неё не входит
+            payload["debug"] = {"unit_id": unit_id, "param": lookup_param, "cost": timer.as_dict()}
+        with timer.stage("serialize"):
+            body = JSONRenderer().render(payload)
+        costs.record("tc", "termocom", lookup_param, timer)
+        return HttpResponse(body, content_type="application/json")
+
+    def _multi(self, pti_raw: str, params_raw: str, start_s: str, end_s: str):
+        """
+        GET /tc-charts/api/series/?pti=5020&params=T1,T2,G1,G2,DT&start=...&end=...
+        -> {"series": {"T1": {labels, values, summary}, ...}}
+        Параметры одного UNIT_ID читаются fetch_termocom_series_multi: один запрос на HTREND-таблицу.
+        """
+        params = [p.strip().upper() for p in params_raw.split(",") if p.strip()]
+        bad = [p for p in params if p not in TERMOCOM_PARAM_MAP]
+        if not pti_raw or not params or not start_s or not end_s or bad:
+            return Response(
+                {"detail": f"required: pti, params (in: {', '.join(sorted(TERMOCOM_PARAM_MAP.keys()))}), start, end"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            dt_start = parse_local_iso(start_s).replace(tzinfo=None)
+            dt_end = parse_local_iso(end_s).replace(tzinfo=None)
+        except Exception as e:
+            return Response({"detail": f"bad datetime: {e}"}, status=status.HTTP_400_BAD_REQUEST)
+        if dt_end < dt_start:
+            dt_start, dt_end = dt_end, dt_start
+
+        # (lookup_pti) → [(запрошенный параметр, фактический параметр)]; GACM 5019/4046 уходит на "A"-объект
+        timer = StageTimer()
+        by_unit_pti: Dict[str, List[Tuple[str, str]]] = {}
+        for p in params:
+            lookup_pti, lookup_param = series_lookup(pti_raw, p)
+            by_unit_pti.setdefault(lookup_pti, []).append((p, lookup_param))
+
+        series: Dict[str, Any] = {}
+        for lookup_pti, pairs in by_unit_pti.items():
+            with timer.stage("catalog"):
+                unit_id = resolve_unit_id_by_ptc(lookup_pti)
+            if not unit_id:
+                return Response(
+                    {"detail": f"PTC '{lookup_pti}' not found or not enabled in TERMOCOM5"},
+                    status=status.HTTP_404_NOT_FOUND,
+                )
+            try:
+                with timer.stage("fetch"):
+                    data = fetch_termocom_series_multi(unit_id, {lp for _, lp in pairs}, dt_start, dt_end)
+            except Exception as e:
+                return Response({"detail": f"db error: {e}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            for p, lp in pairs:
+                pts = data.get(lp, [])
+                timer.points += len(pts)
+                with timer.stage("parse"):
+                    labels = [ts.isoformat() for ts, _ in pts]
+                    values = [v for _, v in pts]
+                with timer.stage("aggregate"):
+                    summary = summarize(values)
+                series[p] = {"labels": labels, "values": values, "summary": summary}
+
+        with timer.stage("serialize"):
+            body = JSONRenderer().render({"pti": pti_raw, "series": series})
+        costs.record("tc", "termocom", ",".join(sorted(set(params))), timer, mode="multi")
+        return HttpResponse(body, content_type="application/json")
+
+    def _aggregated(self, unit_id: int, param: str, dt_start: datetime, dt_end: datetime, agg: str,
+                    timer: StageTimer):
+        """
+        Ответ agg-режима: labels = начало бакета, values = среднее, min/max/count — по бакетам.
+        summary считается по всему ряду: count/min/max/avg/σ точно (из сумм), перцентили — по средним бакетов.
+        Посчитанные ночью сутки (agg=hour|day) берутся из роллапов (charts/rollups.py), остальное — GROUP BY в SQL.
+        """
+        start = dt_start.replace(tzinfo=None)
+        end = dt_end.replace(tzinfo=None)
+        step = AGG_BUCKET_MINUTES[agg] * 60
+
+        with timer.stage("catalog"):
+            name = get_units_directory().by_id.get(unit_id)
+        with timer.stage("fetch"):
+            buckets, rest = read_rollup("tc", name[3:], param, step, start, end) if name else ([], start)
+        from_rollup = len(buckets)
+
+        if rest is not None:
+            try:
+                with timer.stage("fetch"):
+                    live = fetch_termocom_series_agg(unit_id, param, rest, end, agg)
+            except Exception as e:
+                return Response({"detail": f"db error: {e}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            with timer.stage("parse"):
+                buckets.extend(
+                    (wall_seconds(ts), n, vmin, vavg, vmax, max(sumsq - n * vavg * vavg, 0.0))
+                    for ts, vmin, vavg, vmax, n, sumsq in live
+                )
+        timer.points = len(buckets)
+
+        with timer.stage("aggregate"):
+            payload = agg_payload(agg, buckets)
+        payload["rollup_buckets"] = from_rollup
+        with timer.stage("serialize"):
+            body = JSONRenderer().render(payload)
+        costs.record("tc", "termocom", param, timer, mode="agg")
+        return HttpResponse(body, content_type="application/json")
+
+    def _page(self, request, unit_id: int, param: str, dt_start: datetime, dt_end: datetime,
+              timer: StageTimer):
+        """
+        Ответ постраничного режима: {"labels", "values", "count", "next"}.
+        next — непрозрачный курсор (ключ последней отданной точки: время с долями секунды, значение,
+        число таких же дублей); null — страниц больше нет.
+        summary здесь нет: статистика по странице не равна статистике по интервалу.
+        """
+        try:
+            page_size = int(request.query_params.get("page_size"))
+        except (TypeError, ValueError):
+            page_size = 0
+        if not 1 <= page_size <= PAGE_SIZE_MAX:
+            return Response(
+                {"detail": f"page_size must be 1..{PAGE_SIZE_MAX}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        token = (request.query_params.get("cursor") or "").strip()
+        try:
+            after = _decode_cursor(token) if token else None
+        except ValueError:
+            return Response({"detail": "bad cursor"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            with timer.stage("fetch"):
+                page, last_key = fetch_termocom_page(unit_id, param, dt_start, dt_end, page_size, after)
         except Exception as e:
             return Response({"detail": f"db error: {e}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-        labels: List[str] = []
-        values: List[float] = []
-        for ts, val in pairs:
-            if isinstance(ts, datetime):
-                labels.append(ts.isoformat())
-                values.append(float(val))
-
-        # 4) простая статистика (в том же формате, что и LOVATI)
-        if values:
-            sorted_vals = sorted(values)
-            n = len(values)
-            median_val = sorted_vals[n // 2] if n % 2 == 1 else (sorted_vals[n // 2 - 1] + sorted_vals[n // 2]) / 2.0
-            summary: Dict[str, Any] = {
+        n = len(page)
+        timer.points = n
+        with timer.stage("parse"):
+            payload: Dict[str, Any] = {
+                "labels": page.iso_labels(),
+                "values": page.values.tolist(),
                 "count": n,
-                "min": min(values),
-                "max": max(values),
-                "avg": sum(values) / n,
-                "median": median_val,
-                "stdev": 0.0,  # при желании можно доработать через statistics.pstdev
+                "next": _encode_cursor(last_key) if n == page_size and last_key else None,
             }
+        with timer.stage("serialize"):
+            body = JSONRenderer().render(payload)
+        costs.record("tc", "termocom", param, timer, mode="page")
+        return HttpResponse(body, content_type="application/json")
+
+    def _overlay(self, request, pti_raw: str, param: str):
+        """
+        GET /tc-charts/api/series/?mode=overlay&pti=5020&param=T1&date=2025-11-17&periods=7&period=day
+        Тот же формат ответа, что и у LR overlay (общая ось времени суток).
+        """
+        if not pti_raw or param not in TERMOCOM_PARAM_MAP:
+            return Response(
+                {"detail": f"required: pti, param in: {', '.join(sorted(TERMOCOM_PARAM_MAP.keys()))}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            ref_day, periods, period, step = parse_overlay_params(request.query_params, local_today())
+        except ValueError as e:
+            return Response({"detail": f"bad overlay params: {e}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        lookup_pti, lookup_param = series_lookup(pti_raw, param)
+
+        timer = StageTimer()
+        with timer.stage("catalog"):
+            unit_id = resolve_unit_id_by_ptc(lookup_pti)
+        if not unit_id:
+            return Response(
+                {"detail": f"PTC '{lookup_pti}' not found or not enabled in TERMOCOM5"},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
+        days = overlay_days(ref_day, periods, period)
+        try:
+            with timer.stage("fetch"):
+                points_by_day = _load_tc_days(unit_id, lookup_param, days)
+        except Exception as e:
+            return Response({"detail": f"db error: {e}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        timer.points = sum(len(p) for p in points_by_day.values())
+
+        with timer.stage("aggregate"):
+            payload = build_overlay(days, points_by_day, step)
+        payload.update({"pti": pti_raw, "param": param, "period": period})
+        with timer.stage("serialize"):
+            body = JSONRenderer().render(payload)
+        costs.record("tc", "termocom", lookup_param, timer, mode="overlay")
+        return HttpResponse(body, content_type="application/json")
+
+
+def _encode_cursor(key: PageKey) -> str:
+    """Курсор страницы: base64url от {"t": «настенные» микросекунды, "v": значение, "k": число дублей}."""
+    raw = json.dumps({"t": int(key[0]), "v": float(key[1]), "k": int(key[2])}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(token: str) -> PageKey:
+    try:
+        raw = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        key = (int(raw["t"]), float(raw["v"]), int(raw["k"]))
+    except Exception as e:
+        raise ValueError("bad cursor") from e
+    if key[2] < 1:
+        raise ValueError("bad cursor")
+    return key
+
+
+def _load_tc_days(unit_id: int, param: str, days: List[date]) -> Dict[date, List[Tuple[int, float]]]:
+    """
+    Точки TERMOCOM по списку суток: смежные сутки читаются одним запросом (period=day → ровно один).
+    Время в HTREND — локальное naive, переводим в epoch через Europe/Chisinau.
+    """
+    out: Dict[date, List[Tuple[int, float]]] = {d: [] for d in days}
+    runs: List[List[date]] = []
+    for d in sorted(set(days)):
+        if runs and (d - runs[-1][-1]).days == 1:
+            runs[-1].append(d)
         else:
-            summary = {"count": 0, "min": None, "max": None, "avg": None, "median": None, "stdev": None}
+            runs.append([d])
 
-        payload: Dict[str, Any] = {"labels": labels, "values": values, "summary": summary}
-        ser = SeriesResponseSerializer(payload)
-        return Response(ser.data, status=status.HTTP_200_OK)
+    for run in runs:
+        start = datetime.combine(run[0], dtime.min)
+        end = datetime.combine(run[-1], dtime.max)
+        for ts, val in fetch_termocom_series(unit_id, param, start, end):
+            bucket = out.get(ts.date())
+            if bucket is not None:
+                bucket.append((int(ts.replace(tzinfo=TZ_CHISINAU).timestamp()), val))
+    return out
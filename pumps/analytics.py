@@ -0,0 +1,184 @@
+# pumps/analytics.py
+# МОДУЛЬ: статистика работы помп по истории (пуски, остановы, время работы, самый длинный пуск).
+# История — те же ряды, что на графиках POMPA/POMPA2/POMPA3:
+#   - LOVATI (LR-прибор): состояние 0/1, 0 = работает (зелёный), 1 = стоит/авария (красный);
+#   - TERMOCOM5: ток помпы (DCX AI), > 0 = работает, > PUMP_ALARM_CURRENT — перегруз (красный).
+# Правила те же, что в service.calc_overall_color. Серии длин (run-length) считаются в NumPy
+# без циклов по точкам. Каждая точка «держит» своё состояние до следующей, но не дольше
+# PUMPS_RUN_MAX_HOLD сек (дыра в данных не засчитывается ни в работу, ни в простой).
+# Итоги по закрытым суткам неизменны и лежат в кэше Django; сегодня и сутки без точек считаются вживую.
+
+from __future__ import annotations
+
+from datetime import date, datetime, time as dtime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+
+from monitoring_PTC.charts.chunks import day_bounds, load_lr_days, local_today
+from monitoring_PTC.charts.sources import ResolvedSeries, SeriesSpec, iter_points, resolve_series
+from monitoring_PTC.charts.timezone_utils import TZ_CHISINAU
+
+from .repositories.lovati_repo import PUMP_INDEX
+from .service import PUMP_ALARM_CURRENT
+from .topology import get_topology
+
+MAX_HOLD = getattr(settings, "PUMPS_RUN_MAX_HOLD", 1800)
+DAY_TTL = getattr(settings, "PUMPS_RUN_DAY_TTL", 31 * 24 * 3600)
+MAX_DAYS = 31
+
+PUMP_PARAMS = {1: "POMPA", 2: "POMPA2", 3: "POMPA3"}
+
+DayPoints = List[Tuple[int, float]]                   # [(epoch_utc, value), ...]
+
+
+def pump_source(ptc: str) -> Tuple[Optional[str], List[int]]:
+    """Откуда брать помпы объекта и какие номера: как на странице помп, TERMOCOM в приоритете."""
+    nums = get_topology().termocom_nums(ptc)
+    if nums:
+        return "tc", list(nums)
+    nums = PUMP_INDEX.get().pump_nums(ptc)
+    if nums:
+        return "lr", nums
+    return None, []
+
+
+# ---------- расчёт по суткам ----------
+
+def day_runs(src: str, points: DayPoints, day_end: int) -> Dict[str, Any]:
+    """
+    Итоги одних суток. Кроме счётчиков — состояние на краях суток и длины крайних пусков,
+    чтобы склеить пуск, который переходит через полночь (merge_days).
+    """
+    if not points:
+        return {"samples": 0, "starts": 0, "stops": 0, "on_seconds": 0, "alarm_seconds": 0,
+                "longest_run_seconds": 0, "first_on": None, "last_on": None, "head_on": 0, "tail_on": 0}
+
+    arr = np.asarray(points, dtype=np.float64)
+    arr = arr[np.argsort(arr[:, 0], kind="stable")]   # LR отдаёт точки в порядке прибора
+    t, v = arr[:, 0], arr[:, 1]
+
+    on = v == 0 if src == "lr" else v > 0
+    alarm = np.zeros_like(on) if src == "lr" else v > PUMP_ALARM_CURRENT
+
+    # сколько держится каждая точка: до следующей (или до конца суток), не больше MAX_HOLD
+    hold = np.clip(np.diff(t, append=float(day_end)), 0, MAX_HOLD)
+
+    edges = np.diff(on.astype(np.int8))
+    run_first = np.concatenate(([0], np.flatnonzero(edges) + 1))     # индекс первой точки каждой серии
+    run_len = np.add.reduceat(hold, run_first)
+    run_on = on[run_first]
+    on_runs = run_len[run_on]
+
+    return {
+        "samples": int(t.size),
+        "starts": int(np.count_nonzero(edges == 1)),
+        "stops": int(np.count_nonzero(edges == -1)),
+        "on_seconds": int(hold[on].sum()),
+        "alarm_seconds": int(hold[alarm].sum()),
+        "longest_run_seconds": int(on_runs.max()) if on_runs.size else 0,
+        "first_on": bool(on[0]),
+        "last_on": bool(on[-1]),
+        "head_on": int(run_len[0]) if run_on[0] else 0,
+        "tail_on": int(run_len[-1]) if run_on[-1] else 0,
+    }
+
+
+def merge_days(days: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Сложить суточные итоги по порядку дат; смена состояния на стыке суток — тоже пуск/останов."""
+    total = {"samples": 0, "starts": 0, "stops": 0, "on_seconds": 0, "alarm_seconds": 0, "longest_run_seconds": 0}
+    prev: Optional[Dict[str, Any]] = None
+    run = 0                                            # незакончившийся к полуночи пуск, сек
+    for d in days:
+        if not d["samples"]:
+            continue
+        for k in ("samples", "starts", "stops", "on_seconds", "alarm_seconds"):
+            total[k] += d[k]
+        if prev is not None and prev["last_on"] != d["first_on"]:
+            total["starts" if d["first_on"] else "stops"] += 1
+
+        # пуск, начатый в прошлых сутках и продолжающийся с полуночи
+        joined = run + d["head_on"] if d["first_on"] else 0
+        total["longest_run_seconds"] = max(total["longest_run_seconds"], d["longest_run_seconds"], joined)
+        if not d["last_on"]:
+            run = 0
+        elif d["first_on"] and not d["starts"] and not d["stops"]:
+            run = joined                               # сутки целиком одна серия «работает»
+        else:
+            run = d["tail_on"]
+        prev = d
+    return total
+
+
+# ---------- загрузка с кэшем закрытых суток ----------
+
+def _key(src: str, ptc: str, num: int, day: date) -> str:
+    return f"pumps:runs:v1:{src}:{ptc}:{num}:{day.isoformat()}"
+
+
+def _load_points(rs: ResolvedSeries, days: List[date]) -> Dict[date, DayPoints]:
+    """Точки по суткам: LR — через суточный кэш графиков, TERMOCOM — одним чтением диапазона."""
+    if rs.spec.src == "lr":
+        points, _ = load_lr_days(int(rs.ips), str(rs.param_id), days)
+        return points
+
+    out: Dict[date, DayPoints] = {d: [] for d in days}
+    dt_start = datetime.combine(days[0], dtime.min, tzinfo=TZ_CHISINAU)
+    dt_end = datetime.combine(days[-1] + timedelta(days=1), dtime.min, tzinfo=TZ_CHISINAU) - timedelta(seconds=1)
+    for dt, val in iter_points(rs, dt_start, dt_end):
+        b = out.get(dt.date())
+        if b is not None:
+            b.append((int(dt.timestamp()), val))
+    return out
+
+
+def pump_days(src: str, ptc: str, num: int, days: List[date]) -> List[Dict[str, Any]]:
+    """Итоги по каждым суткам одной помпы (в порядке days); закрытые сутки — из кэша."""
+    today = local_today()
+    keys = {d: _key(src, ptc, num, d) for d in days if d < today}
+    cached = cache.get_many(list(keys.values())) if keys else {}
+
+    missing = [d for d in days if d <= today and keys.get(d) not in cached]
+    fresh: Dict[date, Dict[str, Any]] = {}
+    if missing:
+        rs = resolve_series(SeriesSpec(src=src, pti=ptc, param=PUMP_PARAMS[num]))
+        points = _load_points(rs, missing)
+        now = int(datetime.now(TZ_CHISINAU).timestamp())
+        for d in missing:
+            fresh[d] = day_runs(src, points.get(d) or [], min(day_bounds(d)[1] + 1, now))
+        # пустые сутки не кэшируем: «ни одной точки» чаще значит «прибор/БД не отдали данные»,
+        # чем «помпа не работала» (у стоящей помпы точки тоже есть) — пусть пересчитаются в следующий раз
+        cache.set_many({keys[d]: fresh[d] for d in missing if d in keys and fresh[d]["samples"]}, DAY_TTL)
+
+    out = []
+    for d in days:
+        r = fresh.get(d) or cached.get(keys.get(d, "")) or day_runs(src, [], 0)
+        out.append(dict(r, date=d.isoformat()))
+    return out
+
+
+def pump_runs(ptc: str, start: date, end: date) -> Dict[str, Any]:
+    """Ответ API: по каждой помпе объекта — итог за период и разбивка по суткам."""
+    src, nums = pump_source(ptc)
+    if src is None:
+        raise LookupError(f"PTC '{ptc}' has no pumps")
+    days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+
+    pumps: List[Dict[str, Any]] = []
+    for num in nums:
+        item: Dict[str, Any] = {"num": num, "param": PUMP_PARAMS[num]}
+        try:
+            per_day = pump_days(src, ptc, num, days)
+            item.update(merge_days(per_day))
+            item["days"] = [
+                {k: d[k] for k in ("date", "samples", "starts", "stops", "on_seconds",
+                                    "alarm_seconds", "longest_run_seconds")}
+                for d in per_day
+            ]
+        except Exception as e:
+            item["error"] = str(e)
+        pumps.append(item)
+
+    return {"ptc": ptc, "src": src, "from": start.isoformat(), "to": end.isoformat(), "pumps": pumps}
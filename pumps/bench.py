@@ -0,0 +1,240 @@
+# pumps/bench.py
+# МОДУЛЬ: офлайн-бенчмарк конвейера страницы помп без боевых SQL Server.
+# pyodbc.connect на время замера подменяется фейковыми соединениями, которые по тексту запроса
+# отдают синтетические (или записанные, --rows-file) строки TERMOCOM и LOVATI для N объектов;
+# реестр помп (pumps/topology.py) на это время читается из временного файла с синтетическими PTC.
+# Состояние сервиса (последние удачные чтения источников, детектор переходов, буферы тренда)
+# на время замера подменяется свежими объектами, после — возвращаются прежние, без синтетических строк.
+# Замеряются:
+#   service    — полный путь get_pumps_table (параллельное чтение источников, слияние, цвета);
+#   color      — calc_overall_color по всем строкам (без кэша цветов);
+#   serialize  — JSON ответа /pumps/api/table/ (обычный и ?compact=1).
+# Запуск: python manage.py bench_pumps --objects 40 400 4000 --repeat 20 [--latency-ms 30]
+
+from __future__ import annotations
+
+import json
+import statistics
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import pyodbc
+from rest_framework.renderers import JSONRenderer
+
+from . import service, topology
+from .events import TransitionDetector
+from .links import url_templates
+from .repositories import lovati_repo
+from .trend import CurrentTrend
+
+# ---------- фейковые источники ----------
+
+
+class _FakeCursor:
+    def __init__(self, data: "FakeData", latency: float) -> None:
+        self._data = data
+        self._latency = latency
+        self._rows: List[Any] = []
+        self.arraysize = 1
+
+    def execute(self, sql: str, *params: Any) -> "_FakeCursor":
+        if self._latency:
+            time.sleep(self._latency)                       # сетевой round trip к SQL Server
+        self._rows = self._data.rows_for(sql, params)
+        return self
+
+    def fetchall(self) -> List[Any]:
+        rows, self._rows = self._rows, []
+        return rows
+
+    def fetchmany(self, size: Optional[int] = None) -> List[Any]:
+        size = size or self.arraysize
+        rows, self._rows = self._rows[:size], self._rows[size:]
+        return rows
+
+    def fetchone(self) -> Any:
+        return self._rows.pop(0) if self._rows else None
+
+
+class _FakeConnection:
+    def __init__(self, data: "FakeData", latency: float) -> None:
+        self._data = data
+        self._latency = latency
+
+    def cursor(self) -> _FakeCursor:
+        return _FakeCursor(self._data, self._latency)
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self) -> "_FakeConnection":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        pass
+
+
+class FakeData:
+    """
+    Строки «баз» для n объектов: половина — TERMOCOM (PTC 6000+), половина — LOVATI (PTC 8000+).
+    recorded — {"termocom": [{...колонки UNITS/MC/DCX...}], "lovati": [{...колонки PTI...}]}:
+    значения берутся из записанных строк по кругу, PTC/ID — синтетические.
+    """
+
+    def __init__(self, n_objects: int, recorded: Optional[Dict[str, List[Dict[str, Any]]]] = None) -> None:
+        n_tc = n_objects - n_objects // 2
+        n_lv = n_objects // 2
+        now = datetime.now().replace(microsecond=0)
+        rec_tc = (recorded or {}).get("termocom") or []
+        rec_lv = (recorded or {}).get("lovati") or []
+
+        self.pompa_map: Dict[str, List[int]] = {}
+        self.termocom: List[SimpleNamespace] = []
+        for i in range(n_tc):
+            ptc = str(6000 + i)
+            self.pompa_map[ptc] = [2] if i % 3 else [1, 2, 3]
+            base = {
+                "UNIT_ID": 100000 + i,
+                "UNIT_NAME": f"PT_{ptc}",
+                "MC_T2_VALUE_INSTANT": 40.0 + i % 25,
+                "MC_POWER1_VALUE_INSTANT": 0.5 + (i % 40) / 10,
+                "MC_DTIME_VALUE_INSTANT": now - timedelta(minutes=i % 60),
+                "DCX_AI01_VALUE": float(i * 7 % 260),
+                "DCX_AI02_VALUE": float(i * 13 % 260),
+                "DCX_AI03_VALUE": 0.0 if i % 5 else 15.0,
+                "UNIT_LCS_VALUE": 0.2 if i % 17 == 0 else 0.9,
+            }
+            if rec_tc:
+                base.update({k: v for k, v in rec_tc[i % len(rec_tc)].items() if k not in ("UNIT_ID", "UNIT_NAME")})
+            self.termocom.append(SimpleNamespace(**base))
+
+        self.lovati_ptc = {str(8000 + i) for i in range(n_lv)}
+        self.pti: List[SimpleNamespace] = []
+        self.ids: List[SimpleNamespace] = []
+        for i in range(n_lv):
+            ptc = str(8000 + i)
+            pid = 200000 + i
+            base = {
+                "PID": pid,
+                "PTC": ptc,
+                "dt1": now - timedelta(minutes=i % 30),
+                "q1": f"{0.3 + (i % 20) / 10:.2f}",
+                "t2": f"{38 + i % 30:.1f}",
+                "pompa1": str(i % 2),
+                "pompa2": "0",
+                "pompa3": "1" if i % 7 == 0 else "0",
+            }
+            if rec_lv:
+                base.update({k: v for k, v in rec_lv[i % len(rec_lv)].items() if k not in ("PID", "PTC")})
+            self.pti.append(SimpleNamespace(**base))
+            if i % 4 == 0:
+                self.ids.append(SimpleNamespace(pid=pid, param="pompa2"))
+
+        self.addresses = [SimpleNamespace(PTC=r.UNIT_NAME[3:], adresa=f"str. Test {r.UNIT_ID}") for r in self.termocom]
+
+    def rows_for(self, sql: str, params: tuple) -> List[Any]:
+        if "PTC_adrese" in sql:
+            return list(self.addresses)
+        if "FROM UNITS" in sql:
+            return list(self.termocom)
+        if "FROM IDS" in sql:
+            wanted = set(params)
+            return [r for r in self.ids if r.pid in wanted]
+        if "FROM PTI" in sql and "dt1" not in sql:          # индекс помп LOVATI: PTC → PID
+            return [SimpleNamespace(PID=r.PID, PTC=r.PTC) for r in self.pti]
+        if "FROM PTI" in sql:
+            wanted = set(params)
+            return [r for r in self.pti if r.PID in wanted]
+        return []
+
+
+@contextmanager
+def fake_sources(data: FakeData, latency: float = 0.0) -> Iterator[None]:
+    """Подменить pyodbc.connect, реестр помп и состояние service на время замера; всё возвращается на место."""
+    orig_connect = pyodbc.connect
+    orig_path = topology.TOPOLOGY_PATH
+    state_names = ("_ADDRESSES", "_TERMOCOM", "_LOVATI", "PUMP_EVENTS", "PUMP_TRENDS")
+    orig_state = {name: getattr(service, name) for name in state_names}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "topology.json"
+        path.write_text(json.dumps({
+            "termocom": {"signal": "current", "objects": data.pompa_map},
+            "lovati": {"signal": "status01", "objects": {ptc: [1, 2, 3] for ptc in data.lovati_ptc}},
+        }), encoding="utf-8")
+        pyodbc.connect = lambda *a, **k: _FakeConnection(data, latency)   # type: ignore[assignment]
+        topology.TOPOLOGY_PATH = path
+        # service читает их по имени модуля — свежие объекты копят только синтетику
+        # (views_api держит свою ссылку на PUMP_EVENTS, но это настоящий объект — его не трогаем)
+        for name in ("_ADDRESSES", "_TERMOCOM", "_LOVATI"):
+            src = orig_state[name]
+            setattr(service, name, service._Source(src.name, src.loader))
+        service.PUMP_EVENTS = TransitionDetector(service.calc_pump_color)
+        service.PUMP_TRENDS = CurrentTrend()
+        try:
+            topology.TOPOLOGY.refresh(force=True)
+            lovati_repo.PUMP_INDEX.refresh(force=True)
+            service._cached_color.cache_clear()
+            yield
+        finally:
+            pyodbc.connect = orig_connect                     # type: ignore[assignment]
+            topology.TOPOLOGY_PATH = orig_path
+            for name, obj in orig_state.items():
+                setattr(service, name, obj)
+            topology.TOPOLOGY.refresh(force=True)
+            lovati_repo.PUMP_INDEX.invalidate()
+            service._cached_color.cache_clear()
+
+
+# ---------- замеры ----------
+
+def _time(fn: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    samples = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t) * 1000)
+    return {"min_ms": round(min(samples), 3), "median_ms": round(statistics.median(samples), 3)}
+
+
+def run_benchmark(
+    sizes: List[int],
+    repeat: int = 20,
+    latency_ms: float = 0.0,
+    recorded: Optional[Dict[str, List[Dict[str, Any]]]] = None,
+) -> List[Dict[str, Any]]:
+    """Замер для каждого числа объектов; вернёт строки отчёта {"objects", "rows", "stage", "min_ms", ...}."""
+    from .views_api import _row_item                       # views_api тянет DRF — импортируем по месту
+
+    report: List[Dict[str, Any]] = []
+    renderer = JSONRenderer()
+    for n in sizes:
+        data = FakeData(n, recorded)
+        with fake_sources(data, latency_ms / 1000.0):
+            rows, _ = service.get_pumps_table(None, None)             # прогрев: индекс, кэши, пул
+            stages = {
+                "service": lambda: service.get_pumps_table(None, None),
+                "color": lambda: [service.calc_overall_color(r) for r in rows],
+                "serialize": lambda: renderer.render([_row_item(r, False) for r in rows]),
+                "serialize_compact": lambda: renderer.render(
+                    {"templates": url_templates(), "rows": [_row_item(r, True) for r in rows]}
+                ),
+            }
+            for name, fn in stages.items():
+                report.append({"objects": n, "rows": len(rows), "stage": name, **_time(fn, repeat)})
+            report.append({
+                "objects": n, "rows": len(rows), "stage": "payload_bytes",
+                "full": len(renderer.render([_row_item(r, False) for r in rows])),
+                "compact": len(renderer.render({"templates": url_templates(),
+                                                "rows": [_row_item(r, True) for r in rows]})),
+            })
+    return report
+
+
+def load_recorded(path: str) -> Dict[str, List[Dict[str, Any]]]:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
@@ -0,0 +1,112 @@
+# pumps/events.py
+# МОДУЛЬ: переходы цвета помп (зелёный → красный и т.п.) в памяти процесса.
+# На каждом обновлении таблицы service.get_pumps_table отдаёт сюда строки; для каждой
+# (ptc, номер помпы) помним прошлое значение и цвет:
+#   - значение/LCS не изменились → цвет не пересчитываем;
+#   - цвет изменился → событие в кольцевой буфер (deque, PUMPS_EVENTS_BUFFER последних).
+# Фронт забирает только новые события (?after=seq) вместо сравнения целых таблиц,
+# а по since видно, сколько помпа уже в текущем цвете.
+# Первое появление помпы событием не считается; строки stale (источник не ответил) пропускаются.
+# Буфер у каждого воркера свой и пропадает при перезапуске.
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, Iterable, Optional, Tuple
+
+from django.conf import settings
+
+from monitoring_PTC.charts.timezone_utils import TZ_CHISINAU
+
+EVENTS_BUFFER = getattr(settings, "PUMPS_EVENTS_BUFFER", 1000)
+
+PumpKey = Tuple[str, int]                                 # (ptc, номер помпы)
+
+
+@dataclass
+class _PumpState:
+    sig: Tuple[Any, Any]                                  # (значение, lcs) — вход расчёта цвета
+    color: str
+    since: float                                          # time.time() смены цвета / первого появления
+
+
+def _iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, TZ_CHISINAU).isoformat(timespec="seconds")
+
+
+class TransitionDetector:
+    """Цвет каждой помпы + кольцевой буфер переходов; color_fn(value, lcs, src) → 'green' | 'red' | ..."""
+
+    def __init__(self, color_fn: Callable[[Any, Any, Optional[str]], str], maxlen: int = EVENTS_BUFFER) -> None:
+        self._color_fn = color_fn
+        self._lock = threading.Lock()
+        self._states: Dict[PumpKey, _PumpState] = {}
+        self._events: Deque[Dict[str, Any]] = deque(maxlen=maxlen)
+        self.seq = 0                                      # номер последнего события
+
+    def update(self, rows: Iterable[Dict[str, Any]], now: Optional[float] = None) -> int:
+        """Учесть свежие строки таблицы; вернёт число новых переходов."""
+        now = time.time() if now is None else now
+        added = 0
+        with self._lock:
+            for r in rows:
+                if r.get("stale"):
+                    continue
+                ptc = r.get("ptc")
+                lcs = r.get("lcs")
+                for num, val in zip(r.get("pompa_nums") or [], r.get("pompa") or []):
+                    key = (ptc, int(num))
+                    sig = (val, lcs)
+                    st = self._states.get(key)
+                    if st is not None and st.sig == sig:
+                        continue
+                    color = self._color_fn(val, lcs, r.get("src"))
+                    if st is None:
+                        self._states[key] = _PumpState(sig, color, now)
+                        continue
+                    st.sig = sig
+                    if color == st.color:
+                        continue
+                    self.seq += 1
+                    added += 1
+                    self._events.append({
+                        "seq": self.seq,
+                        "ts": _iso(now),
+                        "ptc": ptc,
+                        "pump": int(num),
+                        "src": r.get("src"),
+                        "from": st.color,
+                        "to": color,
+                        "value": val,
+                        "prev_for_seconds": int(now - st.since),
+                    })
+                    st.color = color
+                    st.since = now
+        return added
+
+    def events(self, after: int = 0, ptc: Optional[str] = None) -> Dict[str, Any]:
+        """
+        События с seq > after. gap=True — часть событий уже вытеснена из буфера
+        (или воркер перезапускался): клиенту стоит перечитать таблицу целиком.
+        """
+        now = time.time()
+        with self._lock:
+            first = self._events[0]["seq"] if self._events else self.seq + 1
+            items = [e for e in self._events if e["seq"] > after and (ptc is None or e["ptc"] == ptc)]
+            states = [
+                {"ptc": k[0], "pump": k[1], "color": st.color, "since": _iso(st.since),
+                 "for_seconds": int(now - st.since)}
+                for k, st in sorted(self._states.items())
+                if ptc is None or k[0] == ptc
+            ]
+            seq = self.seq
+        return {
+            "seq": seq,
+            "gap": after > seq or (after > 0 and after < first - 1),
+            "events": items,
+            "states": states,
+        }
@@ -0,0 +1,59 @@
+# pumps/links.py
+# МОДУЛЬ: ссылки строк таблицы помп (страница объекта и графики T2 / Q / помп).
+# Раньше каждая строка на каждом запросе собирала 6 URL через reverse() + форматирование.
+# Теперь шаблоны вида "/tc-charts/chart/?pti={ptc}&param=T2" строятся один раз на процесс
+# (reverse() мемоизирован), а:
+#   - обычный ответ API подставляет ptc в готовые шаблоны (row_urls, тоже с кэшем по (src, ptc));
+#   - компактный ответ (?compact=1) отдаёт шаблоны один раз в заголовке, строки — только значения.
+
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import Dict
+
+from django.conf import settings
+from django.urls import reverse
+from django.urls.exceptions import NoReverseMatch
+
+# src строки → (name для reverse, запасной путь, коды параметров графиков этого источника)
+_CHARTS = {
+    # TERMOCOM charts param codes (см. monitoring_PTC/termocom_charts/repositories.py)
+    # ✅ ВАЖНО: TERMOCOM Q = "Q", не "Q1"
+    "termocom": ("termocom_charts:chart_page", "/tc-charts/chart/",
+                 {"t2": "T2", "q1": "Q", "pompa": "POMPA", "pompa2": "POMPA2", "pompa3": "POMPA3"}),
+    # LOVATI charts param codes (см. monitoring_PTC/charts/repositories.py)
+    "lovati": ("charts:chart_page", "/charts/chart/",
+               {"t2": "T2", "q1": "Q1", "pompa": "POMPA", "pompa2": "POMPA2", "pompa3": "POMPA3"}),
+}
+
+
+@lru_cache(maxsize=None)
+def _chart_base(name: str, fallback: str) -> str:
+    try:
+        return reverse(name)
+    except NoReverseMatch:
+        return fallback
+
+
+@lru_cache(maxsize=None)
+def url_templates() -> Dict[str, Dict[str, str]]:
+    """
+    {src: {"ptc": ..., "t2": ..., "q1": ..., "pompa": ..., "pompa2": ..., "pompa3": ...}} с {ptc} внутри.
+    Ссылка PTC открывает страницу объекта (PTC_VIEW_URL_TEMPLATE), пустая строка — ссылки нет.
+    """
+    ptc_view = getattr(settings, "PTC_VIEW_URL_TEMPLATE", "") or ""
+    out: Dict[str, Dict[str, str]] = {}
+    for src, (name, fallback, params) in _CHARTS.items():
+        base = _chart_base(name, fallback)
+        tpl = {"ptc": ptc_view}
+        for key, code in params.items():
+            tpl[key] = f"{base}?pti={{ptc}}&param={code}"
+        out[src] = tpl
+    return out
+
+
+@lru_cache(maxsize=4096)
+def row_urls(src: str, ptc: str) -> Dict[str, str]:
+    """url_* одной строки (обычный режим API). Результат общий — не менять."""
+    tpl = url_templates().get(src) or {}
+    return {f"url_{key}": t.format(ptc=ptc) if t else "" for key, t in tpl.items()}
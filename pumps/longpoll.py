@@ -0,0 +1,139 @@
+# pumps/longpoll.py
+# МОДУЛЬ: long-poll для страницы помп (/pumps/api/watch/).
+# Раньше страница раз в 30 с перечитывала всю таблицу: сработавшая помпа видна с опозданием,
+# а неизменная таблица всё равно качается целиком.
+# Теперь:
+#   - ОДИН фоновый цикл на процесс раз в PUMPS_WATCH_INTERVAL сек читает таблицу (get_pumps_table)
+#     и, если у какой-то строки сменился цвет или T2, увеличивает version и будит ждущих (Condition);
+#   - клиент ждёт с ?since=<version> и получает только строки, у которых поменялся overall_color,
+#     trending_up (pumps/trend.py) или t2_alert (по ЕГО порогам t2_min/t2_max), либо пустой ответ по таймауту;
+#   - по таймауту отдаются строки с изменившимся T2 (чтобы цифры в таблице не «застывали»);
+#   - since неизвестен (0, перезапуск воркера, слишком старый) → вся таблица, full=true.
+# Цикл сам останавливается, если PUMPS_WATCH_IDLE сек никто не ждал, и стартует на следующем запросе.
+
+from __future__ import annotations
+
+import logging
+import math
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from django.conf import settings
+
+from .service import _t2_alert, get_pumps_table
+
+logger = logging.getLogger(__name__)
+
+WATCH_INTERVAL = getattr(settings, "PUMPS_WATCH_INTERVAL", 10)
+WATCH_IDLE = getattr(settings, "PUMPS_WATCH_IDLE", 120)
+WATCH_TIMEOUT_MAX = 55                 # сек; дольше держать запрос не даём (прокси/воркеры)
+WATCH_TIMEOUT_DEFAULT = 25             # сек; если timeout не задан или не число
+HISTORY = 64                           # сколько последних версий помним для сравнения
+
+State = Dict[str, Tuple[str, Any, bool]]     # ptc → (overall_color, t2, trending_up)
+
+
+class PumpsWatcher:
+    """Общий для всех ждущих клиентов цикл обновления + история версий состояния."""
+
+    def __init__(self, interval: float = WATCH_INTERVAL, history: int = HISTORY) -> None:
+        self.interval = float(interval)
+        self._cond = threading.Condition()
+        self.version = 0
+        self._rows: Dict[str, Dict[str, Any]] = {}
+        self._history: Deque[Tuple[int, State]] = deque(maxlen=history)
+        self._thread: Optional[threading.Thread] = None
+        self._last_wait = 0.0
+
+    # ---------- фоновый цикл ----------
+
+    def _ensure_running(self) -> None:
+        with self._cond:
+            self._last_wait = time.monotonic()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="pumps-watch", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception("pumps watch: refresh failed")
+            with self._cond:
+                if time.monotonic() - self._last_wait > WATCH_IDLE:
+                    self._thread = None               # никто не ждёт — засыпаем до следующего запроса
+                    return
+            time.sleep(self.interval)
+
+    def refresh(self) -> bool:
+        """Прочитать таблицу; True, если состояние поменялось (новая version)."""
+        rows, _ = get_pumps_table(None, None)
+        by_ptc = {r["ptc"]: r for r in rows if r.get("ptc")}
+        state: State = {
+            ptc: (r.get("overall_color"), r.get("t2"), bool(r.get("trending_up")))
+            for ptc, r in by_ptc.items()
+        }
+        with self._cond:
+            self._rows = by_ptc
+            if self._history and self._history[-1][1] == state:
+                return False
+            self.version += 1
+            self._history.append((self.version, state))
+            self._cond.notify_all()
+            return True
+
+    # ---------- ожидание клиента ----------
+
+    def wait(self, since: int, t2_min: Optional[float], t2_max: Optional[float], timeout: float) -> Dict[str, Any]:
+        self._ensure_running()
+        if not math.isfinite(timeout):                  # nan: remaining <= 0 никогда не сработает
+            timeout = WATCH_TIMEOUT_DEFAULT
+        deadline = time.monotonic() + min(max(timeout, 0.0), WATCH_TIMEOUT_MAX)
+        with self._cond:
+            while True:
+                remaining = deadline - time.monotonic()
+                if self._history:
+                    out = self._diff(since, t2_min, t2_max, timed_out=remaining <= 0)
+                    if out is not None:
+                        return out
+                if remaining <= 0:
+                    return self._answer(since, [], [], t2_min, t2_max, full=False)
+                self._cond.wait(remaining)
+
+    def _diff(self, since: int, t2_min, t2_max, timed_out: bool) -> Optional[Dict[str, Any]]:
+        """Что поменялось для клиента с версией since; None — ничего существенного, ждём дальше."""
+        cur_version, cur = self._history[-1]
+        old = next((st for v, st in self._history if v == since), None)
+        if old is None:
+            return self._answer(cur_version, list(cur), [], t2_min, t2_max, full=True)
+        if since == cur_version and not timed_out:
+            return None
+
+        changed: List[str] = []
+        for ptc, (color, t2, trending) in cur.items():
+            prev = old.get(ptc)
+            if prev is None or prev[0] != color or prev[2] != trending or _t2_alert(prev[1], t2_min, t2_max) != _t2_alert(t2, t2_min, t2_max):
+                changed.append(ptc)
+            elif timed_out and prev[1] != t2:
+                changed.append(ptc)
+        removed = [ptc for ptc in old if ptc not in cur]
+        if not changed and not removed and not timed_out:
+            return None
+        # при таймауте без изменений версия клиента остаётся прежней — сравнивать дальше с ней
+        version = cur_version if (changed or removed) else since
+        return self._answer(version, changed, removed, t2_min, t2_max, full=False, timed_out=timed_out)
+
+    def _answer(self, version: int, ptcs: List[str], removed: List[str], t2_min, t2_max,
+                full: bool, timed_out: bool = False) -> Dict[str, Any]:
+        rows = []
+        for ptc in sorted(ptcs):
+            r = self._rows.get(ptc)
+            if r is not None:
+                rows.append(dict(r, t2_alert=_t2_alert(r.get("t2"), t2_min, t2_max)))
+        return {"version": version, "full": full, "timeout": timed_out, "rows": rows, "removed": removed}
+
+
+PUMPS_WATCHER = PumpsWatcher()
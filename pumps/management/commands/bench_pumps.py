@@ -0,0 +1,40 @@
+# pumps/management/commands/bench_pumps.py
+#
+# Офлайн-замер конвейера страницы помп на фейковых соединениях (см. pumps/bench.py), боевые БД не нужны:
+#   python manage.py bench_pumps                                  — 40 / 400 / 4000 объектов
+#   python manage.py bench_pumps --objects 400 --repeat 50 --latency-ms 30
+#   python manage.py bench_pumps --rows-file recorded.json        — значения из записанных строк
+
+from django.core.management.base import BaseCommand, CommandError
+
+from pumps.bench import load_recorded, run_benchmark
+
+
+class Command(BaseCommand):
+    help = "Benchmark get_pumps_table, calc_overall_color and API serialization against fake TERMOCOM/LOVATI sources"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--objects", type=int, nargs="+", default=[40, 400, 4000],
+                            help="object counts to simulate (half TERMOCOM, half LOVATI; max 4000)")
+        parser.add_argument("--repeat", type=int, default=20, help="timed runs per stage")
+        parser.add_argument("--latency-ms", type=float, default=0.0, help="simulated round trip per query")
+        parser.add_argument("--rows-file", help="JSON {\"termocom\": [...], \"lovati\": [...]} with recorded rows")
+
+    def handle(self, *args, **options):
+        sizes = options["objects"]
+        if any(n < 1 or n > 4000 for n in sizes):
+            raise CommandError("--objects must be between 1 and 4000 (4-digit synthetic PTC codes)")
+        try:
+            recorded = load_recorded(options["rows_file"]) if options["rows_file"] else None
+        except (OSError, ValueError) as e:
+            raise CommandError(f"bad --rows-file: {e}")
+
+        report = run_benchmark(sizes, repeat=max(1, options["repeat"]),
+                               latency_ms=options["latency_ms"], recorded=recorded)
+        for r in report:
+            if r["stage"] == "payload_bytes":
+                self.stdout.write(f"{r['objects']:>5} obj {r['rows']:>5} rows  payload: "
+                                  f"full {r['full']} B, compact {r['compact']} B")
+            else:
+                self.stdout.write(f"{r['objects']:>5} obj {r['rows']:>5} rows  {r['stage']:<18} "
+                                  f"min {r['min_ms']:>9.3f} ms  median {r['median_ms']:>9.3f} ms")
@@ -1,49 +1,19 @@
 from __future__ import annotations
 
-from django.urls import reverse
-from django.urls.exceptions import NoReverseMatch
-
-from typing import Optional, Dict, Any, List
+from dataclasses import dataclass
+from typing import Optional, Dict, Any, FrozenSet, List, Tuple
 import pyodbc
 
 from django.conf import settings
+from monitoring_PTC.charts.utils.refresh import RefreshingSnapshot
+from ..topology import get_topology
 from .db import connect
 
 
 DB_CONNECT_TIMEOUT = getattr(settings, "DB_CONNECT_TIMEOUT", 5)
 
-LOVATI_PUMP01_PTC = {
-    "1012","1018","2113","2209","2407",
-    "3001","3002","3003","3004","3005","3013","3025","3038","3043","3054","3064","3083","3107","3111","3118","3127",
-    "4018","4044","5012","5013","5023","5051","5043",
-}
-
-_CHART_PARAM_MAP = {
-    # LOVATI charts param codes (см. monitoring_PTC/charts/repositories.py)
-    "q": "Q1",
-    "q1": "Q1",
-    "t2": "T2",
-    "pompa": "POMPA",
-    "pompa2": "POMPA2",
-    "pompa3": "POMPA3",
-}
-
-def _chart_url(ptc: str, param: str | None = None) -> str:
-    """
-    Ссылка на график LOVATI (charts).
-    Если param=None — открываем страницу объекта (без параметра, по умолчанию будет T1).
-    """
-    try:
-        base = reverse("charts:chart_page")
-    except NoReverseMatch:
-        base = "/charts/chart/"
-
-    q = f"?pti={ptc}"
-    if param:
-        p = _CHART_PARAM_MAP.get((param or "").lower(), (param or "").upper())
-        q += f"&param={p}"
-    return f"{base}{q}"
-
+# Как часто перечитывать PTI.id и флаги pompa2/pompa3 из IDS (сек) — они почти не меняются
+PUMP_INDEX_TTL = getattr(settings, "PUMPS_LOVATI_INDEX_TTL", 600)
 
 def _to_float(v) -> Optional[float]:
     try:
@@ -63,23 +33,26 @@ def _to_01(v) -> Optional[int]:
         return None
 
 
-def _safe_fetch_ids_flags(conn) -> Dict[int, Dict[str, bool]]:
+def _safe_fetch_ids_flags(conn, pids: List[int]) -> Dict[int, Dict[str, bool]]:
     """
-    Пытаемся определить, есть ли pompa2/pompa3 в IDS.
+    Пытаемся определить, есть ли pompa2/pompa3 в IDS (только для PID объектов с помпами).
     Если таблица/колонки отличаются — просто вернём пусто (и не покажем p2/p3).
     """
+    if not pids:
+        return {}
     cur = conn.cursor()
+    placeholders = ",".join(["?"] * len(pids))
 
     # пробуем безопасно (если IDS другая — ловим исключение)
     try:
-        cur.execute("""
+        cur.execute(f"""
             SELECT
                 CAST(pid AS int)       AS pid,
-                RTRIM(param)           AS param,
-                CAST(id_lovati AS int) AS id_lovati
+                RTRIM(param)           AS param
             FROM IDS
             WHERE id_lovati IS NOT NULL
-        """)
+              AND pid IN ({placeholders})
+        """, *pids)
     except Exception:
         return {}
 
@@ -96,37 +69,118 @@ def _safe_fetch_ids_flags(conn) -> Dict[int, Dict[str, bool]]:
     return out
 
 
-def fetch_lovati_pumps() -> List[Dict[str, Any]]:
-    out: List[Dict[str, Any]] = []
-
+@dataclass(frozen=True)
+class PumpIndex:
+    """PTC объектов с помпами → PTI.id и какие из pompa2/pompa3 реально заведены в IDS."""
+    ptcs: FrozenSet[str]                    # объекты LOVATI из реестра помп, по которым построен индекс
+    pids: Tuple[int, ...]                   # PTI.id этих объектов
+    pid_by_ptc: Dict[str, int]
+    flags_by_pid: Dict[int, Dict[str, bool]]
+    sql: str                                # готовый запрос текущих значений по pids
+
+    def flags(self, pid: int) -> Dict[str, bool]:
+        return self.flags_by_pid.get(pid, {"pompa2": False, "pompa3": False})
+
+    def pump_nums(self, ptc: str) -> List[int]:
+        """Номера помп объекта: pompa1 всегда, pompa2/pompa3 — если заведены в IDS."""
+        pid = self.pid_by_ptc.get(ptc)
+        if pid is None:
+            return []
+        flags = self.flags(pid)
+        return [1] + [n for n in (2, 3) if flags.get(f"pompa{n}")]
+
+
+def _load_pump_index() -> PumpIndex:
+    topology = get_topology()
+    ptcs = topology.lovati
+    if not ptcs:
+        return PumpIndex(ptcs=ptcs, pids=(), pid_by_ptc={}, flags_by_pid={}, sql="")
     with connect(settings.LOVATI_SERVER) as conn:
-        ids_flags_by_pid = _safe_fetch_ids_flags(conn)
-
         cur = conn.cursor()
-        placeholders = ",".join(["?"] * len(LOVATI_PUMP01_PTC))
-
+        placeholders = ",".join(["?"] * len(ptcs))
         cur.execute(f"""
-            SELECT
-                p.id                  AS PID,
-                RTRIM(p.pti)          AS PTC,
-                p.dt1                 AS dt1,
-                RTRIM(p.q1)           AS q1,
-                RTRIM(p.t2)           AS t2,
-                RTRIM(p.pompa)        AS pompa1,
-                RTRIM(p.pompa2)       AS pompa2,
-                RTRIM(p.pompa3)       AS pompa3
+            SELECT p.id AS PID, RTRIM(p.pti) AS PTC
             FROM PTI p
             WHERE p.typeObj = 0
               AND LEN(RTRIM(p.pti)) = 4
               AND RTRIM(p.pti) IN ({placeholders})
-            ORDER BY p.pti
-        """, *sorted(LOVATI_PUMP01_PTC))
+        """, *sorted(ptcs))
+        pid_by_ptc = {str(r.PTC).strip(): int(r.PID) for r in cur.fetchall() if r.PID is not None}
+        pids = tuple(sorted(pid_by_ptc.values()))
+        flags = _safe_fetch_ids_flags(conn, list(pids))
+
+    # pompa2/pompa3 — только если заведены в IDS И разрешены реестром для этого объекта
+    for ptc, pid in pid_by_ptc.items():
+        allowed = topology.lovati_nums.get(ptc, ())
+        if pid in flags:
+            flags[pid] = {k: v and int(k[-1]) in allowed for k, v in flags[pid].items()}
+
+    # каждый опрос — один узкий запрос по первичному ключу PTI и только «живым» колонкам
+    sql = f"""
+        SELECT
+            p.id                  AS PID,
+            RTRIM(p.pti)          AS PTC,
+            p.dt1                 AS dt1,
+            RTRIM(p.q1)           AS q1,
+            RTRIM(p.t2)           AS t2,
+            RTRIM(p.pompa)        AS pompa1,
+            RTRIM(p.pompa2)       AS pompa2,
+            RTRIM(p.pompa3)       AS pompa3
+        FROM PTI p
+        WHERE p.id IN ({",".join(["?"] * len(pids))})
+    """
+    return PumpIndex(ptcs=ptcs, pids=pids, pid_by_ptc=pid_by_ptc, flags_by_pid=flags, sql=sql)
+
+
+PUMP_INDEX: RefreshingSnapshot[PumpIndex] = RefreshingSnapshot(
+    "pumps:lovati-index", _load_pump_index, ttl=PUMP_INDEX_TTL
+)
+
+
+def make_pump_row(
+    ptc: str,
+    t2: Optional[float],
+    q1: Optional[float],
+    time: Any,
+    pompa: List[int],
+    nums: List[int],
+) -> Dict[str, Any]:
+    """
+    Строка таблицы помп LOVATI (общая для чтения из БД и проекции снимка monitoring).
+    Ссылки url_* сюда не входят — их добавляет API по шаблонам (pumps/links.py).
+    """
+    return {
+        "src": "lovati",
+        "ptc": ptc,
+        "t2": round(t2 or 0.0, 1),
+        "q1": round(q1 or 0.0, 2),
+        "time": time,
+        "pompa": pompa,
+        "pompa_nums": nums,
+        "lcs": None,
+    }
+
+
+def fetch_lovati_pumps() -> List[Dict[str, Any]]:
+    out: List[Dict[str, Any]] = []
+
+    index = PUMP_INDEX.get()
+    if index.ptcs != get_topology().lovati:
+        # реестр помп перечитан — индекс PTI.id строим заново сразу, а не через PUMPS_LOVATI_INDEX_TTL
+        PUMP_INDEX.refresh(force=True)
+        index = PUMP_INDEX.get()
+    if not index.pids:
+        return out
+
+    with connect(settings.LOVATI_SERVER) as conn:
+        cur = conn.cursor()
+        cur.execute(index.sql, *index.pids)
 
         for r in cur.fetchall():
             ptc = str(r.PTC).strip()
             pid = int(r.PID) if r.PID is not None else 0
 
-            flags = ids_flags_by_pid.get(pid, {"pompa2": False, "pompa3": False})
+            flags = index.flags(pid)
 
             p1 = _to_01(r.pompa1)
             p2 = _to_01(r.pompa2) if flags.get("pompa2") else None
@@ -145,28 +199,7 @@ def fetch_lovati_pumps() -> List[Dict[str, Any]]:
             if not pumps:
                 continue
 
-            out.append({
-                "src": "lovati",
-                "ptc": ptc,
-                "t2": round(_to_float(r.t2) or 0.0, 1),
-                "q1": round(_to_float(r.q1) or 0.0, 2),
-                "time": r.dt1,
-                "pompa": pumps,
-                "pompa_nums": nums,
-                "lcs": None,
-
-                # ✅ ВАЖНО: PTC открывает страницу объекта без param
-                "url_ptc": _ptc_view_url(ptc),
-                "url_t2": _chart_url(ptc, "t2"),
-                "url_q1": _chart_url(ptc, "q1"),
-                "url_pompa": _chart_url(ptc, "pompa"),
-                "url_pompa2": _chart_url(ptc, "pompa2"),
-                "url_pompa3": _chart_url(ptc, "pompa3"),
-            })
+            out.append(make_pump_row(ptc, _to_float(r.t2), _to_float(r.q1), r.dt1, pumps, nums))
 
     out.sort(key=lambda x: x.get("ptc") or "")
     return out
-
-def _ptc_view_url(ptc: str) -> str:
-    tpl = getattr(settings, "PTC_VIEW_URL_TEMPLATE", "")
-    return tpl.format(ptc=ptc) if tpl else ""
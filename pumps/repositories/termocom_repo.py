@@ -1,12 +1,11 @@
 from __future__ import annotations
 
 from django.conf import settings
-from django.urls import reverse
-from django.urls.exceptions import NoReverseMatch
 
 from typing import Dict, List, Any, Optional
 import pyodbc
 
+from ..topology import get_topology
 from .db import connect, dsn_from_dict
 
 
@@ -15,74 +14,6 @@ DB_CONNECT_TIMEOUT = getattr(settings, "DB_CONNECT_TIMEOUT", 5)
 # LCS < 30% = желтый (как в Monitoring PTC)
 LCS_NORM = 30.0
 
-POMPA_MAP: Dict[str, List[int]] = {
-    "2009": [2],
-    "2055": [2, 3],
-    "2056": [2],
-    "2057": [2],
-    "2201": [2],
-    "2202": [2, 3],
-    "2209": [1],
-    "2216": [2],
-    "3012": [2],
-    "3125": [1, 2, 3],
-    "4009": [2],
-    "4012": [2],
-    "4014": [2],
-    "4016": [2],
-    "4019": [2],
-    "4021": [2],
-    "4025": [2],
-    "4027": [2],
-    "4037": [2],
-    "4040": [2],
-    "4041": [2],
-    "4050": [2],
-    "4054": [2],
-    "4058": [2],
-    "4063": [2],
-    "4065": [2],
-    "4066": [2],
-    "4068": [2],
-    "4077": [2],
-    "5002": [2],
-    "5003": [2],
-    "5008": [2],
-    "5009": [2],
-    "5014": [2],
-    "5019": [2],
-    "5047": [2],
-    "5057": [2],
-    "5058": [2],
-    "5075": [2],
-}
-
-_CHART_PARAM_MAP = {
-    # TERMOCOM charts param codes (см. monitoring_PTC/termocom_charts/repositories.py)
-    "q": "Q",
-    "q1": "Q",
-    "t2": "T2",
-    "pompa": "POMPA",
-    "pompa2": "POMPA2",
-    "pompa3": "POMPA3",
-}
-
-def _chart_url(ptc: str, param: str | None = None) -> str:
-    """
-    Ссылка на график TERMOCOM (tc-charts).
-    Если param=None — открываем страницу объекта (без параметра, по умолчанию будет T1).
-    """
-    try:
-        base = reverse("termocom_charts:chart_page")
-    except NoReverseMatch:
-        base = "/tc-charts/chart/"
-
-    q = f"?pti={ptc}"
-    if param:
-        p = _CHART_PARAM_MAP.get((param or "").lower(), (param or "").upper())
-        q += f"&param={p}"
-    return f"{base}{q}"
-
 
 def _to_float(v) -> Optional[float]:
     try:
@@ -93,7 +24,7 @@ def _to_float(v) -> Optional[float]:
         return None
 
 
-def _load_lovati_address_map() -> Dict[str, str]:
+def load_lovati_address_map() -> Dict[str, str]:
     """
     Адреса берём из LOVATI.db (таблица PTC_adrese)
     """
@@ -113,14 +44,45 @@ def _load_lovati_address_map() -> Dict[str, str]:
         return {str(r.PTC).strip(): (r.adresa or "") for r in cur.fetchall()}
 
 
-def fetch_termocom_pumps() -> List[Dict[str, Any]]:
+def make_pump_row(
+    ptc: str,
+    address: str,
+    t2: Optional[float],
+    q1: Optional[float],
+    time: Any,
+    lcs: Optional[float],
+    pompa: List[float],
+    nums: List[int],
+) -> Dict[str, Any]:
+    """
+    Строка таблицы помп TERMOCOM (общая для чтения из БД и проекции снимка monitoring).
+    Ссылки url_* сюда не входят — их добавляет API по шаблонам (pumps/links.py).
+    """
+    return {
+        "src": "termocom",
+        "ptc": ptc,
+        "address": address,
+        "t2": round(t2 or 0.0, 1),
+        "q1": round(q1 or 0.0, 2),
+        "time": time,
+        "lcs": lcs,
+        "pompa": pompa,
+        "pompa_nums": nums,
+    }
+
+
+def fetch_termocom_pumps(address_map: Optional[Dict[str, str]] = None) -> List[Dict[str, Any]]:
     """
     TERMOCOM: берём Т2, Q, помпы из TERMOCOM DB.
-    Важно: в таблицу попадают ТОЛЬКО объекты из POMPA_MAP.
+    Важно: в таблицу попадают ТОЛЬКО объекты TERMOCOM из реестра помп (pumps/topology.py).
+    address_map=None — адреса читаются из LOVATI здесь же (последовательно);
+    pumps.service читает их параллельно и передаёт {} / готовую карту.
     """
-    address_map = _load_lovati_address_map()
+    if address_map is None:
+        address_map = load_lovati_address_map()
 
     out: List[Dict[str, Any]] = []
+    topology = get_topology()
 
     dsn = dsn_from_dict(settings.SQL_SERVER)
     with pyodbc.connect(dsn, timeout=DB_CONNECT_TIMEOUT) as conn:
@@ -160,10 +122,10 @@ def fetch_termocom_pumps() -> List[Dict[str, Any]]:
                 continue
 
             ptc = ptc_full[:4]
-            if ptc not in POMPA_MAP:
+            nums = topology.termocom_nums(ptc)
+            if not nums:
                 continue
 
-            nums = POMPA_MAP.get(ptc, [])
             pompa_vals: List[float] = []
             for num in nums:
                 if num == 1:
@@ -174,32 +136,16 @@ def fetch_termocom_pumps() -> List[Dict[str, Any]]:
                     pompa_vals.append(_to_float(r.DCX_AI03_VALUE) or 0.0)
 
             lcs_raw = _to_float(r.UNIT_LCS_VALUE) or 0.0
-            lcs_pct = round(lcs_raw * 100.0, 2)
-
-            out.append({
-                "src": "termocom",
-                "ptc": ptc,
-                "address": address_map.get(ptc, ""),
-                "t2": round(_to_float(r.MC_T2_VALUE_INSTANT) or 0.0, 1),
-                "q1": round(_to_float(r.MC_POWER1_VALUE_INSTANT) or 0.0, 2),
-                "time": r.MC_DTIME_VALUE_INSTANT,
-                "lcs": lcs_pct,
-                "pompa": pompa_vals,
-                "pompa_nums": nums,
-
-                # ✅ ВАЖНО: PTC больше НЕ ведёт на T2, открывает страницу объекта
-                "url_ptc": _ptc_view_url(ptc),
-                "url_t2": _chart_url(ptc, "t2"),
-                # ✅ ВАЖНО: TERMOCOM Q = "Q", не "Q1"
-                "url_q1": _chart_url(ptc, "q"),
-                "url_pompa": _chart_url(ptc, "pompa"),
-                "url_pompa2": _chart_url(ptc, "pompa2"),
-                "url_pompa3": _chart_url(ptc, "pompa3"),
-            })
+            out.append(make_pump_row(
+                ptc,
+                address=address_map.get(ptc, ""),
+                t2=_to_float(r.MC_T2_VALUE_INSTANT),
+                q1=_to_float(r.MC_POWER1_VALUE_INSTANT),
+                time=r.MC_DTIME_VALUE_INSTANT,
+                lcs=round(lcs_raw * 100.0, 2),
+                pompa=pompa_vals,
+                nums=list(nums),
+            ))
 
     out.sort(key=lambda x: x.get("ptc") or "")
     return out
-
-def _ptc_view_url(ptc: str) -> str:
-    tpl = getattr(settings, "PTC_VIEW_URL_TEMPLATE", "")
-    return tpl.format(ptc=ptc) if tpl else ""
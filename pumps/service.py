@@ -1,12 +1,53 @@
 from __future__ import annotations
 
-from typing import List, Dict, Any, Optional
+import logging
+import threading
+import time
+from functools import lru_cache
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Callable, List, Dict, Any, Optional, Tuple
 
-from .repositories.termocom_repo import fetch_termocom_pumps, LCS_NORM
-from .repositories.lovati_repo import fetch_lovati_pumps
+from django.conf import settings
+
+from monitoring import snapshot
+
+from .events import TransitionDetector
+from .topology import get_topology
+from .trend import CurrentTrend
+from .repositories.termocom_repo import (
+    LCS_NORM,
+    fetch_termocom_pumps,
+    load_lovati_address_map,
+    make_pump_row as make_termocom_row,
+)
+from .repositories.lovati_repo import (
+    fetch_lovati_pumps,
+    make_pump_row as make_lovati_row,
+)
+
+logger = logging.getLogger(__name__)
 
 PUMP_ALARM_CURRENT = 200.0
 
+# Сколько ждём источники (сек) — общий дедлайн на все три чтения.
+# Не успевший источник дочитывается в фоне и обновит «последний удачный» результат.
+SOURCE_DEADLINE = getattr(settings, "PUMPS_SOURCE_DEADLINE", 8.0)
+
+# Насколько старый снимок monitoring (сек) ещё годится для страницы помп без своих запросов к БД
+SNAPSHOT_MAX_AGE = getattr(settings, "PUMPS_SNAPSHOT_MAX_AGE", 60.0)
+
+# Один пул потоков на процесс (не создаём заново на каждый запрос!)
+PUMPS_EXECUTOR = ThreadPoolExecutor(max_workers=6, thread_name_prefix="pumps-sources")
+
+
+def _to_float(v) -> Optional[float]:
+    try:
+        if v is None or v == "":
+            return None
+        return float(v)
+    except Exception:
+        return None
+
 
 def _is_digital_01_list(vals: list) -> bool:
     try:
@@ -23,8 +64,13 @@ def calc_overall_color(row: Dict[str, Any]) -> str:
     if not pumps:
         return "gray"
 
+    # тип сигнала — из реестра помп по источнику строки; без src — угадываем по значениям
+    digital = get_topology().is_digital(row.get("src"))
+    if digital is None:
+        digital = _is_digital_01_list(pumps)
+
     # LOVATI 0/1: если есть 1 -> красный, иначе зелёный
-    if _is_digital_01_list(pumps):
+    if digital:
         only = [float(v) for v in pumps if v is not None]
         return "red" if any(v == 1.0 for v in only) else "green"
 
@@ -52,6 +98,23 @@ def calc_overall_color(row: Dict[str, Any]) -> str:
     return "gray"
 
 
+@lru_cache(maxsize=4096)
+def _cached_color(pompa: Tuple[Any, ...], lcs: Any, src: Optional[str] = None) -> str:
+    return calc_overall_color({"pompa": list(pompa), "lcs": lcs, "src": src})
+
+
+def calc_pump_color(value: Any, lcs: Any, src: Optional[str] = None) -> str:
+    """Цвет одной помпы — те же правила, что у строки целиком."""
+    return _cached_color((value,), lcs, src)
+
+
+# Переходы цвета по (ptc, помпа) — см. pumps/events.py и /pumps/api/events/
+PUMP_EVENTS = TransitionDetector(calc_pump_color)
+
+# Тренд тока помп TERMOCOM (ранний признак перегруза) — см. pumps/trend.py
+PUMP_TRENDS = CurrentTrend()
+
+
 def _t2_alert(t2: Optional[float], t2_min: Optional[float], t2_max: Optional[float]) -> bool:
     if t2 is None:
         return False
@@ -62,9 +125,162 @@ def _t2_alert(t2: Optional[float], t2_min: Optional[float], t2_max: Optional[flo
     return False
 
 
-def get_pumps_rows(t2_min: Optional[float], t2_max: Optional[float]) -> List[Dict[str, Any]]:
-    termo = fetch_termocom_pumps()
-    lovati = fetch_lovati_pumps()
+class _Source:
+    """
+    Один источник данных страницы помп: текущее чтение (не больше одного на процесс)
+    + последний удачный результат, которым отвечаем, если источник не успел или упал.
+    """
+
+    def __init__(self, name: str, loader: Callable[[], Any]) -> None:
+        self.name = name
+        self.loader = loader
+        self._lock = threading.Lock()
+        self._future: Optional[Future] = None
+        self.last_good: Any = None
+        self.last_good_at: Optional[float] = None
+
+    def submit(self) -> Future:
+        """Запустить чтение; если прошлое ещё идёт (медленная БД) — ждём его же, второе не запускаем."""
+        with self._lock:
+            if self._future is None or self._future.done():
+                self._future = PUMPS_EXECUTOR.submit(self.loader)
+                self._future.add_done_callback(self._on_done)
+            return self._future
+
+    def _on_done(self, fut: Future) -> None:
+        try:
+            value = fut.result()
+        except Exception as e:
+            logger.warning("pumps: source %s failed: %s", self.name, e)
+            return
+        self.last_good = value
+        self.last_good_at = time.time()
+
+    def result(self, fut: Future) -> Tuple[Any, Dict[str, Any]]:
+        """(данные, статус). Не готово/ошибка → последний удачный результат со stale=True (или None)."""
+        fresh = fut.done() and fut.exception() is None
+        if fresh:
+            value = fut.result()
+        else:
+            value = self.last_good
+        if fresh:
+            error = None
+        elif fut.done():
+            error = str(fut.exception())
+        else:
+            error = f"timeout after {SOURCE_DEADLINE}s"
+        status = {
+            "stale": not fresh,
+            "age": round(time.time() - self.last_good_at, 1) if (not fresh and self.last_good_at) else None,
+            "error": error,
+            "via": "db",
+        }
+        return value, status
+
+
+_ADDRESSES = _Source("addresses", load_lovati_address_map)
+_TERMOCOM = _Source("termocom", lambda: fetch_termocom_pumps(address_map={}))
+_LOVATI = _Source("lovati", fetch_lovati_pumps)
+
+
+def _project_termocom(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Строки monitoring (TERMOCOM5) → строки помп: только объекты TERMOCOM из реестра, 5019A и т.п. пропускаем."""
+    out: List[Dict[str, Any]] = []
+    topology = get_topology()
+    for r in rows:
+        ptc_full = str(r.get("ptc") or "")
+        if not ptc_full or ptc_full.endswith("A"):
+            continue
+        ptc = ptc_full[:4]
+        nums = topology.termocom_nums(ptc)
+        if not nums:
+            continue
+        pompa = r.get("pompa")
+        if not isinstance(pompa, list) or len(pompa) != len(nums):
+            pompa = [0.0] * len(nums)
+        out.append(make_termocom_row(
+            ptc,
+            address=r.get("address") or "",
+            t2=_to_float(r.get("t2")),
+            q1=_to_float(r.get("q1")),
+            time=r.get("time_iso"),
+            lcs=r.get("lcs"),
+            pompa=[_to_float(v) or 0.0 for v in pompa],
+            nums=list(nums),
+        ))
+    return out
+
+
+def _project_lovati(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Строки monitoring (LOVATI) → строки помп: объекты LOVATI из реестра со статусами 0/1."""
+    out: List[Dict[str, Any]] = []
+    lovati_ptc = get_topology().lovati
+    for r in rows:
+        ptc = str(r.get("ptc") or "")
+        pompa = r.get("pompa")
+        if ptc not in lovati_ptc or not pompa:
+            continue
+        out.append(make_lovati_row(
+            ptc, _to_float(r.get("t2")), _to_float(r.get("q1")), r.get("time_iso"),
+            list(pompa), list(r.get("pompa_nums") or []),
+        ))
+    return out
+
+
+def _fetch_sources() -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], Dict[str, Dict[str, Any]]]:
+    """
+    Сначала — общий снимок monitoring (monitoring/snapshot.py): если страница мониторинга
+    уже прочитала источник не раньше PUMPS_SNAPSHOT_MAX_AGE сек назад, строки помп — его проекция,
+    в БД не ходим. Для остальных источников — свои узкие чтения (адреса LOVATI, TERMOCOM, LOVATI)
+    параллельно, с общим дедлайном.
+    Вернёт (termo, lovati, статусы источников); строки устаревшего источника помечены stale=True.
+    """
+    termo_snap = snapshot.peek("termocom", SNAPSHOT_MAX_AGE)
+    lovati_snap = snapshot.peek("lovati", SNAPSHOT_MAX_AGE)
+
+    sources: List[_Source] = []
+    if termo_snap is None:
+        sources += [_ADDRESSES, _TERMOCOM]
+    if lovati_snap is None:
+        sources.append(_LOVATI)
+    futures = [s.submit() for s in sources]
+    if futures:
+        wait(futures, timeout=SOURCE_DEADLINE)
+    results = {s.name: s.result(f) for s, f in zip(sources, futures)}
+
+    def mark(rows: Optional[List[Dict[str, Any]]], stale: bool) -> List[Dict[str, Any]]:
+        return [dict(r, stale=stale) for r in rows or []]
+
+    def from_snapshot(age: float) -> Dict[str, Any]:
+        return {"stale": False, "age": round(age, 1), "error": None, "via": "snapshot"}
+
+    status: Dict[str, Dict[str, Any]] = {}
+
+    if termo_snap is not None:
+        termo = mark(_project_termocom(termo_snap[0]), False)
+        status["termocom"] = from_snapshot(termo_snap[1])
+    else:
+        address_map, status["addresses"] = results["addresses"]
+        rows, status["termocom"] = results["termocom"]
+        termo = mark(rows, status["termocom"]["stale"])
+        for r in termo:
+            r["address"] = (address_map or {}).get(r.get("ptc") or "", "")
+
+    if lovati_snap is not None:
+        lovati = mark(_project_lovati(lovati_snap[0]), False)
+        status["lovati"] = from_snapshot(lovati_snap[1])
+    else:
+        rows, status["lovati"] = results["lovati"]
+        lovati = mark(rows, status["lovati"]["stale"])
+
+    return termo, lovati, status
+
+
+def get_pumps_table(
+    t2_min: Optional[float], t2_max: Optional[float]
+) -> Tuple[List[Dict[str, Any]], Dict[str, Dict[str, Any]]]:
+    """Строки таблицы помп + статус источников {"termocom": {"stale", "age", "error", "via"}, ...}."""
+    termo, lovati, status = _fetch_sources()
 
     # приоритет: TERMOCOM реальные > LOVATI реальные
     # но если TERMOCOM placeholder — заменяем на LOVATI реальные (если есть)
@@ -90,11 +306,24 @@ def get_pumps_rows(t2_min: Optional[float], t2_max: Optional[float]) -> List[Dic
     rows = list(by_ptc.values())
     rows.sort(key=lambda x: x.get("ptc") or "")
 
+    topology = get_topology()
     out: List[Dict[str, Any]] = []
     for r in rows:
         rr = dict(r)
-        rr["overall_color"] = calc_overall_color(rr)
+        # тип сигнала из реестра: клиент рисует квадраты по нему же, а не угадывает по значениям
+        rr["digital"] = bool(topology.is_digital(rr.get("src")))
+        # значения помп повторяются от опроса к опросу — цвет берём из кэша по (помпы, lcs)
+        rr["overall_color"] = _cached_color(tuple(rr.get("pompa") or ()), rr.get("lcs"), rr.get("src"))
         rr["t2_alert"] = _t2_alert(rr.get("t2"), t2_min, t2_max)
         out.append(rr)
 
-    return out
+    PUMP_EVENTS.update(out)
+    PUMP_TRENDS.update(out)
+    PUMP_TRENDS.annotate(out)
+
+    return out, status
+
+
+def get_pumps_rows(t2_min: Optional[float], t2_max: Optional[float]) -> List[Dict[str, Any]]:
+    rows, _ = get_pumps_table(t2_min, t2_max)
+    return rows
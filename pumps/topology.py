@@ -0,0 +1,92 @@
+# pumps/topology.py
+# МОДУЛЬ: единый реестр помп по объектам (какой источник, какие номера помп, тип сигнала).
+# Раньше одна и та же карта жила в трёх местах: pompa_map внутри monitoring._fetch_termocom_rows
+# (собиралась заново на каждый вызов), POMPA_MAP в pumps/repositories/termocom_repo.py и два
+# LOVATI_PUMP01_PTC (monitoring/views.py и pumps/repositories/lovati_repo.py).
+# Теперь всё лежит в pumps/data/topology.json (путь — PUMPS_TOPOLOGY_PATH):
+#   "termocom": ток помп DCX_AI01..03 (signal "current": > 0 работает, > 200 A перегруз);
+#   "lovati":   статусы PTI.pompa/pompa2/pompa3 (signal "status01": 0 работает, 1 стоит/авария),
+#               pompa2/pompa3 показываются, только если заведены в IDS.
+# Файл читается один раз в неизменяемую структуру с индексом по PTC; раз в PUMPS_TOPOLOGY_CHECK сек
+# в фоне сверяется mtime/размер файла и при правке он перечитывается без перезапуска.
+# Битый файл в лог, продолжаем работать со старой картой.
+
+from __future__ import annotations
+
+import json
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Dict, FrozenSet, Mapping, Optional, Tuple
+
+from django.conf import settings
+
+from monitoring_PTC.charts.utils.refresh import RefreshingSnapshot
+
+TOPOLOGY_PATH = Path(getattr(settings, "PUMPS_TOPOLOGY_PATH", "") or Path(__file__).resolve().parent / "data" / "topology.json")
+TOPOLOGY_CHECK = getattr(settings, "PUMPS_TOPOLOGY_CHECK", 30)
+
+SOURCES = ("termocom", "lovati")
+SIGNALS = ("current", "status01")
+
+
+@dataclass(frozen=True)
+class PumpTopology:
+    """Реестр помп. Общий для всех потоков — не менять (словари только на чтение)."""
+    termocom: Mapping[str, Tuple[int, ...]]        # PTC → номера помп TERMOCOM (DCX_AI0n)
+    lovati: FrozenSet[str]                         # PTC объектов LOVATI со статусами помп в PTI
+    lovati_nums: Mapping[str, Tuple[int, ...]]     # PTC → номера помп LOVATI, которые вообще возможны
+    signals: Mapping[str, str]                     # источник → "current" | "status01"
+
+    def termocom_nums(self, ptc: str) -> Tuple[int, ...]:
+        return self.termocom.get(ptc, ())
+
+    def is_digital(self, src: Optional[str]) -> Optional[bool]:
+        """True — статусы 0/1, False — токи, None — источник неизвестен."""
+        signal = self.signals.get(src or "")
+        return None if signal is None else signal == "status01"
+
+
+def _nums(ptc: str, raw: Any) -> Tuple[int, ...]:
+    nums = tuple(sorted({int(n) for n in raw}))
+    if not nums or any(n not in (1, 2, 3) for n in nums):
+        raise ValueError(f"PTC {ptc}: pump numbers must be 1..3, got {raw!r}")
+    return nums
+
+
+def parse_topology(data: Dict[str, Any]) -> PumpTopology:
+    objects: Dict[str, Dict[str, Tuple[int, ...]]] = {}
+    signals: Dict[str, str] = {}
+    for src in SOURCES:
+        section = data.get(src) or {}
+        signal = section.get("signal")
+        if signal not in SIGNALS:
+            raise ValueError(f"{src}: signal must be one of {SIGNALS}, got {signal!r}")
+        signals[src] = signal
+        objects[src] = {str(ptc).strip(): _nums(ptc, nums) for ptc, nums in (section.get("objects") or {}).items()}
+
+    return PumpTopology(
+        termocom=MappingProxyType(objects["termocom"]),
+        lovati=frozenset(objects["lovati"]),
+        lovati_nums=MappingProxyType(objects["lovati"]),
+        signals=MappingProxyType(signals),
+    )
+
+
+def _load() -> PumpTopology:
+    return parse_topology(json.loads(TOPOLOGY_PATH.read_text(encoding="utf-8")))
+
+
+def _signature() -> Tuple[str, float, int]:
+    st = os.stat(TOPOLOGY_PATH)
+    return str(TOPOLOGY_PATH), st.st_mtime, st.st_size
+
+
+TOPOLOGY: RefreshingSnapshot[PumpTopology] = RefreshingSnapshot(
+    "pumps:topology", _load, ttl=TOPOLOGY_CHECK, signature=_signature
+)
+
+
+def get_topology() -> PumpTopology:
+    return TOPOLOGY.get()
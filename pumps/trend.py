@@ -0,0 +1,177 @@
+# pumps/trend.py
+# МОДУЛЬ: тренд тока помп TERMOCOM (DCX_AI01..03) — ранний признак приближения к перегрузу.
+# calc_overall_color смотрит только на мгновенный ток против PUMP_ALARM_CURRENT: помпа, которая
+# постепенно «разгоняется» к 200 A, остаётся зелёной до самого срабатывания.
+# Здесь для каждой помпы (ptc, номер) — кольцевой буфер последних PUMPS_TREND_WINDOW показаний
+# в одном массиве NumPy (строка = помпа). Буфер пополняется из строк, которые service.get_pumps_table
+# уже прочитал (лишних запросов к БД нет); новое показание — только если у объекта сменилось время
+# прибора (частые обновления страницы не дублируют точки).
+# Наклон (A/мин, МНК по времени прибора) и среднее считаются векторно сразу по всем помпам;
+# показания старше PUMPS_TREND_MAX_AGE сек в расчёт не идут — после простоя страницы (цикл long-poll
+# засыпает) старые точки не «сглаживают» наклон рядом со свежими.
+# trending_up: точек не меньше PUMPS_TREND_MIN_POINTS, помпа работает и ток растёт
+# не медленнее PUMPS_TREND_SLOPE A/мин. Буфер у каждого воркера свой и пропадает при перезапуске.
+
+from __future__ import annotations
+
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+
+from monitoring_PTC.charts.timezone_utils import TZ_CHISINAU
+
+TREND_WINDOW = getattr(settings, "PUMPS_TREND_WINDOW", 30)
+TREND_MIN_POINTS = getattr(settings, "PUMPS_TREND_MIN_POINTS", 5)
+TREND_SLOPE = getattr(settings, "PUMPS_TREND_SLOPE", 2.0)
+TREND_MAX_AGE = getattr(settings, "PUMPS_TREND_MAX_AGE", 1800)
+
+_WALL_EPOCH = datetime(1970, 1, 1)
+
+PumpKey = Tuple[str, int]                                 # (ptc, номер помпы)
+
+
+def _wall_seconds(t: Any) -> Optional[float]:
+    """Время прибора (naive локальное datetime или ISO-строка из снимка) → «настенные» секунды; не время → None."""
+    if isinstance(t, str):
+        try:
+            t = datetime.fromisoformat(t)
+        except ValueError:
+            return None
+    if not isinstance(t, datetime):
+        return None
+    if t.tzinfo is not None:
+        t = t.astimezone(TZ_CHISINAU).replace(tzinfo=None)
+    return (t - _WALL_EPOCH).total_seconds()
+
+
+def _wall_now() -> float:
+    return (datetime.now(TZ_CHISINAU).replace(tzinfo=None) - _WALL_EPOCH).total_seconds()
+
+
+class CurrentTrend:
+    """Кольцевые буферы тока всех помп TERMOCOM: values/times формы (помпы, window), пустое — NaN."""
+
+    def __init__(self, window: int = TREND_WINDOW, min_points: int = TREND_MIN_POINTS,
+                 slope_limit: float = TREND_SLOPE, max_age: float = TREND_MAX_AGE) -> None:
+        self.window = int(window)
+        self.min_points = int(min_points)
+        self.slope_limit = float(slope_limit)
+        self.max_age = float(max_age)
+        self._lock = threading.Lock()
+        self._index: Dict[PumpKey, int] = {}
+        self._last_time: Dict[str, float] = {}              # ptc → время прибора последнего показания, сек
+        self._values = np.full((0, self.window), np.nan)
+        self._times = np.full((0, self.window), np.nan)
+        self._pos = np.zeros(0, dtype=np.int64)            # куда писать следующее показание
+
+    def _slot(self, key: PumpKey) -> int:
+        i = self._index.get(key)
+        if i is None:
+            i = len(self._index)
+            if i >= self._values.shape[0]:                  # растим массивы вдвое, а не по строке
+                grow = max(16, self._values.shape[0])
+                self._values = np.vstack([self._values, np.full((grow, self.window), np.nan)])
+                self._times = np.vstack([self._times, np.full((grow, self.window), np.nan)])
+                self._pos = np.concatenate([self._pos, np.zeros(grow, dtype=np.int64)])
+            self._index[key] = i
+        return i
+
+    def update(self, rows: Iterable[Dict[str, Any]]) -> int:
+        """
+        Добавить показания из строк TERMOCOM (stale и без времени прибора пропускаем); вернёт число новых точек.
+        Ось x — время прибора (r["time"]), а не момент приёма.
+        """
+        slots: List[int] = []
+        vals: List[float] = []
+        times: List[float] = []
+        with self._lock:
+            for r in rows:
+                if r.get("src") != "termocom" or r.get("stale"):
+                    continue
+                ptc = r.get("ptc")
+                t = _wall_seconds(r.get("time"))
+                if t is None:
+                    continue
+                last = self._last_time.get(ptc)
+                if last is not None and t <= last:
+                    continue                                # прибор ещё не передал новое показание
+                self._last_time[ptc] = t
+                for num, val in zip(r.get("pompa_nums") or [], r.get("pompa") or []):
+                    try:
+                        v = float(val)
+                    except (TypeError, ValueError):
+                        continue
+                    slots.append(self._slot((ptc, int(num))))
+                    vals.append(v)
+                    times.append(t)
+            if not slots:
+                return 0
+            idx = np.asarray(slots, dtype=np.int64)
+            col = self._pos[idx] % self.window
+            self._values[idx, col] = vals
+            self._times[idx, col] = times
+            self._pos[idx] += 1
+        return len(slots)
+
+    def stats(self, now: Optional[float] = None) -> Dict[PumpKey, Dict[str, Any]]:
+        """
+        {(ptc, номер): {"slope", "mean", "last", "points", "trending_up"}} по всем помпам разом.
+        now — «настенные» секунды (по умолчанию текущее время Кишинёва); точки старше max_age не учитываются.
+        """
+        now = _wall_now() if now is None else now
+        with self._lock:
+            n_pumps = len(self._index)
+            if not n_pumps:
+                return {}
+            keys = list(self._index)
+            v = self._values[:n_pumps].copy()
+            t = self._times[:n_pumps].copy()
+            last_col = (self._pos[:n_pumps] - 1) % self.window
+
+        ok = ~np.isnan(v) & (t >= now - self.max_age)
+        v = np.where(ok, v, np.nan)
+        points = ok.sum(axis=1)
+        cnt = np.maximum(points, 1)
+        v0 = np.where(ok, v, 0.0)
+        t_min = np.where(ok, t, np.inf).min(axis=1, keepdims=True)
+        x = np.where(ok, (t - np.where(np.isfinite(t_min), t_min, 0.0)) / 60.0, 0.0)   # минуты
+
+        mean = v0.sum(axis=1) / cnt
+        x_mean = x.sum(axis=1) / cnt
+        dx = np.where(ok, x - x_mean[:, None], 0.0)
+        dy = np.where(ok, v0 - mean[:, None], 0.0)
+        sxx = (dx * dx).sum(axis=1)
+        slope = np.divide((dx * dy).sum(axis=1), sxx, out=np.zeros_like(sxx), where=sxx > 0)
+        last = v[np.arange(n_pumps), last_col]
+
+        enough = (points >= self.min_points) & (sxx > 0)
+        up = enough & (last > 0) & (slope >= self.slope_limit)
+
+        return {
+            key: {
+                "slope": round(float(slope[i]), 2) if enough[i] else None,
+                "mean": round(float(mean[i]), 1) if points[i] else None,
+                "last": float(last[i]) if points[i] else None,
+                "points": int(points[i]),
+                "trending_up": bool(up[i]),
+            }
+            for i, key in enumerate(keys)
+        }
+
+    def annotate(self, rows: List[Dict[str, Any]], now: Optional[float] = None) -> None:
+        """
+        Дописать в строки pompa_trend (наклон A/мин по каждой помпе, как в pompa_nums; None — мало точек)
+        и trending_up (хоть одна помпа объекта растёт). Строки LOVATI: pompa_trend=None, trending_up=False.
+        """
+        st = self.stats(now)
+        for r in rows:
+            if r.get("src") != "termocom":
+                r["pompa_trend"] = None
+                r["trending_up"] = False
+                continue
+            per_pump = [st.get((r.get("ptc"), int(num))) for num in r.get("pompa_nums") or []]
+            r["pompa_trend"] = [s["slope"] if s else None for s in per_pump]
+            r["trending_up"] = any(s["trending_up"] for s in per_pump if s)
@@ -1,8 +1,11 @@
 from django.urls import path
 from .views_web import pumps_page
-from .views_api import pumps_table_api
+from .views_api import pumps_table_api, pumps_watch_api, pump_runs_api, pump_events_api
 
 urlpatterns = [
     path("", pumps_page, name="pumps-page"),
     path("api/table/", pumps_table_api, name="pumps-api-table"),
+    path("api/watch/", pumps_watch_api, name="pumps-api-watch"),
+    path("api/runs/", pump_runs_api, name="pumps-api-runs"),
+    path("api/events/", pump_events_api, name="pumps-api-events"),
 ]
@@ -1,48 +1,148 @@
 from __future__ import annotations
 
+import math
+from datetime import date, timedelta
+
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 
-from .service import get_pumps_rows
+from monitoring_PTC.charts.chunks import local_today
+
+from .analytics import MAX_DAYS, pump_runs
+from .links import row_urls, url_templates
+from .longpoll import PUMPS_WATCHER
+from .service import PUMP_EVENTS, get_pumps_table
+
+
+def _to_float(q):
+    try:
+        if q is None or q == "":
+            return None
+        return float(q)
+    except Exception:
+        return None
+
+
+def _row_item(r, compact: bool) -> dict:
+    item = {
+        "ptc": r.get("ptc"),
+        "t2": r.get("t2"),
+        "q1": r.get("q1"),
+        "t2_alert": r.get("t2_alert"),
+        "overall_color": r.get("overall_color"),
+        "pompa": r.get("pompa"),
+        "pompa_nums": r.get("pompa_nums"),
+        "digital": r.get("digital", False),
+        "lcs": r.get("lcs"),
+        "stale": r.get("stale", False),
+        "pompa_trend": r.get("pompa_trend"),
+        "trending_up": r.get("trending_up", False),
+    }
+    if compact:
+        # ссылки клиент собирает сам: templates[src][ключ].replace("{ptc}", ptc)
+        item["src"] = r.get("src")
+    else:
+        # ссылки: url_ptc, url_t2, url_q1, url_pompa, url_pompa2, url_pompa3
+        item.update(row_urls(r.get("src") or "", r.get("ptc") or ""))
+    return item
 
 
 @api_view(["GET"])
 def pumps_table_api(request):
-    def to_float(q):
-        try:
-            if q is None or q == "":
-                return None
-            return float(q)
-        except Exception:
-            return None
+    """
+    Таблица помп. Обычный ответ — массив строк с готовыми url_*.
+    ?compact=1 — {"templates": {src: {ключ: шаблон с {ptc}}}, "stale": [...], "rows": [...]}:
+    шаблоны ссылок один раз, в строках только значения и src.
+    """
+    t2_min = _to_float(request.query_params.get("t2_min"))
+    t2_max = _to_float(request.query_params.get("t2_max"))
+
+    rows, sources = get_pumps_table(t2_min=t2_min, t2_max=t2_max)
+
+    # источники, ответившие не вовремя (строки взяты из последнего удачного чтения)
+    stale = [name for name, st in sources.items() if st["stale"]]
+    compact = (request.query_params.get("compact") or "").strip().lower() in ("1", "true", "yes")
+
+    payload = [_row_item(r, compact) for r in rows]
+
+    if compact:
+        resp = Response({"templates": url_templates(), "stale": stale, "rows": payload})
+    else:
+        resp = Response(payload)
+    if stale:
+        resp["X-Pumps-Stale"] = ",".join(stale)
+    return resp
+
+
+@api_view(["GET"])
+def pump_runs_api(request):
+    """
+    Пуски/остановы/время работы помп объекта по истории.
+    ?ptc=3001&period=today|week  или  ?ptc=3001&from=YYYY-MM-DD&to=YYYY-MM-DD (не больше MAX_DAYS суток).
+    """
+    ptc = (request.query_params.get("ptc") or "").strip()
+    if not ptc:
+        return Response({"error": "ptc is required"}, status=400)
+
+    today = local_today()
+    period = (request.query_params.get("period") or "").strip().lower()
+    try:
+        if period == "week":
+            start, end = today - timedelta(days=6), today
+        elif period in ("", "today") and not request.query_params.get("from"):
+            start = end = today
+        else:
+            start = date.fromisoformat(request.query_params.get("from") or "")
+            end = date.fromisoformat(request.query_params.get("to") or today.isoformat())
+    except ValueError:
+        return Response({"error": "bad from/to, expected YYYY-MM-DD"}, status=400)
+
+    if end > today:
+        end = today
+    if start > end:
+        return Response({"error": "from must be <= to"}, status=400)
+    if (end - start).days + 1 > MAX_DAYS:
+        return Response({"error": f"period too long (max {MAX_DAYS} days)"}, status=400)
+
+    try:
+        return Response(pump_runs(ptc, start, end))
+    except LookupError as e:
+        return Response({"error": str(e)}, status=404)
+
+
+@api_view(["GET"])
+def pump_events_api(request):
+    """
+    Переходы цвета помп: ?after=<seq> — только новые события (0 — все из буфера), ?ptc= — один объект.
+    states — текущий цвет каждой помпы и с какого момента (for_seconds).
+    """
+    try:
+        after = int(request.query_params.get("after") or 0)
+    except ValueError:
+        return Response({"error": "after must be an integer"}, status=400)
+    ptc = (request.query_params.get("ptc") or "").strip() or None
+    return Response(PUMP_EVENTS.events(after=after, ptc=ptc))
+
+
+@api_view(["GET"])
+def pumps_watch_api(request):
+    """
+    Long-poll: ?since=<version>&t2_min=&t2_max=&timeout=25 — ждёт, пока у какой-то помпы сменится
+    overall_color или t2_alert, и отдаёт только эти строки (компактно, как ?compact=1 у таблицы).
+    since=0 / неизвестная версия → вся таблица (full=true) вместе с шаблонами ссылок.
+    """
+    try:
+        since = int(request.query_params.get("since") or 0)
+        timeout = float(request.query_params.get("timeout") or 25)
+    except ValueError:
+        return Response({"error": "since/timeout must be numbers"}, status=400)
+    if not math.isfinite(timeout):                   # float() пропускает nan/inf — ожидание без дедлайна
+        return Response({"error": "timeout must be a finite number"}, status=400)
+    t2_min = _to_float(request.query_params.get("t2_min"))
+    t2_max = _to_float(request.query_params.get("t2_max"))
 
-    t2_min = request.query_params.get("t2_min")
-    t2_max = request.query_params.get("t2_max")
-
-    t2_min = to_float(t2_min)
-    t2_max = to_float(t2_max)
-
-    rows = get_pumps_rows(t2_min=t2_min, t2_max=t2_max)
-
-    payload = []
-    for r in rows:
-        payload.append({
-            "ptc": r.get("ptc"),
-            "t2": r.get("t2"),
-            "q1": r.get("q1"),
-            "t2_alert": r.get("t2_alert"),
-            "overall_color": r.get("overall_color"),
-            "pompa": r.get("pompa"),
-            "pompa_nums": r.get("pompa_nums"),
-            "lcs": r.get("lcs"),
-
-            # ссылки
-            "url_ptc": r.get("url_ptc"),
-            "url_t2": r.get("url_t2"),
-            "url_q1": r.get("url_q1"),
-            "url_pompa": r.get("url_pompa"),
-            "url_pompa2": r.get("url_pompa2"),
-            "url_pompa3": r.get("url_pompa3"),
-        })
-
-    return Response(payload)
+    res = PUMPS_WATCHER.wait(since, t2_min, t2_max, timeout)
+    res["rows"] = [_row_item(r, compact=True) for r in res["rows"]]
+    if res["full"]:
+        res["templates"] = url_templates()
+    return Response(res)